@@ -0,0 +1,20 @@
+"""效能測試的選項（共用的 fixture 在專案根目錄的 conftest.py）
+
+執行方式見 README「離線效能測試」；以 pytest-benchmark 計時、儲存每次提交的結果並與先前的結果比較。
+"""
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true',
+                     help='also run benchmarks marked slow (full-universe sizes that need several GB of memory)')
+
+
+def pytest_collection_modifyitems(config, items):
+    """未加上 --run-slow 時略過標記為 slow 的項目"""
+    if config.getoption('--run-slow'):
+        return
+    skip_slow = pytest.mark.skip(reason='slow benchmark, run with --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
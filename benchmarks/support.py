@@ -0,0 +1,5 @@
+"""效能測試的共用設定"""
+
+# 依 K 線根數參數化的項目使用的根數，以及這些項目的股票數
+BENCH_SIZES = (250, 1000, 5000)
+BENCH_SYMBOLS = 50
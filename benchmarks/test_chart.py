@@ -0,0 +1,108 @@
+"""以 Agg 後端測量圖表互動的延遲：重繪各時間區間、切換股票、選擇列、費波那契預覽、第一張圖表與即時更新"""
+import itertools
+
+import pytest
+import matplotlib.pyplot as plt
+from stock_price_track.indicators import compute_indicator_arrays, compute_volume_colors, ensure_indicators
+from stock_price_track.data import generate_synthetic_ohlcv
+from stock_price_track.chart import create_multi_stock_chart
+from stock_price_track.live import LiveUpdater, ReplayBarSource
+
+from tests.support import click_label, fib_motion_events, press_key
+
+from .support import BENCH_SIZES
+
+PERIODS = ('1M', '3M', '6M', '1Y', '5Y', 'MAX')
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+@pytest.mark.parametrize('period', PERIODS)
+def test_draw_period(benchmark, chart_stocks, headless_chart, num_bars, period):
+    fig, _, time_buttons, flush = headless_chart(chart_stocks(10, num_bars))
+    periods = list(time_buttons)
+    other = time_buttons[periods[periods.index(period) - 1]]
+
+    def setup():
+        click_label(fig, other)
+        flush()
+    benchmark.pedantic(lambda: (click_label(fig, time_buttons[period]), flush()), setup=setup, rounds=7)
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_switch_symbol(benchmark, chart_stocks, headless_chart, num_bars):
+    fig, radio_buttons, _, flush = headless_chart(chart_stocks(10, num_bars))
+    labels = itertools.cycle(radio_buttons[1:] + radio_buttons[:1])
+    benchmark(lambda: (click_label(fig, next(labels)), flush()))
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_fib_preview_frame(benchmark, chart_stocks, headless_chart, num_bars):
+    fig, _, _, flush = headless_chart(chart_stocks(1, num_bars))
+    events = itertools.cycle(fib_motion_events(fig, 100))
+    benchmark(lambda: (fig.canvas.callbacks.process('motion_notify_event', next(events)), flush()))
+
+
+@pytest.mark.parametrize('mode', ('eager', 'lazy'))
+@pytest.mark.parametrize('num_symbols', (10, 100))
+def test_first_chart(benchmark, frames, mode, num_symbols):
+    """從下載完成到第一張圖表繪製完成的時間（預先計算全部指標 vs. 延後計算）"""
+    data = frames(num_symbols, 320)
+
+    def setup():
+        return ({symbol: {'data_full': frame.copy()} for symbol, frame in data.items()},), {}
+
+    def first_chart(stocks_data):
+        if mode == 'eager':
+            for stock in stocks_data.values():
+                ensure_indicators(stock)
+                stock['volume_colors'] = compute_volume_colors(stock['data_full']['Close'])
+        fig, _ = create_multi_stock_chart(stocks_data, prewarm=(mode == 'lazy'))
+        fig.canvas.draw()
+        plt.close(fig)
+    benchmark.pedantic(first_chart, setup=setup, rounds=3)
+
+
+@pytest.mark.parametrize('action', ('click_slot', 'key_next', 'page_down', 'search_keystroke'))
+def test_selector(benchmark, headless_chart, action):
+    """500 支股票時選擇列的點擊、鍵盤切換、翻頁與搜尋延遲（含重繪）"""
+    stocks_data = {f'SYM{i}': {'data_full': generate_synthetic_ohlcv(320, seed=i % 50)} for i in range(500)}
+    fig, radio_buttons, _, flush = headless_chart(stocks_data, prewarm=False)
+    rounds = itertools.count(1)
+    actions = {
+        'click_slot': lambda r: click_label(fig, radio_buttons[r % len(radio_buttons)]),
+        'key_next': lambda r: press_key(fig, 'right'),
+        'page_down': lambda r: press_key(fig, 'pagedown'),
+        'search_keystroke': lambda r: press_key(fig, str(r % 10) if r % 2 == 0 else 'backspace'),
+    }
+    if action == 'search_keystroke':
+        press_key(fig, '/')
+    benchmark(lambda: (actions[action](next(rounds)), flush()))
+
+
+def test_live_tick(benchmark, frames, headless_chart):
+    """即時模式每次更新（輪詢 + O(1) 指標 + 重繪）的延遲"""
+    ticks = 60
+    source = ReplayBarSource(frames(50, 320), holdback=ticks)
+    stocks_data = {}
+    for symbol, data in source.initial_data().items():
+        for name, values in compute_indicator_arrays(data['Close'].to_numpy()).items():
+            data[name] = values
+        stocks_data[symbol] = {'data_full': data, 'volume_colors': compute_volume_colors(data['Close'])}
+    updater = LiveUpdater(stocks_data, source)
+    fig, _, _, _ = headless_chart(stocks_data, live_updater=updater)
+
+    def tick():
+        updater.poll_once()
+        updater.timer._on_timer()
+        fig.canvas.draw()
+    benchmark.pedantic(tick, rounds=ticks)
+
+
+@pytest.mark.parametrize('num_bars', (1_000, 10_000, 100_000))
+def test_live_append(benchmark, frames, num_bars):
+    """即時模式附加一根新 K 線（不含重繪）的延遲：寫入預先配置的緩衝區，不隨歷史長度增加"""
+    ticks = 200
+    source = ReplayBarSource(frames(1, num_bars), holdback=ticks)
+    stocks_data = {symbol: {'data_full': data} for symbol, data in source.initial_data().items()}
+    updater = LiveUpdater(stocks_data, source)
+    benchmark.pedantic(lambda: (updater.poll_once(), updater.drain()), rounds=ticks)
@@ -0,0 +1,59 @@
+"""下載流程、分鐘線儲存與精簡模式 stocks_data 的效能測試"""
+import itertools
+
+import numpy as np
+import pytest
+from stock_price_track.config import INTRADAY_WINDOW_BARS
+from stock_price_track.data import IntradayStore, fetch_stocks_data_async, generate_synthetic_ohlcv, synthetic_source
+from stock_price_track.compact import CompactStockStore
+
+from .support import BENCH_SIZES, BENCH_SYMBOLS
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_fetch_async(benchmark, num_bars):
+    symbols = [f'SYM{i}' for i in range(BENCH_SYMBOLS)]
+    source = synthetic_source(symbols, num_bars)
+    benchmark(fetch_stocks_data_async, symbols, source, period=None, rate=0)
+
+
+@pytest.fixture(scope='module')
+def intraday_history():
+    """1,000 個交易日的 1 分鐘 K 線（每日 390 根）"""
+    return generate_synthetic_ohlcv(1000 * 390, seed=0, interval='1m')
+
+
+def test_intraday_append(benchmark, intraday_history, tmp_path_factory):
+    per_day = 390
+
+    def setup():
+        return (IntradayStore(str(tmp_path_factory.mktemp('intraday')), '1m'),), {}
+
+    def append_sessions(store):
+        for start in range(0, len(intraday_history), per_day):
+            store.append('BENCH', intraday_history.iloc[start:start + per_day])
+    benchmark.pedantic(append_sessions, setup=setup, rounds=3)
+
+
+def test_intraday_window(benchmark, intraday_history, tmp_path):
+    window = INTRADAY_WINDOW_BARS
+    store = IntradayStore(str(tmp_path), '1m', window)
+    store.append('BENCH', intraday_history)
+    ends = itertools.cycle(np.random.default_rng(0).choice(intraday_history.index.values[window:], 1000))
+    benchmark(lambda: store.window('BENCH', end=next(ends), last=window))
+
+
+def test_compact_store_build(benchmark, frames):
+    data = frames(1000, 320)
+    benchmark.pedantic(CompactStockStore, args=(data,), rounds=3)
+
+
+def test_compact_store_view(benchmark, frames):
+    data = frames(200, 1000)
+    store = CompactStockStore(data)
+    symbols = itertools.cycle(store.keys())
+
+    def miss():
+        store._cache.clear()
+        return store[next(symbols)]
+    benchmark(miss)
@@ -0,0 +1,70 @@
+"""指標引擎、多行程指標計算與統計核心的效能測試（含原本 pandas 版本的基準）"""
+import os
+
+import pytest
+from stock_price_track.lazy import HAS_NUMBA
+from stock_price_track.config import STATS_LOOKBACKS
+from stock_price_track.stats import _summary_stats_pandas, compute_batch_stats, compute_summary_stats
+from stock_price_track.indicators import _calculate_indicators_pandas, compute_analysis_results, compute_indicator_arrays, parallel_indicator_arrays
+
+from .support import BENCH_SIZES, BENCH_SYMBOLS
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_indicator_engine(benchmark, closes, num_bars):
+    matrix = closes(num_bars, BENCH_SYMBOLS)
+    benchmark(compute_indicator_arrays, matrix)
+
+
+@pytest.mark.slow
+def test_indicator_engine_universe(benchmark, closes):
+    """10,000 支股票 × 5,000 根 K 線一次計算（約需 6 GB 記憶體，加上 --run-slow 才執行）"""
+    matrix = closes(5000, 10_000)
+    benchmark.pedantic(compute_indicator_arrays, args=(matrix,), rounds=1)
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_indicators_pandas_baseline(benchmark, frames, num_bars):
+    data = frames(1, num_bars)['SYM0']
+    benchmark(_calculate_indicators_pandas, data)
+
+
+@pytest.mark.parametrize('workers', (1, 2, 4, 8, 16))
+def test_parallel_indicators(benchmark, closes, workers):
+    """共享記憶體多行程指標計算的擴展效率（行程數超過 CPU 核心數時略過）"""
+    if workers > (os.cpu_count() or 1):
+        pytest.skip(f'{workers} workers > {os.cpu_count()} CPUs')
+    matrix = closes(2500, 2000)
+
+    def run():
+        with parallel_indicator_arrays(matrix, workers) as columns:
+            return {name: values.copy() for name, values in columns.items()}
+    benchmark.pedantic(run, rounds=3)
+
+
+@pytest.mark.parametrize('num_bars', BENCH_SIZES)
+def test_analysis_results(benchmark, chart_stocks, num_bars):
+    stocks_data = chart_stocks(BENCH_SYMBOLS, num_bars)
+    benchmark(lambda: [compute_analysis_results(stock['data_full']) for stock in stocks_data.values()])
+
+
+def test_summary_stats_kernel(benchmark, frames):
+    data = frames(1, 320)['SYM0']
+    benchmark(compute_summary_stats, data['Close'].to_numpy())
+
+
+def test_summary_stats_pandas_baseline(benchmark, frames):
+    data = frames(1, 320)['SYM0']
+    benchmark(lambda: [_summary_stats_pandas(data, lookback) for lookback in STATS_LOOKBACKS.values()])
+
+
+@pytest.mark.parametrize('kernel', ('numba', 'numpy'))
+def test_batch_stats(benchmark, closes, kernel):
+    if kernel == 'numba' and not HAS_NUMBA:
+        pytest.skip('Numba is not installed')
+    use_numba = kernel == 'numba'
+    matrix = closes(320, 1000)
+    # 先呼叫一次，Numba 的匯入與編譯（或載入快取）不計入時間
+    compute_batch_stats(matrix[:, :1], 1, use_numba)
+    benchmark(lambda: [compute_batch_stats(matrix, lookback, use_numba)
+                       for lookback in STATS_LOOKBACKS.values()])
@@ -0,0 +1,47 @@
+"""投資組合分析的效能測試：建立、逐列更新滾動共變異數 vs. 重算整個視窗、即時刷新與熱圖排序"""
+import itertools
+
+import numpy as np
+import pytest
+
+from stock_price_track.portfolio import PortfolioAnalytics
+
+NUM_SYMBOLS = 500
+UPDATES = 50
+
+
+@pytest.fixture(scope='module')
+def portfolio_frames(frames):
+    return frames(NUM_SYMBOLS, 2520)
+
+
+def test_portfolio_build(benchmark, portfolio_frames):
+    benchmark.pedantic(lambda: PortfolioAnalytics(portfolio_frames).summary(), rounds=3)
+
+
+def test_rolling_covariance_update(benchmark, portfolio_frames):
+    portfolio = PortfolioAnalytics(portfolio_frames)
+    rows = itertools.cycle(np.random.default_rng(0).normal(0, 0.01, (UPDATES, NUM_SYMBOLS + 1)))
+    benchmark(lambda: portfolio.rolling.update(next(rows)))
+
+
+def test_rolling_covariance_full_window(benchmark, portfolio_frames):
+    portfolio = PortfolioAnalytics(portfolio_frames)
+    benchmark(lambda: np.cov(portfolio.rolling.rows().T))
+
+
+def test_portfolio_refresh(benchmark, portfolio_frames):
+    """即時模式每根新 K 線對全部股票的 refresh()"""
+    history = {symbol: data.iloc[:-UPDATES] for symbol, data in portfolio_frames.items()}
+    portfolio = PortfolioAnalytics(history)
+    steps = iter([{symbol: data.iloc[:len(data) - step + 1] for symbol, data in portfolio_frames.items()}
+                  for step in range(UPDATES, 0, -1)])
+    benchmark.pedantic(lambda: portfolio.refresh(next(steps)), rounds=UPDATES)
+
+
+def test_heatmap_order(benchmark, portfolio_frames):
+    portfolio = PortfolioAnalytics(portfolio_frames)
+
+    def setup():
+        portfolio.order = None  # 排序在第一次計算後固定，每輪重新計算
+    benchmark.pedantic(portfolio.heatmap_order, setup=setup, rounds=5)
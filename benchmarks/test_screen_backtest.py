@@ -0,0 +1,56 @@
+"""篩選器索引與均線交叉參數掃描的效能測試"""
+import itertools
+
+import numpy as np
+import pytest
+
+from stock_price_track.stats import compute_batch_stats
+from stock_price_track.screener import Screener
+from stock_price_track.backtest import backtest_grid, backtest_matrix
+
+SCREEN_CONDITIONS = ['close > MA50', 'close crosses_above MA20', 'close > BB_upper',
+                     'max_drawdown > -15', 'volatility between 15 40']
+
+
+@pytest.fixture(scope='module')
+def screen_matrix(closes):
+    matrix = closes(320, 5000)
+    compute_batch_stats(matrix[:, :1])  # 不把 Numba 載入編譯結果的時間算進建立索引
+    return matrix
+
+
+def _build_screener(matrix):
+    screener = Screener([f'SYM{j}' for j in range(matrix.shape[1])], matrix)
+    for text in SCREEN_CONDITIONS:
+        screener.add(text)
+    return screener
+
+
+def test_screen_build(benchmark, screen_matrix):
+    benchmark.pedantic(_build_screener, args=(screen_matrix,), rounds=5)
+
+
+def test_screen_query(benchmark, screen_matrix):
+    screener = _build_screener(screen_matrix)
+    queries = itertools.cycle([SCREEN_CONDITIONS[:k] for k in range(1, len(SCREEN_CONDITIONS) + 1)])
+    benchmark(lambda: screener.query(*next(queries)))
+
+
+def test_screen_update(benchmark, screen_matrix):
+    matrix = screen_matrix.copy()
+    screener = _build_screener(matrix)
+    rng = np.random.default_rng(0)
+
+    def update():
+        j = int(rng.integers(matrix.shape[1]))
+        matrix[-1, j] *= 1 + rng.normal(0, 0.03)
+        screener.update(screener.symbols[j], matrix[:, j])
+    benchmark(update)
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_backtest_sweep(benchmark, closes, workers):
+    matrix = closes(320, 200)
+    params = backtest_grid('ma-cross', list(range(5, 61)))
+    backtest_matrix(matrix[:, :1], 'ma-cross', params[:1])  # 不把 Numba 載入編譯結果的時間算進掃描
+    benchmark.pedantic(backtest_matrix, args=(matrix, 'ma-cross', params), kwargs={'workers': workers}, rounds=3)
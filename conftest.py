@@ -0,0 +1,84 @@
+"""tests/ 與 benchmarks/ 共用的 fixture：以固定亂數種子產生的假數據（不需網路）與 Agg 後端的圖表"""
+import numpy as np
+import pytest
+
+from stock_price_track.lazy import plt, use_headless_backend
+from stock_price_track.config import TIME_PERIOD_DAYS
+from stock_price_track.indicators import compute_indicator_arrays
+from stock_price_track.data import generate_synthetic_ohlcv
+from stock_price_track.chart import create_multi_stock_chart
+
+# 在任何測試匯入 pyplot 之前改用 Agg 後端
+use_headless_backend()
+
+
+@pytest.fixture(scope='session')
+def closes():
+    """回傳 make(num_bars, num_symbols, seed=0)：(K 線 × 股票) 的隨機漫步收盤價矩陣"""
+    def make(num_bars, num_symbols, seed=0):
+        rng = np.random.default_rng(seed)
+        return 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (num_bars, num_symbols)), axis=0))
+    return make
+
+
+@pytest.fixture(scope='session')
+def frames():
+    """回傳 make(num_symbols, num_bars, interval='1d')：{SYM<i>: OHLCV DataFrame}，第 i 支股票的種子為 i
+
+    每次呼叫都產生新的 DataFrame，測試可以直接修改。
+    """
+    def make(num_symbols, num_bars, interval='1d'):
+        return {f'SYM{i}': generate_synthetic_ohlcv(num_bars, seed=i, interval=interval)
+                for i in range(num_symbols)}
+    return make
+
+
+@pytest.fixture(scope='session')
+def chart_stocks(frames):
+    """回傳 make(num_symbols, num_bars)：已計算指標的 stocks_data"""
+    def make(num_symbols, num_bars):
+        stocks_data = {}
+        for symbol, data in frames(num_symbols, num_bars).items():
+            for name, values in compute_indicator_arrays(data['Close'].to_numpy()).items():
+                data[name] = values
+            stocks_data[symbol] = {'data_full': data}
+        return stocks_data
+    return make
+
+
+@pytest.fixture
+def headless_chart():
+    """回傳 make(stocks_data, **options) -> (fig, 股票按鈕, 時間按鈕, flush)，測試結束時關閉圖表
+
+    Agg 的 draw_idle 會立即重繪；改為記錄請求，由 flush() 在事件處理後只重繪一次，模擬 GUI 事件迴圈。
+    """
+    figures = []
+
+    def make(stocks_data, **options):
+        fig, radio_buttons = create_multi_stock_chart(stocks_data, **options)
+        fig.canvas.draw()
+        figures.append(fig)
+        pending_draw = [False]
+        fig.canvas.draw_idle = lambda *args, **kwargs: pending_draw.__setitem__(0, True)
+
+        def flush():
+            if pending_draw[0]:
+                pending_draw[0] = False
+                fig.canvas.draw()
+        time_buttons = {t.get_text(): t for ax in fig.axes for t in ax.texts
+                        if t.get_text() in TIME_PERIOD_DAYS}
+        return fig, radio_buttons, time_buttons, flush
+    yield make
+    for fig in figures:
+        plt.close(fig)
+
+
+@pytest.fixture
+def custom_indicators():
+    """回傳 add(spec)：以 add_indicator 加入自訂指標，測試結束時還原全域的指標設定"""
+    from stock_price_track import indicators
+    saved = dict(indicators.INDICATOR_COLUMNS), dict(indicators.INDICATOR_OVERLAYS)
+    yield indicators.add_indicator
+    for registry, original in zip((indicators.INDICATOR_COLUMNS, indicators.INDICATOR_OVERLAYS), saved):
+        registry.clear()
+        registry.update(original)
@@ -0,0 +1,10 @@
+"""股票價格追蹤：下載歷史數據，計算技術指標與統計數據，並以互動式圖表顯示
+
+命令列進入點為 main()（python -m stock_price_track 或 python stock-price-track.py）。
+"""
+from .lazy import mark_startup
+from .cli import main
+
+mark_startup('Package loaded')
+
+__all__ = ['main']
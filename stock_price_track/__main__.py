@@ -0,0 +1,6 @@
+"""python -m stock_price_track"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
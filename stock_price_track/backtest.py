@@ -0,0 +1,297 @@
+"""回測"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import warnings
+
+from .lazy import HAS_NUMBA, lazy_njit, np
+from .config import (
+    BACKTEST_BB_STD_GRID, BACKTEST_CHUNK_ELEMENTS, BACKTEST_FEE, BACKTEST_SHARD_SYMBOLS, BOLLINGER_PERIOD,
+    BOLLINGER_STD,
+)
+from .stats import align_closes
+from .indicators import _attach_shared_memory, rolling_windows
+
+
+def _ma_cross_windows(params):
+    return {int(w) for w in params[:, 0]} | {int(w) for w in params[:, 1]}, set()
+
+
+def _ma_cross_signals(closes, means, stds, params):
+    """均線交叉：快線在慢線之上時持有"""
+    fast = np.stack([means[int(w)] for w in params[:, 0]])
+    slow = np.stack([means[int(w)] for w in params[:, 1]])
+    return fast > slow
+
+
+def _bb_revert_windows(params):
+    windows = {int(w) for w in params[:, 0]}
+    return windows, windows
+
+
+def _bb_revert_signals(closes, means, stds, params):
+    """布林通道均值回歸：收盤價跌破下軌時買進，回到中軌以上時賣出"""
+    middle = np.stack([means[int(w)] for w in params[:, 0]])
+    lower = middle - params[:, 1, None, None] * np.stack([stds[int(w)] for w in params[:, 0]])
+    # 1 = 買進、0 = 賣出、-1 = 維持；持有狀態為最近一次買進或賣出訊號（向前填補）
+    event = np.full(middle.shape, -1, dtype=np.int8)
+    event[closes >= middle] = 0
+    event[closes < lower] = 1
+    last = np.where(event >= 0, np.arange(closes.shape[0])[:, None], 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return np.take_along_axis(event, last, axis=1) == 1
+
+
+BACKTEST_STRATEGIES = {
+    'ma-cross': {'params': ('fast', 'slow'), 'default': (10, 50),
+                 'windows': _ma_cross_windows, 'signals': _ma_cross_signals},
+    'bb-revert': {'params': ('window', 'num_std'), 'default': (BOLLINGER_PERIOD, BOLLINGER_STD),
+                  'windows': _bb_revert_windows, 'signals': _bb_revert_signals},
+}
+BACKTEST_METRICS = ['total_return', 'sharpe', 'max_drawdown', 'trades']
+
+
+def parse_window_range(text):
+    """解析 START:STOP[:STEP] 視窗範圍（含 STOP），格式錯誤時拋出 ValueError"""
+    try:
+        parts = [int(part) for part in text.split(':')]
+    except ValueError:
+        raise ValueError(f"Cannot parse window range '{text}' (expected START:STOP[:STEP])")
+    if len(parts) not in (2, 3) or parts[0] < 2 or parts[1] < parts[0] or (len(parts) == 3 and parts[2] < 1):
+        raise ValueError(f"Invalid window range '{text}' (expected START:STOP[:STEP], START >= 2)")
+    step = parts[2] if len(parts) == 3 else 1
+    return list(range(parts[0], parts[1] + 1, step))
+
+
+def parse_backtest_params(args):
+    """依命令列參數產生回測的參數組合（--sweep 為掃描，否則為單組參數），格式錯誤時拋出 ValueError"""
+    if args.sweep:
+        try:
+            num_stds = [float(v) for v in args.bb_std.split(',')]
+        except ValueError:
+            raise ValueError(f"Cannot parse --bb-std '{args.bb_std}'")
+        params = backtest_grid(args.backtest, parse_window_range(args.sweep), num_stds)
+        if not params:
+            raise ValueError(f"Window range '{args.sweep}' produces no parameter combinations")
+        return params
+    if not args.backtest_params:
+        return None
+    try:
+        values = [float(v) for v in args.backtest_params.split(',')]
+    except ValueError:
+        values = []
+    names = BACKTEST_STRATEGIES[args.backtest]['params']
+    if len(values) != len(names) or values[0] < 2 or values[0] != int(values[0]):
+        raise ValueError(f"--backtest-params for {args.backtest} expects {','.join(names)}, got '{args.backtest_params}'")
+    if args.backtest == 'ma-cross' and not values[1] == int(values[1]) > values[0]:
+        raise ValueError("--backtest-params for ma-cross expects integer windows with fast < slow")
+    return [tuple(values)]
+
+
+def backtest_grid(strategy, windows, num_stds=BACKTEST_BB_STD_GRID):
+    """參數掃描的組合：均線交叉為所有快線 < 慢線的視窗配對，布林通道為視窗 × 標準差倍數"""
+    if strategy == 'ma-cross':
+        return [(fast, slow) for i, fast in enumerate(windows) for slow in windows[i + 1:]]
+    return [(window, num_std) for window in windows for num_std in num_stds]
+
+
+def _backtest_metrics_loop(signals, returns, valid_counts, fee, out):
+    """單次掃描計算每個組合與股票的報酬、Sharpe、最大回撤與交易次數，依 BACKTEST_METRICS 順序寫入 out
+
+    signals 為 (組合 × K 線 × 股票) 的收盤訊號，下一根 K 線才持有；每次買進或賣出都扣除 fee。
+    """
+    num_combos, num_bars, num_symbols = signals.shape
+    for k in range(num_combos):
+        for j in range(num_symbols):
+            prev = 0.0
+            total = 0.0
+            total_sq = 0.0
+            equity = 1.0
+            peak = 1.0
+            max_drawdown = 0.0
+            trades = 0
+            for t in range(num_bars):
+                held = 1.0 if t > 0 and signals[k, t - 1, j] else 0.0
+                net = held * returns[t, j]
+                if held != prev:
+                    net -= fee
+                    if held > prev:
+                        trades += 1
+                prev = held
+                total += net
+                total_sq += net * net
+                equity *= net + 1.0
+                if equity > peak:
+                    peak = equity
+                drawdown = 1.0 - equity / peak
+                if drawdown > max_drawdown:
+                    max_drawdown = drawdown
+            count = valid_counts[j]
+            sharpe = np.nan
+            if count > 1:
+                mean = total / count
+                var = (total_sq - total * mean) / (count - 1)
+                if var > 0:
+                    sharpe = mean / np.sqrt(var) * np.sqrt(252)
+            out[0, k, j] = (equity - 1.0) * 100
+            out[1, k, j] = sharpe
+            out[2, k, j] = max_drawdown * 100
+            out[3, k, j] = trades
+
+
+_backtest_metrics_jit = lazy_njit(_backtest_metrics_loop) if HAS_NUMBA else None
+
+
+def _backtest_metrics_numpy(signals, returns, valid_counts, fee):
+    """NumPy 向量化版本的回測績效（未安裝 Numba 時使用），回傳 (指標 × 組合 × 股票) 陣列"""
+    held = np.zeros(signals.shape)
+    held[:, 1:] = signals[:, :-1]
+    changes = np.abs(np.diff(held, axis=1, prepend=0.0))
+    net = held * returns
+    net -= fee * changes
+    trades = np.count_nonzero(held[:, 1:] > held[:, :-1], axis=1)
+    total = net.sum(axis=1)
+    total_sq = np.einsum('ktj,ktj->kj', net, net)
+    equity = np.cumprod(net + 1.0, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 1.0, out=peak)
+    max_drawdown = (1.0 - equity / peak).max(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / valid_counts
+        var = (total_sq - total * mean) / (valid_counts - 1)
+        sharpe = np.where(var > 0, mean / np.sqrt(var) * np.sqrt(252), np.nan)
+    return np.stack([(equity[:, -1] - 1.0) * 100, sharpe, max_drawdown * 100, trades])
+
+
+def _backtest_shard(closes, strategy, params, fee, out, use_numba):
+    """回測一組股票（closes 為 K 線 × 股票）在全部參數組合下的績效，寫入 out（指標 × 組合 × 股票）"""
+    spec = BACKTEST_STRATEGIES[strategy]
+    mean_windows, std_windows = spec['windows'](params)
+    means, stds = rolling_windows(closes, mean_windows, std_windows)
+    returns = np.zeros(closes.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = closes[1:] / closes[:-1] - 1.0
+    valid = np.isfinite(returns)
+    valid[0] = False
+    returns[~valid] = 0.0
+    valid_counts = valid.sum(axis=0)
+    chunk = max(1, BACKTEST_CHUNK_ELEMENTS // max(closes.size, 1))
+    for start in range(0, len(params), chunk):
+        stop = min(start + chunk, len(params))
+        signals = spec['signals'](closes, means, stds, params[start:stop])
+        if use_numba:
+            metrics = np.empty((len(BACKTEST_METRICS), stop - start, closes.shape[1]))
+            _backtest_metrics_jit(signals, returns, valid_counts, fee, metrics)
+        else:
+            metrics = _backtest_metrics_numpy(signals, returns, valid_counts, fee)
+        out[:, start:stop] = metrics
+
+
+def _backtest_shard_worker(input_name, output_name, shape, out_shape, strategy, params, fee, use_numba, start, stop):
+    """工作行程：回測第 start:stop 支股票，直接寫入共享的輸出緩衝區"""
+    shm_in = _attach_shared_memory(input_name)
+    shm_out = _attach_shared_memory(output_name)
+    try:
+        closes = np.ndarray(shape, dtype=np.float64, buffer=shm_in.buf)
+        out = np.ndarray(out_shape, dtype=np.float64, buffer=shm_out.buf)
+        _backtest_shard(np.array(closes[:, start:stop]), strategy, params, fee, out[:, :, start:stop], use_numba)
+        del closes, out
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return stop - start
+
+
+def backtest_matrix(matrix, strategy, params, fee=BACKTEST_FEE, workers=1, shards_per_worker=2, use_numba=None):
+    """回測 (K 線 × 股票) 收盤價矩陣在每組參數下的績效，回傳 {指標: (參數組合 × 股票) 陣列}
+
+    股票依 BACKTEST_SHARD_SYMBOLS 分片；workers > 1 時以共享記憶體將分片交給多個行程。
+    有安裝 Numba 時績效以單次掃描的編譯核心計算，否則使用 NumPy 向量化版本。
+    """
+    if use_numba is None:
+        use_numba = HAS_NUMBA
+    params = np.asarray(params, dtype=np.float64).reshape(len(params), -1)
+    num_bars, num_symbols = matrix.shape
+    out_shape = (len(BACKTEST_METRICS), len(params), num_symbols)
+    num_shards = max(workers * shards_per_worker if workers > 1 else 1, -(-num_symbols // BACKTEST_SHARD_SYMBOLS))
+    bounds = np.linspace(0, num_symbols, min(num_symbols, num_shards) + 1).astype(int)
+    shards = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+    if workers <= 1:
+        out = np.empty(out_shape)
+        for start, stop in shards:
+            _backtest_shard(np.array(matrix[:, start:stop]), strategy, params, fee, out[:, :, start:stop], use_numba)
+    else:
+        shm_in = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        shm_out = shared_memory.SharedMemory(create=True, size=max(int(np.prod(out_shape)) * 8, 1))
+        try:
+            closes = np.ndarray(matrix.shape, dtype=np.float64, buffer=shm_in.buf)
+            closes[:] = matrix
+            del closes
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_backtest_shard_worker, shm_in.name, shm_out.name, matrix.shape,
+                                           out_shape, strategy, params, fee, use_numba, start, stop)
+                           for start, stop in shards]
+                for future in as_completed(futures):
+                    future.result()
+            out = np.ndarray(out_shape, dtype=np.float64, buffer=shm_out.buf).copy()
+        finally:
+            shm_in.close()
+            shm_in.unlink()
+            shm_out.close()
+            shm_out.unlink()
+    return {name: out[k] for k, name in enumerate(BACKTEST_METRICS)}
+
+
+def run_backtest(frames, strategy, params=None, fee=BACKTEST_FEE, workers=1, use_numba=None):
+    """以 {symbol: 含 Close 欄位的 DataFrame} 回測一組或多組參數，回傳含參數、績效與買進持有報酬的結果"""
+    spec = BACKTEST_STRATEGIES[strategy]
+    params = [spec['default']] if params is None else list(params)
+    symbols, matrix, _ = align_closes(frames)
+    t0 = time.perf_counter()
+    metrics = backtest_matrix(matrix, strategy, params, fee=fee, workers=workers, use_numba=use_numba)
+    elapsed = time.perf_counter() - t0
+    buy_hold = np.full(len(symbols), np.nan)
+    for j in range(len(symbols)):
+        close = matrix[:, j][~np.isnan(matrix[:, j])]
+        if len(close) > 1:
+            buy_hold[j] = (close[-1] / close[0] - 1) * 100
+    return {'strategy': strategy, 'param_names': spec['params'], 'params': params, 'fee': fee,
+            'symbols': symbols, 'metrics': metrics, 'buy_hold': buy_hold, 'seconds': elapsed}
+
+
+def _format_params(names, values):
+    return ', '.join(f'{name}={value:g}' for name, value in zip(names, values))
+
+
+def print_backtest_results(result, top=10):
+    """輸出回測結果：單組參數列出每支股票，參數掃描列出平均 Sharpe 最高的組合"""
+    metrics = result['metrics']
+    names = result['param_names']
+    num_combos = len(result['params'])
+    num_symbols = len(result['symbols'])
+    fee = f"fee {result['fee'] * 100:.2f}% per trade"
+    if num_combos == 1:
+        print(f"\n[Backtest] {result['strategy']} ({_format_params(names, result['params'][0])}) | {fee} | "
+              f"{num_symbols} symbols | {result['seconds']:.2f}s")
+        for j, symbol in enumerate(result['symbols']):
+            print(f"   {symbol}: return {metrics['total_return'][0, j]:+.2f}% "
+                  f"(buy & hold {result['buy_hold'][j]:+.2f}%) | Sharpe {metrics['sharpe'][0, j]:.2f} | "
+                  f"max drawdown {metrics['max_drawdown'][0, j]:.2f}% | trades {int(metrics['trades'][0, j])}")
+        return
+    rate = num_combos * num_symbols / max(result['seconds'], 1e-9)
+    print(f"\n[Backtest] {result['strategy']} sweep: {num_combos} combinations x {num_symbols} symbols "
+          f"in {result['seconds']:.1f}s ({rate:,.0f} backtests/s) | {fee}")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_sharpe = np.nanmean(metrics['sharpe'], axis=1)
+        mean_return = np.nanmean(metrics['total_return'], axis=1)
+        mean_drawdown = np.nanmean(metrics['max_drawdown'], axis=1)
+        buy_hold = np.nanmean(result['buy_hold'])
+    mean_trades = metrics['trades'].mean(axis=1)
+    positive = (metrics['total_return'] > 0).mean(axis=1) * 100
+    order = np.argsort(np.where(np.isnan(mean_sharpe), np.inf, -mean_sharpe), kind='stable')[:top]
+    print(f"   Top {len(order)} by mean Sharpe (buy & hold mean return {buy_hold:+.2f}%):")
+    for i in order:
+        print(f"   {_format_params(names, result['params'][i])}: Sharpe {mean_sharpe[i]:.2f} | "
+              f"return {mean_return[i]:+.2f}% | max drawdown {mean_drawdown[i]:.2f}% | "
+              f"trades {mean_trades[i]:.1f} | profitable {positive[i]:.0f}%")
@@ -0,0 +1,1294 @@
+"""互動式多股票圖表"""
+import bisect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .lazy import mdates, np, plt
+from .config import (
+    DOWNSAMPLE_MIN_POINTS, FIBONACCI_COLORS, FIBONACCI_LEVELS, MA_PERIODS, RESOLUTIONS,
+    RESOLUTION_PIXELS_PER_BAR, SELECTOR_PAGE_SIZE, SELECTOR_PREFETCH_DELAY_MS, TIME_PERIOD_DAYS,
+    VOLUME_FLAT_COLOR,
+)
+from .indicators import INDICATOR_OVERLAYS, compute_volume_colors, ensure_indicators
+from .pyramid import BarPyramid
+from .portfolio import draw_correlation_heatmap, portfolio_title
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets 降採樣，回傳保留的索引（NaN 點不參與取樣）"""
+    valid = ~np.isnan(y)
+    if not valid.all():
+        keep = np.flatnonzero(valid)
+        return keep[lttb_indices(x[keep], y[keep], threshold)]
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # 第一與最後一點固定保留，中間分成 threshold - 2 個桶
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges = np.append(edges, n)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y, num_buckets):
+    """每個桶保留最小值與最大值的索引（用於成交量柱的降採樣）"""
+    n = len(y)
+    if num_buckets < 1 or 2 * num_buckets >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, num_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(num_buckets), np.diff(edges))
+    order = np.lexsort((np.nan_to_num(y, nan=-np.inf), bucket))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+def compressed_axis(pyramid):
+    """比日線細的 K 線（分鐘線）是否使用壓縮掉收盤時段的 K 線序號座標"""
+    return RESOLUTIONS[pyramid.base][1] < RESOLUTIONS['D'][1]
+
+
+def bar_positions(pyramid, level):
+    """某個解析度每根 K 線的 (x 座標, 左緣, 右緣)
+
+    日線以上使用日期座標。分鐘線以原始 K 線的序號作為 x，收盤後、週末與假日不佔空間；
+    較粗的解析度畫在所涵蓋的最後一根原始 K 線上，寬度涵蓋整個區間，各解析度共用同一條座標軸。
+    """
+    bars = pyramid.bars(level)
+    if not compressed_axis(pyramid):
+        x = mdates.date2num(bars.index)
+        half = RESOLUTIONS[level][1] / 2880  # 半根 K 線的寬度（天）
+        return x, x - half, x + half
+    starts = np.arange(len(bars)) if level == pyramid.base else pyramid.starts[level]
+    ends = np.r_[starts[1:], len(pyramid.data)] - 1
+    return ends.astype(np.float64), starts - 0.4, ends + 0.4
+
+
+def format_bar_time(index, x):
+    """壓縮座標的刻度文字：把 K 線序號換回日期與時間"""
+    i = int(round(x))
+    if not 0 <= i < len(index):
+        return ''
+    return index[i].strftime('%m-%d\n%H:%M')
+
+
+def create_multi_stock_chart(stocks_data, initial_period='6M', live_updater=None, live_interval=1.0,
+                             prewarm=True, profiler=None, portfolio=None):
+    """創建多股票切換圖表（使用自訂水平單選按鈕；傳入 live_updater 時啟用即時更新）
+
+    指標在第一次顯示某支股票時才計算；prewarm 為 True 時在背景執行緒預先計算相鄰按鈕的股票。
+    傳入 InteractionProfiler 時記錄每個事件處理函式的延遲與重繪次數；
+    傳入 PortfolioAnalytics 時在時間按鈕下方加入 CORR 分頁，顯示相關係數熱圖。
+    """
+    from matplotlib.collections import PolyCollection
+    from matplotlib.legend import Legend
+    from matplotlib.transforms import Bbox
+    from matplotlib.ticker import FuncFormatter, MaxNLocator
+    symbols = list(stocks_data.keys())
+    num_symbols = len(symbols)
+
+    # 創建圖表
+    fig = plt.figure(figsize=(14, 10))
+
+    # 優化間距設計
+    gs = fig.add_gridspec(2, 1,
+                          height_ratios=[3, 1],
+                          hspace=0.15,
+                          top=0.85,
+                          bottom=0.10)
+
+    ax1 = fig.add_subplot(gs[0, 0])  # 價格圖
+    ax2 = fig.add_subplot(gs[1, 0], sharex=ax1)  # 成交量圖
+
+    # 建立自訂的水平 Radio Button
+    radio_ypos = 0.93
+    radio_ax = fig.add_axes([0.05, radio_ypos, 0.9, 0.055])
+    radio_ax.set_xlim(0, 1)
+    radio_ax.set_ylim(0, 1)
+    radio_ax.axis('off')
+
+    # 建立左側時間選項按鈕
+    time_ypos = radio_ypos
+    time_periods = list(TIME_PERIOD_DAYS)
+    time_height = 0.05 * (len(time_periods) + 1)  # 每個按鈕佔 0.05 的圖表高度
+    time_ax = fig.add_axes([0.01, time_ypos - time_height, 0.08, time_height])
+    time_ax.set_xlim(0, 1)
+    time_ax.set_ylim(0, 1)
+    time_ax.axis('off')
+
+    # 時間選項
+    time_period_days = TIME_PERIOD_DAYS
+    time_buttons = []
+    active_time = [initial_period]
+
+    for i, period in enumerate(time_periods):
+        y_pos = 1 - (0.04 + 0.05 * i) / time_height
+        label = time_ax.text(
+            0.5, y_pos, period,
+            ha='center', va='center',
+            fontsize=11,
+            fontweight='bold',
+            color='#FF4444' if period == initial_period else '#333333',
+            bbox=dict(boxstyle='round,pad=0.4',
+                      facecolor='#FFF3CD' if period == initial_period else '#F8F9FA',
+                      edgecolor='#FF4444' if period == initial_period else '#CCCCCC',
+                      linewidth=2 if period == initial_period else 1),
+            transform=time_ax.transAxes
+        )
+        time_buttons.append(label)
+
+    # 相關係數熱圖分頁（使用時間按鈕下方的空位；熱圖在第一次開啟時才建立）
+    heat = {'label': None, 'ax': None, 'image': None, 'colorbar_ax': None, 'visible': False, 'cell': None}
+    if portfolio is not None:
+        heat['label'] = time_ax.text(
+            0.5, 1 - (0.04 + 0.05 * len(time_periods)) / time_height, 'CORR',
+            ha='center', va='center', fontsize=11, fontweight='bold', color='#333333',
+            bbox=dict(boxstyle='round,pad=0.4', facecolor='#E8F4FD', edgecolor='#3498DB', linewidth=1),
+            transform=time_ax.transAxes
+        )
+
+    # 股票選擇列：固定數量的按鈕槽位分頁顯示，點擊時由座標直接算出槽位（不逐一檢查每個標籤）
+    page_size = min(SELECTOR_PAGE_SIZE, max(num_symbols, 1))
+    paged = num_symbols > page_size
+    slot_left, slot_right = (0.04, 0.96) if paged else (0.0, 1.0)
+    slot_width = (slot_right - slot_left) / page_size
+    # matches 為目前搜尋結果（symbols 的索引，遞增排序），query 為 None 時不在搜尋模式
+    selector = {'matches': list(range(num_symbols)), 'page': 0, 'query': None}
+
+    def style_symbol_label(label, active):
+        label.set_color('#FF4444' if active else '#333333')
+        label.set_bbox(dict(boxstyle='round,pad=0.5',
+                            facecolor='#FFF3CD' if active else '#F8F9FA',
+                            edgecolor='#FF4444' if active else '#CCCCCC',
+                            linewidth=2 if active else 1))
+
+    # 儲存文字標籤資料（每個槽位一個，換頁時只更新文字）
+    radio_buttons = []
+
+    for k in range(page_size):
+        x_pos = slot_left + (k + 0.5) * slot_width
+        label = radio_ax.text(
+            x_pos, 0.5, '',
+            ha='center', va='center',
+            fontsize=13,
+            fontweight='bold',
+            transform=radio_ax.transAxes
+        )
+        radio_buttons.append(label)
+    page_buttons = [
+        radio_ax.text(x_pos, 0.5, arrow, ha='center', va='center', fontsize=12, color='#333333',
+                      visible=paged, transform=radio_ax.transAxes)
+        for x_pos, arrow in ((slot_left / 2, '◀'), (1 - slot_left / 2, '▶'))
+    ]
+    selector_status = radio_ax.text(0.5, -0.2, '', ha='center', va='top', fontsize=9, color='#666666',
+                                    transform=radio_ax.transAxes)
+
+    # 第一個預設為選取狀態
+    active_index = [0]
+    current_stock = {'index': 0}
+
+    def refresh_selector():
+        """依目前頁數與搜尋結果更新按鈕槽位的文字、選取樣式與狀態列"""
+        matches = selector['matches']
+        num_pages = max(1, -(-len(matches) // page_size))
+        selector['page'] = min(max(selector['page'], 0), num_pages - 1)
+        start = selector['page'] * page_size
+        for k, label in enumerate(radio_buttons):
+            if start + k < len(matches):
+                i = matches[start + k]
+                label.set_text(symbols[i])
+                label.set_visible(True)
+                style_symbol_label(label, i == current_stock['index'])
+            else:
+                label.set_visible(False)
+        if selector['query'] is not None:
+            selector_status.set_text(f"Search: {selector['query']}_  ({len(matches)} matches | Enter: select, Esc: clear)")
+        elif paged:
+            selector_status.set_text(f"Page {selector['page'] + 1}/{num_pages} | "
+                                     f"Left/Right: switch stock | PgUp/PgDn: page | /: search")
+        else:
+            selector_status.set_text('')
+
+    def slot_at(event):
+        """回傳滑鼠位置對應的槽位編號、'prev'、'next' 或 None"""
+        if event.x is None or event.y is None:
+            return None
+        x, y = radio_ax.transAxes.inverted().transform((event.x, event.y))
+        if not 0 <= y <= 1 or not 0 <= x <= 1:
+            return None
+        if x < slot_left:
+            return 'prev'
+        if x >= slot_right:
+            return 'next'
+        return min(int((x - slot_left) / slot_width), page_size - 1)
+
+    refresh_selector()
+
+    # 費波那契工具狀態（每個股票獨立）
+    fib_states = {}
+    for symbol in stocks_data.keys():
+        fib_states[symbol] = {
+            'active': False,
+            'step': 0,
+            'point1': None,
+            'point2': None,
+            'final_lines': [],
+            'final_texts': [],
+            'markers': [],
+            'connect_line': None,
+            'status_text': None,
+            'ignore_next_click': False
+        }
+
+    # 特殊元素（每個股票獨立）
+    special_elements = {}
+    for symbol in stocks_data.keys():
+        special_elements[symbol] = {
+            'bb_upper_line': None,
+            'bb_lower_line': None,
+            'bb_middle_line': None,
+            'bb_fill': None,
+            'fib_tool': None,
+            'lines': [],
+            'leg': None,
+            'lined': {},
+            'pyramid': None,
+        }
+
+    def get_current_symbol():
+        return symbols[current_stock['index']]
+
+    def get_current_fib_state():
+        return fib_states[get_current_symbol()]
+
+    def get_current_elements():
+        return special_elements[get_current_symbol()]
+
+    # 共用的靜態元素（只建立一次）
+    ax1.set_ylabel("Price (USD)", fontsize=12)
+    ax1.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
+    ax1.tick_params(labelbottom=False)
+    ax1.text(0.98, 0.98, 'TIP: Click legend to toggle | Fib Tool: Click-Move-Click',
+             transform=ax1.transAxes,
+             fontsize=9,
+             verticalalignment='top',
+             horizontalalignment='right',
+             bbox=dict(boxstyle='round,pad=0.4', facecolor='lightyellow', alpha=0.8))
+    ax2.set_ylabel('Volume', fontsize=12, fontweight='bold')
+    ax2.set_xlabel('Date', fontsize=12)
+    ax2.grid(True, alpha=0.3, linestyle='-', linewidth=0.5, axis='y')
+    ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1e6:.1f}M' if x >= 1e6 else f'{x/1e3:.0f}K'))
+    ax2.text(0.02, 0.95, 'Red = Up Day | Green = Down Day',
+             transform=ax2.transAxes,
+             fontsize=9,
+             verticalalignment='top',
+             bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
+    plt.setp(ax2.xaxis.get_majorticklabels(), rotation=0, ha='center')
+    ax2.xaxis.set_tick_params(labelsize=9)
+
+    displayed = {'symbol': None}
+    updating_view = [False]
+    # 目前 x 軸的模式：分鐘線的壓縮座標需要自訂刻度（saved 為切換前的日期刻度）
+    x_axis = {'compressed': False, 'pyramid': None, 'saved': None}
+
+    def symbol_artists(symbol):
+        """目前屬於此股票、切換時需要一起隱藏/顯示的所有元件"""
+        elements = special_elements[symbol]
+        fib_state = fib_states[symbol]
+        artists = list(elements['artists'])
+        artists.extend(fib_state['final_lines'])
+        artists.extend(fib_state['final_texts'])
+        artists.extend(fib_state['markers'])
+        if fib_state['status_text'] is not None:
+            artists.append(fib_state['status_text'])
+        return artists
+
+    def hide_symbol(symbol):
+        elements = special_elements[symbol]
+        elements['saved_visibility'] = {}
+        for artist in symbol_artists(symbol):
+            elements['saved_visibility'][artist] = artist.get_visible()
+            artist.set_visible(False)
+
+    def show_symbol(symbol):
+        elements = special_elements[symbol]
+        saved = elements['saved_visibility']
+        for artist in symbol_artists(symbol):
+            artist.set_visible(saved.get(artist, True))
+
+    def build_symbol_artists(symbol):
+        """為一支股票建立所有圖表元件（每支股票只建立一次）"""
+        # 初始數據只用來建立元件，apply_time_window 會依時間區間與解析度重設
+        full = ensure_indicators(stocks_data[symbol], symbol)
+        load_window_data(symbol)
+        pyramid = special_elements[symbol]['pyramid']
+        data = full.tail(DOWNSAMPLE_MIN_POINTS)
+        # 日線以日期繪製（座標軸因此使用日期刻度）；分鐘線的均線週期以 K 線根數計算
+        if compressed_axis(pyramid):
+            x = bar_positions(pyramid, pyramid.base)[0][len(full) - len(data):]
+            unit = 'bar'
+        else:
+            x = data.index
+            unit = 'day'
+        elements = special_elements[symbol]
+
+        # 繪製價格圖
+        price_line, = ax1.plot(x, data['Close'],
+                              label=f'{symbol} Close Price',
+                              linewidth=3,
+                              color='#2C3E50',
+                              zorder=10,
+                              picker=True,
+                              pickradius=5)
+        lines = [price_line]
+        series = [(price_line, 'Close')]
+        initial_visibility = {}
+
+        # 繪製移動平均線
+        for ma_name, (period, color, style) in MA_PERIODS.items():
+            if ma_name in data.columns:
+                line, = ax1.plot(x, data[ma_name],
+                                 label=f'{ma_name} ({period}-{unit})',
+                                 linewidth=2.5,
+                                 color=color,
+                                 linestyle=style,
+                                 alpha=1.0,
+                                 picker=True,
+                                 pickradius=5,
+                                 visible=False)
+                lines.append(line)
+                series.append((line, ma_name))
+
+        # 繪製與價格同尺度的自訂指標（--indicator 加入的 SMA、EMA、VWAP、布林通道）
+        for name, (label, color, style) in INDICATOR_OVERLAYS.items():
+            if name in data.columns:
+                line, = ax1.plot(x, data[name],
+                                 label=label.format(unit=unit),
+                                 linewidth=2,
+                                 color=color,
+                                 linestyle=style,
+                                 picker=True,
+                                 pickradius=5,
+                                 visible=False)
+                lines.append(line)
+                series.append((line, name))
+
+        # 繪製布林通道
+        band_artists = []
+        if 'BB_upper' in data.columns and not data['BB_upper'].isnull().all():
+            bb_upper, = ax1.plot(x, data['BB_upper'],
+                                label='Bollinger Bands',
+                                linewidth=1.5,
+                                color='#FF6B9D',
+                                linestyle='--',
+                                alpha=0.7,
+                                picker=True,
+                                pickradius=5,
+                                visible=False)
+            elements['bb_upper_line'] = bb_upper
+            lines.append(bb_upper)
+            series.append((bb_upper, 'BB_upper'))
+
+            bb_middle, = ax1.plot(x, data['BB_middle'],
+                                 linewidth=1,
+                                 color='#FF6B9D',
+                                 linestyle=':',
+                                 alpha=0.5,
+                                 visible=False)
+            elements['bb_middle_line'] = bb_middle
+            series.append((bb_middle, 'BB_middle'))
+
+            bb_lower, = ax1.plot(x, data['BB_lower'],
+                                linewidth=1.5,
+                                color='#FF6B9D',
+                                linestyle='--',
+                                alpha=0.7,
+                                visible=False)
+            elements['bb_lower_line'] = bb_lower
+            series.append((bb_lower, 'BB_lower'))
+
+            bb_fill = ax1.fill_between(x,
+                                       data['BB_upper'],
+                                       data['BB_lower'],
+                                       alpha=0.1,
+                                       color='#FF6B9D',
+                                       visible=False)
+            elements['bb_fill'] = bb_fill
+            band_artists = [bb_middle, bb_lower, bb_fill]
+
+        # 添加費波那契工具
+        fib_tool_line, = ax1.plot([], [],
+                                  label='[Fib] Fibonacci Tool (Click to Draw)',
+                                  linewidth=0,
+                                  marker='o',
+                                  markersize=8,
+                                  color='orange',
+                                  picker=True,
+                                  pickradius=5)
+        elements['fib_tool'] = fib_tool_line
+        lines.append(fib_tool_line)
+
+        # 最新價格標註
+        latest_price = data['Close'].iloc[-1]
+        annotation = ax1.annotate(f'Latest: ${latest_price:.2f}',
+                                  xy=(x[-1], latest_price),
+                                  xytext=(10, 10), textcoords='offset points',
+                                  bbox=dict(boxstyle='round,pad=0.5', facecolor='yellow', alpha=0.7),
+                                  fontsize=11,
+                                  fontweight='bold',
+                                  arrowprops=dict(arrowstyle='->', color='black', lw=1.5))
+
+        # 繪製成交量圖（單一 PolyCollection，切換區間時只更新頂點與顏色）
+        volume_bars = None
+        if 'Volume' in data.columns:
+            stock = stocks_data[symbol]
+            if 'volume_colors' not in stock:
+                stock['volume_colors'] = compute_volume_colors(stock['data_full']['Close'])
+            volume_bars = PolyCollection([], alpha=0.7, edgecolors='none')
+            ax2.add_collection(volume_bars)
+        elements['volume_bars'] = volume_bars
+
+        # 創建圖例（每支股票一個 Legend 物件，切換時只切換可見度）
+        leg = Legend(ax1, lines, [line.get_label() for line in lines],
+                     loc='upper left',
+                     fontsize=11,
+                     framealpha=0.95,
+                     edgecolor='black',
+                     fancybox=True,
+                     shadow=True)
+        ax1.add_artist(leg)
+        elements['leg'] = leg
+        elements['lines'] = lines
+
+        # 設定圖例可互動
+        lined = {}
+        for legline, origline in zip(leg.get_lines(), lines):
+            legline.set_picker(True)
+            legline.set_pickradius(5)
+            legline.set_linewidth(4)
+            legline.set_alpha(1.0)
+            legline.set_visible(True)
+            try:
+                legline.set_color(origline.get_color())
+            except Exception:
+                pass
+            try:
+                legline.set_linestyle(origline.get_linestyle())
+            except Exception:
+                pass
+            lined[legline] = origline
+        elements['lined'] = lined
+
+        elements['annotation'] = annotation
+        elements['artists'] = lines + band_artists + [annotation, leg]
+        if volume_bars is not None:
+            elements['artists'].append(volume_bars)
+        for artist in elements['artists']:
+            initial_visibility[artist] = artist.get_visible()
+        elements['saved_visibility'] = initial_visibility
+        elements['series'] = series
+
+    def load_window_data(symbol):
+        """建立或增量更新此股票的 BarPyramid，並清除各解析度的繪圖陣列（建立元件或即時更新後呼叫）
+
+        BarPyramid 與其他圖表元件一起存在 special_elements：精簡模式的 stocks_data 每次取用都可能重建 dict，
+        寫入其中的欄位不會保留。
+        """
+        elements = special_elements[symbol]
+        data = stocks_data[symbol]['data_full']
+        if elements['pyramid'] is None:
+            elements['pyramid'] = BarPyramid(data)
+        else:
+            elements['pyramid'].update(data)
+        elements['resolutions'] = {}
+
+    def resolution_arrays(symbol, level):
+        """某個解析度全部 K 線的數據、x 座標、成交量柱頂點與顏色（每個解析度第一次使用時計算）"""
+        elements = special_elements[symbol]
+        arrays = elements['resolutions'].get(level)
+        if arrays is not None:
+            return arrays
+        pyramid = elements['pyramid']
+        bars = pyramid.bars(level)
+        x, left, right = bar_positions(pyramid, level)
+        arrays = {'data': bars, 'x': x, 'left': left, 'right': right}
+        if 'Volume' in bars.columns:
+            volume = bars['Volume'].to_numpy(dtype=np.float64)
+            arrays['bar_verts'] = np.stack([
+                np.column_stack([left, np.zeros_like(volume)]),
+                np.column_stack([left, volume]),
+                np.column_stack([right, volume]),
+                np.column_stack([right, np.zeros_like(volume)]),
+            ], axis=1)
+            arrays['colors'] = (stocks_data[symbol]['volume_colors'] if level == pyramid.base
+                                else compute_volume_colors(bars['Close']))
+        elements['resolutions'][level] = arrays
+        return arrays
+
+    def refresh_symbol_data(symbol):
+        """即時模式收到新 K 線後更新此股票的元件；只有目前顯示的股票需要重設數據"""
+        elements = special_elements[symbol]
+        if 'artists' not in elements:
+            return False
+        load_window_data(symbol)
+        pyramid = elements['pyramid']
+        latest_price = pyramid.data['Close'].iloc[-1]
+        elements['annotation'].set_text(f'Latest: ${latest_price:.2f}')
+        elements['annotation'].xy = (bar_positions(pyramid, pyramid.base)[0][-1], latest_price)
+        if symbol != displayed['symbol']:
+            return False
+        apply_time_window(symbol)
+        return True
+
+    def fill_verts(x, upper, lower):
+        """計算與 fill_between 相同的布林通道填色多邊形頂點"""
+        valid = ~(np.isnan(upper) | np.isnan(lower))
+        x, upper, lower = x[valid], upper[valid], lower[valid]
+        if len(x) == 0:
+            return np.empty((0, 2))
+        return np.concatenate([
+            [[x[0], lower[0]]],
+            np.column_stack([x, upper]),
+            [[x[-1], lower[-1]]],
+            np.column_stack([x[::-1], lower[::-1]]),
+        ])
+
+    def apply_time_window(symbol):
+        """依目前的時間區間選擇解析度（日 / 週 / 月線），更新標題、座標範圍，並重新取樣可見區間的數據"""
+        current_time = active_time[0]
+        elements = special_elements[symbol]
+        max_bars = max(int(ax1.bbox.width / RESOLUTION_PIXELS_PER_BAR), DOWNSAMPLE_MIN_POINTS)
+        pyramid = elements['pyramid']
+        level, first = pyramid.select(pyramid.session_start(time_period_days[current_time]), max_bars)
+        arrays = resolution_arrays(symbol, level)
+        data = arrays['data'].iloc[first:]
+        x = arrays['x'][first:]
+        elements['resolution'] = level
+
+        resolution = '' if level == 'D' else f" ({RESOLUTIONS[level][0]} Bars)"
+        ax1.set_title(f"{symbol} - {current_time} Price Chart with Technical Indicators{resolution}",
+                      fontsize=16, fontweight='bold', pad=12)
+
+        view = {
+            'x': x,
+            'columns': {column: data[column].to_numpy(dtype=np.float64)
+                        for _, column in elements['series']}
+        }
+        if elements.get('bb_fill') is not None:
+            view['columns']['BB_upper'] = data['BB_upper'].to_numpy(dtype=np.float64)
+            view['columns']['BB_lower'] = data['BB_lower'].to_numpy(dtype=np.float64)
+        if elements['volume_bars'] is not None:
+            colors = arrays['colors'][first:].copy()
+            colors[0] = VOLUME_FLAT_COLOR
+            view['volume'] = data['Volume'].to_numpy(dtype=np.float64)
+            view['bar_verts'] = arrays['bar_verts'][first:]
+            view['colors'] = colors
+        elements['view'] = view
+
+        x0, x1 = arrays['left'][first], arrays['right'][-1]
+        pad = (x1 - x0) * 0.05
+        configure_x_axis(pyramid)
+        updating_view[0] = True
+        ax1.set_xlim(x0 - pad, x1 + pad)
+        updating_view[0] = False
+
+        price_columns = [c for c in ['Close', 'BB_upper', 'BB_lower'] + list(MA_PERIODS.keys()) + list(INDICATOR_OVERLAYS)
+                         if c in data.columns]
+        values = data[price_columns].to_numpy(dtype=np.float64)
+        low, high = np.nanmin(values), np.nanmax(values)
+        margin = (high - low) * 0.05 or abs(high) * 0.05 or 1.0
+        ax1.set_ylim(low - margin, high + margin)
+
+        if elements['volume_bars'] is not None:
+            max_volume = np.nanmax(view['volume'])
+            ax2.set_ylim(0, max_volume * 1.05 if max_volume > 0 else 1)
+
+        render_view(symbol)
+
+    def configure_x_axis(pyramid):
+        """分鐘線的壓縮座標改用整數刻度，並把 K 線序號顯示為日期與時間；日線沿用日期刻度"""
+        x_axis['pyramid'] = pyramid
+        compressed = compressed_axis(pyramid)
+        if compressed == x_axis['compressed']:
+            return
+        x_axis['compressed'] = compressed
+        if compressed:
+            x_axis['saved'] = (ax2.xaxis.get_major_locator(), ax2.xaxis.get_major_formatter())
+            ax2.xaxis.set_major_locator(MaxNLocator(nbins=8, integer=True))
+            ax2.xaxis.set_major_formatter(FuncFormatter(
+                lambda x, pos: format_bar_time(x_axis['pyramid'].data.index, x)))
+        else:
+            locator, formatter = x_axis['saved']
+            ax2.xaxis.set_major_locator(locator)
+            ax2.xaxis.set_major_formatter(formatter)
+
+    def render_view(symbol):
+        """只把目前 x 範圍內的數據送進繪圖元件，點數超過座標軸像素寬度時降採樣"""
+        elements = special_elements[symbol]
+        view = elements['view']
+        x = view['x']
+        xmin, xmax = ax1.get_xlim()
+        lo = max(int(np.searchsorted(x, xmin)) - 1, 0)
+        hi = min(int(np.searchsorted(x, xmax, side='right')) + 1, len(x))
+        if hi - lo < 2:
+            lo, hi = 0, len(x)
+        max_points = max(int(ax1.bbox.width), DOWNSAMPLE_MIN_POINTS)
+        xs = x[lo:hi]
+
+        for line, column in elements['series']:
+            y = view['columns'][column][lo:hi]
+            idx = lttb_indices(xs, y, max_points)
+            line.set_data(xs[idx], y[idx])
+        if elements.get('bb_fill') is not None:
+            upper = view['columns']['BB_upper'][lo:hi]
+            lower = view['columns']['BB_lower'][lo:hi]
+            idx = lttb_indices(xs, upper, max_points)
+            elements['bb_fill'].set_verts([fill_verts(xs[idx], upper[idx], lower[idx])])
+        if elements['volume_bars'] is not None:
+            idx = minmax_indices(view['volume'][lo:hi], max_points // 2)
+            elements['volume_bars'].set_verts(view['bar_verts'][lo:hi][idx])
+            elements['volume_bars'].set_facecolor(list(view['colors'][lo:hi][idx]))
+
+    def on_xlim_changed(ax):
+        """縮放 / 平移後依新的可見範圍重新取樣"""
+        symbol = displayed['symbol']
+        if updating_view[0] or symbol is None or 'view' not in special_elements[symbol]:
+            return
+        render_view(symbol)
+
+    def style_heatmap_label(active):
+        heat['label'].set_color('#FF4444' if active else '#333333')
+        heat['label'].set_bbox(dict(boxstyle='round,pad=0.4',
+                                    facecolor='#FFF3CD' if active else '#E8F4FD',
+                                    edgecolor='#FF4444' if active else '#3498DB',
+                                    linewidth=2 if active else 1))
+
+    def show_heatmap():
+        """隱藏價格圖與成交量圖，改為顯示相關係數熱圖"""
+        if heat['ax'] is None:
+            heat['ax'] = fig.add_subplot(gs[:, 0])
+            axes_before = set(fig.axes)
+            heat['image'] = draw_correlation_heatmap(fig, heat['ax'], portfolio)
+            heat['colorbar_ax'] = (set(fig.axes) - axes_before).pop()
+        else:
+            refresh_heatmap()
+        clear_fib_preview()
+        ax1.set_visible(False)
+        ax2.set_visible(False)
+        heat['ax'].set_visible(True)
+        heat['colorbar_ax'].set_visible(True)
+        heat['ax'].set_xlabel('Hover a cell for the pair correlation | Click a cell to open its chart', fontsize=10)
+        heat['visible'] = True
+        style_heatmap_label(True)
+        fig.canvas.draw_idle()
+
+    def hide_heatmap():
+        heat['ax'].set_visible(False)
+        heat['colorbar_ax'].set_visible(False)
+        ax1.set_visible(True)
+        ax2.set_visible(True)
+        heat['visible'] = False
+        style_heatmap_label(False)
+
+    def refresh_heatmap():
+        """即時模式更新後重設熱圖數據與標題（股票排列順序不變）"""
+        if heat['image'] is None:
+            return
+        order = portfolio.heatmap_order()
+        heat['image'].set_data(portfolio.correlation()[np.ix_(order, order)])
+        heat['ax'].set_title(portfolio_title(portfolio.summary()), fontsize=12, fontweight='bold')
+
+    def heatmap_cell(event):
+        """滑鼠位置對應的 (列股票, 欄股票, 相關係數)，不在熱圖內時回傳 None"""
+        if event.xdata is None or event.ydata is None:
+            return None
+        order = portfolio.heatmap_order()
+        row, col = int(round(event.ydata)), int(round(event.xdata))
+        if not (0 <= row < len(order) and 0 <= col < len(order)):
+            return None
+        i, j = order[row], order[col]
+        return portfolio.symbols[i], portfolio.symbols[j], heat['image'].get_array()[row, col]
+
+    def on_heatmap_motion(event):
+        cell = heatmap_cell(event)
+        if cell is None or cell[:2] == heat['cell']:
+            return
+        heat['cell'] = cell[:2]
+        heat['ax'].set_xlabel(f"{cell[0]} / {cell[1]}: correlation {cell[2]:.2f} | Click to open {cell[0]}",
+                              fontsize=10)
+        fig.canvas.draw_idle()
+
+    def on_heatmap_click(event):
+        cell = heatmap_cell(event)
+        if cell is None or cell[0] not in symbol_index:
+            return
+        if symbol_index[cell[0]] not in selector['matches']:
+            selector['matches'] = list(range(num_symbols))
+        select_position(selector['matches'].index(symbol_index[cell[0]]))
+
+    def draw_stock_chart(symbol):
+        """切換股票或時間區間：重用已建立的元件，只更新可見度與座標範圍"""
+        if heat['visible']:
+            hide_heatmap()
+        if 'artists' not in special_elements[symbol]:
+            build_symbol_artists(symbol)
+        if displayed['symbol'] != symbol:
+            if displayed['symbol'] is not None:
+                clear_fib_preview()
+                hide_symbol(displayed['symbol'])
+            show_symbol(symbol)
+            displayed['symbol'] = symbol
+            prefetch_neighbours(symbol)
+        apply_time_window(symbol)
+        fig.canvas.draw_idle()
+
+    # 背景執行緒預先計算相鄰股票的指標（精簡模式的視圖有 LRU 上限，不預先建立）
+    prewarm_executor = None
+    if prewarm and num_symbols > 1 and isinstance(stocks_data, dict):
+        prewarm_executor = ThreadPoolExecutor(max_workers=1)
+        fig.canvas.mpl_connect('close_event', lambda event: prewarm_executor.shutdown(wait=False))
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+
+    # 切換後在事件迴圈空閒時預先建立相鄰股票的圖表元件（建立後隱藏，一次只建立一支）
+    prefetch_queue = []
+    prefetch_timer = None
+    if prewarm and num_symbols > 1:
+        prefetch_timer = fig.canvas.new_timer(interval=SELECTOR_PREFETCH_DELAY_MS)
+        prefetch_timer.single_shot = True
+
+    def prefetch_render_state():
+        while prefetch_queue:
+            symbol = prefetch_queue.pop(0)
+            if 'artists' not in special_elements[symbol]:
+                build_symbol_artists(symbol)
+                hide_symbol(symbol)
+                break
+        if prefetch_queue:
+            prefetch_timer.start()
+
+    if prefetch_timer is not None:
+        prefetch_timer.add_callback(prefetch_render_state)
+
+    def neighbour_symbols(symbol):
+        """目前搜尋結果中前後相鄰的股票"""
+        matches = selector['matches']
+        index = symbol_index[symbol]
+        pos = bisect.bisect_left(matches, index)
+        found = pos < len(matches) and matches[pos] == index
+        return [symbols[matches[p]] for p in ((pos + 1, pos - 1) if found else (pos, pos - 1))
+                if 0 <= p < len(matches)]
+
+    def prefetch_neighbours(symbol):
+        neighbours = neighbour_symbols(symbol)
+        if prewarm_executor is not None:
+            for neighbour in neighbours:
+                prewarm_executor.submit(ensure_indicators, stocks_data[neighbour], neighbour)
+        if prefetch_timer is not None:
+            prefetch_queue[:] = [n for n in neighbours if 'artists' not in special_elements[n]]
+            if prefetch_queue:
+                prefetch_timer.start()
+
+    # 費波那契預覽元件池（所有股票共用，只更新座標；支援時以 blit 只重繪價格圖區域）
+    use_blit = fig.canvas.supports_blit
+    fib_preview = {
+        'lines': [],
+        'texts': [],
+        'connect': None,
+        'background': None,
+        'frame_times': []
+    }
+    for level in FIBONACCI_LEVELS:
+        line = ax1.axhline(y=0,
+                           color=FIBONACCI_COLORS[level],
+                           linestyle=':',
+                           linewidth=1.5 if level == 0.618 else 1,
+                           alpha=0.4,
+                           animated=use_blit,
+                           visible=False)
+        fib_preview['lines'].append(line)
+        text = ax1.text(0, 0, '',
+                        verticalalignment='center',
+                        color=FIBONACCI_COLORS[level],
+                        fontsize=8,
+                        fontweight='bold' if level == 0.618 else 'normal',
+                        alpha=0.6,
+                        animated=use_blit,
+                        visible=False)
+        fib_preview['texts'].append(text)
+    fib_preview['connect'], = ax1.plot([], [], 'gray', linestyle=':', alpha=0.3, linewidth=1,
+                                       animated=use_blit, visible=False)
+    def preview_bbox():
+        # 預覽文字位於最後一根 K 線右側，可能超出價格圖，因此 blit 區域延伸到圖表右緣
+        return Bbox.from_extents(ax1.bbox.x0, ax1.bbox.y0, fig.bbox.x1, ax1.bbox.y1)
+
+    def preview_artists():
+        return fib_preview['lines'] + fib_preview['texts'] + [fib_preview['connect']]
+
+    def capture_fib_background(event=None):
+        """完整重繪後擷取不含預覽元件的背景（draw_event 時自動更新）"""
+        if use_blit and get_current_fib_state()['active'] and get_current_fib_state()['step'] == 1:
+            fib_preview['background'] = fig.canvas.copy_from_bbox(preview_bbox())
+
+    def update_fib_preview(x1, y1, x2, y2):
+        """原地更新預覽元件座標，並只重繪價格圖區域"""
+        start = time.perf_counter()
+        high_price = max(y1, y2)
+        low_price = min(y1, y2)
+        price_range = high_price - low_price
+        visible = price_range >= 0.01
+        text_x = special_elements[get_current_symbol()]['view']['x'][-1]
+        for level, line, text in zip(FIBONACCI_LEVELS, fib_preview['lines'], fib_preview['texts']):
+            price = high_price - (price_range * level)
+            line.set_ydata([price, price])
+            line.set_visible(visible)
+            text.set_position((text_x, price))
+            text.set_text(f'  {level * 100:.1f}% (${price:.2f})')
+            text.set_visible(visible)
+        fib_preview['connect'].set_data([x1, x2], [y1, y2])
+        fib_preview['connect'].set_visible(True)
+
+        if use_blit and fib_preview['background'] is not None:
+            fig.canvas.restore_region(fib_preview['background'])
+            for artist in preview_artists():
+                ax1.draw_artist(artist)
+            fig.canvas.blit(preview_bbox())
+        else:
+            fig.canvas.draw_idle()
+        fib_preview['frame_times'].append(time.perf_counter() - start)
+
+    # 費波那契工具函數
+    def clear_fib_preview():
+        for artist in preview_artists():
+            artist.set_visible(False)
+        fib_preview['background'] = None
+        frame_times = fib_preview['frame_times']
+        if frame_times:
+            mode = 'blit' if use_blit else 'full redraw'
+            print(f"[Fib] Preview ({mode}): {len(frame_times)} frames, "
+                  f"avg {np.mean(frame_times) * 1000:.2f} ms, max {np.max(frame_times) * 1000:.2f} ms")
+            fib_preview['frame_times'] = []
+
+    def clear_fib_final():
+        fib_state = get_current_fib_state()
+        for line in fib_state['final_lines']:
+            try:
+                line.remove()
+            except (ValueError, AttributeError):
+                pass
+        for text in fib_state['final_texts']:
+            try:
+                text.remove()
+            except (ValueError, AttributeError):
+                pass
+        for marker in fib_state['markers']:
+            try:
+                marker.remove()
+            except (ValueError, AttributeError):
+                pass
+        fib_state['final_lines'] = []
+        fib_state['final_texts'] = []
+        fib_state['markers'] = []
+
+    def update_status_text(message):
+        fib_state = get_current_fib_state()
+        if fib_state['status_text'] is not None:
+            try:
+                fib_state['status_text'].remove()
+            except (ValueError, AttributeError):
+                pass
+        fib_state['status_text'] = ax1.text(0.5, 1.02, message,
+                                            transform=ax1.transAxes,
+                                            ha='center',
+                                            fontsize=10,
+                                            bbox=dict(boxstyle='round,pad=0.5',
+                                                      facecolor='lightyellow',
+                                                      alpha=0.9))
+
+    def draw_fib_lines(x1, y1, x2, y2):
+        fib_state = get_current_fib_state()
+        symbol = get_current_symbol()
+        text_x = special_elements[symbol]['view']['x'][-1]
+
+        high_price = max(y1, y2)
+        low_price = min(y1, y2)
+        price_range = high_price - low_price
+
+        if price_range < 0.01:
+            return
+
+        lines_list = fib_state['final_lines']
+        texts_list = fib_state['final_texts']
+        alpha_val = 0.8
+        linestyle = '--'
+        linewidth = 1.5
+
+        for level in FIBONACCI_LEVELS:
+            price = high_price - (price_range * level)
+            color = FIBONACCI_COLORS[level]
+
+            line = ax1.axhline(y=price,
+                               color=color,
+                               linestyle=linestyle,
+                               linewidth=linewidth if level != 0.618 else linewidth + 0.5,
+                               alpha=alpha_val)
+            lines_list.append(line)
+
+            percentage = level * 100
+            label = f'{percentage:.1f}%'
+            if level == 0.618:
+                label += ' *GOLD*'
+
+            text = ax1.text(text_x, price,
+                            f'  {label} (${price:.2f})',
+                            verticalalignment='center',
+                            color=color,
+                            fontsize=9,
+                            fontweight='bold' if level == 0.618 else 'normal',
+                            alpha=alpha_val + 0.2)
+            texts_list.append(text)
+
+    def on_fib_click(event):
+        fib_state = get_current_fib_state()
+        if not fib_state['active']:
+            return
+        if fib_state['ignore_next_click']:
+            fib_state['ignore_next_click'] = False
+            return
+        if event.inaxes != ax1:
+            return
+        xdata = event.xdata
+        ydata = event.ydata
+        if xdata is None or ydata is None:
+            return
+        if fib_state['step'] == 0:
+            fib_state['point1'] = (xdata, ydata)
+            fib_state['step'] = 1
+            marker = ax1.plot(xdata, ydata, 'ro', markersize=8, zorder=20)[0]
+            fib_state['markers'].append(marker)
+            vline = ax1.axvline(x=xdata, color='red', linestyle=':', alpha=0.5, linewidth=1)
+            hline = ax1.axhline(y=ydata, color='red', linestyle=':', alpha=0.5, linewidth=1)
+            fib_state['markers'].extend([vline, hline])
+            update_status_text(f'[Fib] Step 2: Move mouse to preview, click to confirm | First: ${ydata:.2f} | ESC to cancel')
+            if use_blit:
+                # 立即完整重繪一次，draw_event 會擷取預覽用的背景
+                fig.canvas.draw()
+            else:
+                fig.canvas.draw_idle()
+        elif fib_state['step'] == 1:
+            fib_state['point2'] = (xdata, ydata)
+            fib_state['step'] = 2
+            marker = ax1.plot(xdata, ydata, 'bo', markersize=8, zorder=20)[0]
+            fib_state['markers'].append(marker)
+            vline = ax1.axvline(x=xdata, color='blue', linestyle=':', alpha=0.5, linewidth=1)
+            hline = ax1.axhline(y=ydata, color='blue', linestyle=':', alpha=0.5, linewidth=1)
+            fib_state['markers'].extend([vline, hline])
+            clear_fib_preview()
+            x1, y1 = fib_state['point1']
+            x2, y2 = fib_state['point2']
+            draw_fib_lines(x1, y1, x2, y2)
+            fib_state['connect_line'] = ax1.plot([x1, x2], [y1, y2],
+                                                'k--', alpha=0.3, linewidth=1)[0]
+            fib_state['final_lines'].append(fib_state['connect_line'])
+            high = max(y1, y2)
+            low = min(y1, y2)
+            update_status_text(f'[OK] Fibonacci set! High: ${high:.2f} | Low: ${low:.2f} | Range: ${high-low:.2f} | Click tool to redraw')
+            fib_state['active'] = False
+            fig.canvas.draw_idle()
+
+    def on_fib_motion(event):
+        fib_state = get_current_fib_state()
+        if not fib_state['active'] or fib_state['step'] != 1 or event.inaxes != ax1:
+            return
+        xdata = event.xdata
+        ydata = event.ydata
+        if xdata is None or ydata is None:
+            return
+        x1, y1 = fib_state['point1']
+        update_fib_preview(x1, y1, xdata, ydata)
+
+    # 方向鍵與 Home 用於切換股票，從 matplotlib 工具列的預設快捷鍵中移除
+    if num_symbols > 1:
+        for name in ('keymap.back', 'keymap.forward', 'keymap.home'):
+            plt.rcParams[name] = [k for k in plt.rcParams[name] if k not in ('left', 'right', 'home')]
+    saved_keymaps = {}
+
+    def select_position(pos):
+        """選取搜尋結果中第 pos 個股票，並換到它所在的頁面"""
+        i = selector['matches'][pos]
+        active_index[0] = i
+        current_stock['index'] = i
+        selector['page'] = pos // page_size
+        refresh_selector()
+        draw_stock_chart(symbols[i])
+
+    def change_page(step):
+        selector['page'] += step
+        refresh_selector()
+        fig.canvas.draw_idle()
+
+    def update_search(query):
+        selector['query'] = query
+        selector['matches'] = [i for i, symbol in enumerate(symbols) if query in symbol.upper()]
+        selector['page'] = 0
+        refresh_selector()
+
+    def start_search():
+        # 搜尋時暫停工具列快捷鍵，避免輸入 s、q 等字母時觸發存檔或關閉視窗
+        for name in [k for k in plt.rcParams if k.startswith('keymap.')]:
+            saved_keymaps[name] = plt.rcParams[name]
+            plt.rcParams[name] = []
+        update_search('')
+
+    def end_search(clear):
+        selector['query'] = None
+        for name, keys in saved_keymaps.items():
+            plt.rcParams[name] = keys
+        saved_keymaps.clear()
+        if clear:
+            selector['matches'] = list(range(num_symbols))
+            selector['page'] = current_stock['index'] // page_size
+        refresh_selector()
+
+    def on_selector_key(event):
+        """股票選擇列的鍵盤操作（左右切換、翻頁、/ 搜尋），有處理時回傳 True"""
+        key = event.key
+        if selector['query'] is not None:
+            if key == 'escape':
+                end_search(clear=True)
+            elif key == 'enter':
+                end_search(clear=False)
+                if selector['matches']:
+                    select_position(0)
+                    return True
+            elif key == 'backspace':
+                update_search(selector['query'][:-1])
+            elif key is not None and len(key) == 1 and key.isprintable():
+                update_search(selector['query'] + key.upper())
+            fig.canvas.draw_idle()
+            return True
+        if num_symbols < 2:
+            return False
+        matches = selector['matches']
+        if key in ('left', 'right', 'home', 'end'):
+            if not matches:
+                return True
+            pos = bisect.bisect_left(matches, current_stock['index'])
+            found = pos < len(matches) and matches[pos] == current_stock['index']
+            target = {'left': pos - 1, 'right': pos + 1 if found else pos,
+                      'home': 0, 'end': len(matches) - 1}[key]
+            select_position(min(max(target, 0), len(matches) - 1))
+            return True
+        if key in ('pageup', 'pagedown'):
+            change_page(-1 if key == 'pageup' else 1)
+            return True
+        if key == '/':
+            start_search()
+            fig.canvas.draw_idle()
+            return True
+        return False
+
+    def on_key_press(event):
+        if on_selector_key(event):
+            return
+        fib_state = get_current_fib_state()
+        if event.key == 'escape':
+            if fib_state['active']:
+                fib_state['active'] = False
+                fib_state['step'] = 0
+                fib_state['point1'] = None
+                fib_state['point2'] = None
+                fib_state['ignore_next_click'] = False
+                clear_fib_preview()
+                for marker in fib_state['markers']:
+                    try:
+                        marker.remove()
+                    except (ValueError, AttributeError):
+                        pass
+                fib_state['markers'] = []
+                if fib_state['status_text'] is not None:
+                    try:
+                        fib_state['status_text'].remove()
+                    except (ValueError, AttributeError):
+                        pass
+                    fib_state['status_text'] = None
+                fig.canvas.draw()
+            elif len(fib_state['final_lines']) > 0 or len(fib_state['final_texts']) > 0 or len(fib_state['markers']) > 0:
+                clear_fib_final()
+                if fib_state['status_text'] is not None:
+                    try:
+                        fib_state['status_text'].remove()
+                    except (ValueError, AttributeError):
+                        pass
+                    fib_state['status_text'] = None
+                fig.canvas.draw()
+
+    def on_pick(event):
+        elements = get_current_elements()
+        fib_state = get_current_fib_state()
+        legline = event.artist
+        if legline in elements['lined']:
+            origline = elements['lined'][legline]
+            if origline == elements.get('fib_tool'):
+                if len(fib_state['final_lines']) > 0 or len(fib_state['final_texts']) > 0 or len(fib_state['markers']) > 0:
+                    clear_fib_final()
+                    if fib_state['status_text'] is not None:
+                        try:
+                            fib_state['status_text'].remove()
+                        except (ValueError, AttributeError):
+                            pass
+                        fib_state['status_text'] = None
+                if not fib_state['active']:
+                    fib_state['active'] = True
+                    fib_state['step'] = 0
+                    fib_state['point1'] = None
+                    fib_state['point2'] = None
+                    fib_state['ignore_next_click'] = True
+                    clear_fib_final()
+                    clear_fib_preview()
+                    update_status_text('[Fib] Step 1: Click on the FIRST point (High or Low) | ESC to cancel')
+                    fig.canvas.draw_idle()
+                return
+            visible = not origline.get_visible()
+            origline.set_visible(visible)
+            if origline == elements.get('bb_upper_line'):
+                if elements.get('bb_lower_line') is not None:
+                    elements['bb_lower_line'].set_visible(visible)
+                if elements.get('bb_middle_line') is not None:
+                    elements['bb_middle_line'].set_visible(visible)
+                if elements.get('bb_fill') is not None:
+                    elements['bb_fill'].set_visible(visible)
+            fig.canvas.draw()
+
+    def on_button_click(event):
+        if heat['label'] is not None and heat['label'].contains(event)[0]:
+            if heat['visible']:
+                draw_stock_chart(get_current_symbol())
+            else:
+                show_heatmap()
+            return
+        time_clicked = False
+        for i, label in enumerate(time_buttons):
+            contains, _ = label.contains(event)
+            if contains:
+                time_clicked = True
+                old_time = active_time[0]
+                active_time[0] = time_periods[i]
+                print(f"Time period changed from {old_time} to {active_time[0]}")
+                for j, lbl in enumerate(time_buttons):
+                    if j == i:
+                        lbl.set_color('#FF4444')
+                        lbl.set_bbox(dict(boxstyle='round,pad=0.4',
+                                          facecolor='#FFF3CD',
+                                          edgecolor='#FF4444',
+                                          linewidth=2))
+                    else:
+                        lbl.set_color('#333333')
+                        lbl.set_bbox(dict(boxstyle='round,pad=0.4',
+                                          facecolor='#F8F9FA',
+                                          edgecolor='#CCCCCC',
+                                          linewidth=1))
+                current_symbol = get_current_symbol()
+                print(f"Redrawing chart for {current_symbol}")
+                draw_stock_chart(current_symbol)
+                return
+        if not time_clicked:
+            slot = slot_at(event)
+            if slot in ('prev', 'next'):
+                if paged:
+                    change_page(-1 if slot == 'prev' else 1)
+            elif slot is not None:
+                pos = selector['page'] * page_size + slot
+                if pos < len(selector['matches']):
+                    select_position(pos)
+
+    def run_handler(name, handler, event):
+        if profiler is None:
+            handler(event)
+        else:
+            profiler.call(name, handler, event)
+
+    def dispatch(event):
+        """單一事件入口：依事件類型與所在座標軸只呼叫相關的處理函式"""
+        name = event.name
+        if name == 'motion_notify_event':
+            # 滑鼠移動最頻繁，只有在價格圖內且費波那契工具等待第二點時才處理
+            if event.inaxes is ax1:
+                fib_state = get_current_fib_state()
+                if fib_state['active'] and fib_state['step'] == 1:
+                    run_handler('fib_motion', on_fib_motion, event)
+            elif heat['visible'] and event.inaxes is heat['ax']:
+                run_handler('heatmap_motion', on_heatmap_motion, event)
+        elif name == 'button_press_event':
+            # pick_event 由同一次點擊先觸發，圖例位於價格圖內，因此 ignore_next_click 仍由 on_fib_click 處理
+            if event.inaxes is ax1:
+                run_handler('fib_click', on_fib_click, event)
+            elif event.inaxes is radio_ax or event.inaxes is time_ax:
+                run_handler('button_click', on_button_click, event)
+            elif heat['visible'] and event.inaxes is heat['ax']:
+                run_handler('heatmap_click', on_heatmap_click, event)
+        elif name == 'pick_event':
+            run_handler('pick', on_pick, event)
+        elif name == 'key_press_event':
+            run_handler('key_press', on_key_press, event)
+        elif name == 'draw_event':
+            run_handler('fib_background', capture_fib_background, event)
+
+    # 綁定事件（每種事件只連接一次分派器）
+    for event_name in ('button_press_event', 'pick_event', 'motion_notify_event', 'key_press_event', 'draw_event'):
+        fig.canvas.mpl_connect(event_name, dispatch)
+    if profiler is not None:
+        profiler.attach(fig.canvas)
+        fig.canvas.mpl_connect('close_event', lambda event: profiler.report())
+
+    # 即時模式：計時器定期套用背景執行緒收到的新 K 線，只在目前顯示的股票有變動時重繪
+    if live_updater is not None:
+        live_timer = fig.canvas.new_timer(interval=int(live_interval * 1000))
+
+        def on_live_tick():
+            start = time.perf_counter()
+            changed = live_updater.drain()
+            redraw = False
+            for symbol in changed:
+                if symbol in stocks_data:
+                    redraw = refresh_symbol_data(symbol) or redraw
+            if portfolio is not None and changed:
+                portfolio.refresh({symbol: live_updater.frame(symbol) for symbol in changed})
+                if heat['visible']:
+                    refresh_heatmap()
+                    redraw = True
+            if redraw:
+                fig.canvas.draw_idle()
+            live_updater.tick_times.append(time.perf_counter() - start)
+
+        def on_close(event):
+            live_timer.stop()
+            live_updater.stop()
+
+        live_timer.add_callback(on_live_tick)
+        live_updater.timer = live_timer
+        fig.canvas.mpl_connect('close_event', on_close)
+        live_timer.start()
+    ax1.callbacks.connect('xlim_changed', on_xlim_changed)
+
+    # 添加說明文字
+    if num_symbols > 1:
+        fig.text(0.5, 0.02, f'[Time Period] Select time range on left | [Stocks] Select stock above to switch | [Legend] Click to toggle indicators',
+                 ha='center', fontsize=9, style='italic', color='#666666')
+    else:
+        fig.text(0.5, 0.02, f'[Time Period] Select time range on left | [Legend] Click to toggle indicators',
+                 ha='center', fontsize=9, style='italic', color='#666666')
+
+    # 初始繪製第一個股票
+    if len(symbols) > 0:
+        draw_stock_chart(symbols[0])
+
+    return fig, radio_buttons
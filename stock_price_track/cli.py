@@ -0,0 +1,375 @@
+"""命令列介面"""
+import os
+import sys
+import argparse
+import atexit
+import shutil
+import tempfile
+import time
+import traceback
+import warnings
+
+from .lazy import mark_startup, plt, print_import_times
+from .config import (
+    BACKTEST_BB_STD_GRID, BACKTEST_FEE, CHART_HISTORY_PERIOD, CHART_LONG_PERIODS, DOWNLOAD_PERIOD, FAKE_SOURCE_BARS,
+    FETCH_MAX_RETRIES,
+    INTRADAY_PERIODS, INTRADAY_STORE_DIR, INTRADAY_WINDOW_BARS, MAX_DOWNLOAD_WORKERS, MIN_DATA_POINTS,
+    PORTFOLIO_WINDOW, RATE_LIMIT_PER_SECOND, RESOLUTIONS, TIME_PERIOD_DAYS,
+)
+from .indicators import (
+    add_indicator, calculate_indicators_batch, custom_indicator_columns, latest_indicator_values,
+    print_analysis_results,
+)
+from .data import (
+    FileSource, IntradayStore, OHLCVCache, YFinanceSource, fetch_stocks_data_async, synthetic_source, trim_to_period,
+)
+from .compact import CompactStockStore, print_memory_report
+from .screener import Screener, parse_screen_condition, print_screen_results
+from .backtest import BACKTEST_STRATEGIES, parse_backtest_params, print_backtest_results, run_backtest
+from .portfolio import PortfolioAnalytics, parse_portfolio_weights, print_portfolio_results
+from .chart import create_multi_stock_chart
+from .report import render_report_charts, write_portfolio_report, write_results_report
+from .live import LiveUpdater, ReplayBarSource, YFinanceBarSource
+from .profiler import InteractionProfiler
+
+
+def read_symbols_file(path):
+    """讀取股票代碼清單（逗號或換行分隔，# 開頭為註解）"""
+    symbols = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            symbols.extend(s.strip().upper() for s in line.split(',') if s.strip())
+    return symbols
+
+
+def parse_args(argv=None):
+    """解析命令列參數（不帶參數時維持互動模式）"""
+    parser = argparse.ArgumentParser(description='Interactive US stock price tracking and technical analysis')
+    parser.add_argument('--symbols-file',
+                        help='read symbols from a file (comma or newline separated) instead of prompting')
+    parser.add_argument('--matrix', action='store_true',
+                        help='compute indicators for all symbols in one vectorized matrix pass')
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                        help='with --matrix or --sweep, compute in N processes over shared memory (default: 1)')
+    parser.add_argument('--screen', action='append', default=[], metavar='CONDITION',
+                        help="screen symbols, e.g. 'close > MA50', 'close crosses_above MA20', "
+                             "'volatility between 15 40' (repeatable, all must match)")
+    parser.add_argument('--indicator', action='append', default=[], metavar='SPEC',
+                        help="add an indicator: SMA(50), EMA(50), BB(30,2.5), VWAP, VWAP(20) are drawn on the price chart; "
+                             "RSI(14), MACD(12,26,9), ATR(14) are printed with the results (repeatable)")
+    parser.add_argument('--backtest', choices=list(BACKTEST_STRATEGIES),
+                        help='backtest a long-only strategy on the downloaded history: MA crossover or Bollinger band reversion')
+    parser.add_argument('--backtest-params', metavar='A,B',
+                        help='strategy parameters: fast,slow for ma-cross (default: 10,50); '
+                             'window,num_std for bb-revert (default: 20,2)')
+    parser.add_argument('--sweep', metavar='START:STOP[:STEP]',
+                        help='with --backtest, test every window combination in this range (ma-cross: all fast < slow pairs; '
+                             'bb-revert: each window with every --bb-std)')
+    parser.add_argument('--bb-std', default=','.join(f'{v:g}' for v in BACKTEST_BB_STD_GRID), metavar='LIST',
+                        help='Bollinger standard deviation multipliers for a bb-revert sweep (default: %(default)s)')
+    parser.add_argument('--fee', type=float, default=BACKTEST_FEE,
+                        help=f'backtest fee per buy or sell as a fraction of the trade (default: {BACKTEST_FEE})')
+    parser.add_argument('--portfolio', action='store_true',
+                        help='portfolio analytics across all symbols: rolling correlation/covariance, beta, '
+                             'volatility and drawdown, plus a CORR heatmap tab in the chart')
+    parser.add_argument('--weights', metavar='SYMBOL=W,...',
+                        help='portfolio weights, normalized to sum to 1 (default: equal weights)')
+    parser.add_argument('--beta-vs', metavar='SYMBOL',
+                        help='benchmark for beta, downloaded for portfolio analytics only if not in the list '
+                             '(default: equal-weighted average of the symbols)')
+    parser.add_argument('--corr-window', type=int, default=PORTFOLIO_WINDOW,
+                        help=f'bars in the rolling correlation/covariance window (default: {PORTFOLIO_WINDOW})')
+    parser.add_argument('--compact', action='store_true',
+                        help='keep OHLCV in one compact float32/int64 store and build indicator DataFrames only on demand')
+    parser.add_argument('--report', action='store_true',
+                        help='headless batch report: write charts and results.json/results.csv instead of showing a window')
+    parser.add_argument('--output-dir', default='reports',
+                        help='output directory for --report (default: reports)')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png',
+                        help='chart file format for --report (default: png)')
+    parser.add_argument('--period', choices=list(TIME_PERIOD_DAYS), default='6M',
+                        help='time period shown in report charts (default: 6M)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of chart rendering processes for --report (default: CPU count)')
+    parser.add_argument('--source', choices=['yfinance', 'file', 'fake'], default='yfinance',
+                        help='data source: yfinance (cached), local CSV/Parquet files, or offline synthetic data (default: yfinance)')
+    parser.add_argument('--data-dir',
+                        help='directory of <symbol>.csv / <symbol>.parquet files for --source file')
+    parser.add_argument('--connections', type=int, default=MAX_DOWNLOAD_WORKERS,
+                        help=f'maximum concurrent requests to the data source (default: {MAX_DOWNLOAD_WORKERS})')
+    parser.add_argument('--rate', type=float, default=None,
+                        help=f'maximum requests per second, 0 to disable '
+                             f'(default: {RATE_LIMIT_PER_SECOND:g} for yfinance, unlimited otherwise)')
+    parser.add_argument('--retries', type=int, default=FETCH_MAX_RETRIES,
+                        help=f'retries with jittered exponential backoff per symbol (default: {FETCH_MAX_RETRIES})')
+    parser.add_argument('--interval', choices=['1d'] + list(INTRADAY_PERIODS), default='1d',
+                        help='bar interval: daily, or 1/5/15-minute bars kept in an append-only memory-mapped store (default: 1d)')
+    parser.add_argument('--intraday-bars', type=int, default=INTRADAY_WINDOW_BARS,
+                        help=f'with an intraday --interval, most recent bars loaded for analysis and charts (default: {INTRADAY_WINDOW_BARS})')
+    parser.add_argument('--live', action='store_true',
+                        help='keep polling for new bars and update indicators and the chart in place')
+    parser.add_argument('--live-interval', type=float, default=1.0,
+                        help='seconds between live updates (default: 1.0)')
+    parser.add_argument('--replay', type=int, default=0, metavar='BARS',
+                        help='with --live, hold back the last BARS bars and replay them locally instead of polling yfinance')
+    parser.add_argument('--profile-events', metavar='PATH',
+                        help='record per-handler latency histograms and redraw counts, saved as JSON when the chart closes')
+    parser.add_argument('--import-times', action='store_true',
+                        help='print a startup breakdown (script load, deferred imports, first prompt) on exit')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """執行程式，回傳結束碼：0 成功、1 沒有下載到數據或報表有圖表未輸出、2 參數錯誤"""
+    args = parse_args(argv)
+    # 隱藏 yfinance / pandas 的雜訊警告；以 python -W 指定警告設定時改用使用者的設定
+    if not sys.warnoptions:
+        warnings.filterwarnings('ignore')
+    if args.import_times:
+        atexit.register(print_import_times)
+    print("Setup completed successfully")
+    print("=" * 60)
+    if args.report and not args.symbols_file:
+        print("[X] --report requires --symbols-file")
+        return 2
+    if args.compact and (args.live or args.matrix):
+        print("[X] --compact cannot be combined with --live or --matrix")
+        return 2
+    intraday = args.interval != '1d'
+    if intraday and (args.compact or (args.live and args.replay <= 0)):
+        print("[X] An intraday --interval cannot be combined with --compact, or with --live without --replay")
+        return 2
+    if args.source == 'file' and not args.data_dir:
+        print("[X] --source file requires --data-dir")
+        return 2
+    for text in args.screen:
+        try:
+            parse_screen_condition(text)
+        except ValueError as e:
+            print(f"[X] {e}")
+            return 2
+    for text in args.indicator:
+        try:
+            add_indicator(text)
+        except ValueError as e:
+            print(f"[X] {e}")
+            return 2
+    backtest_params = None
+    if args.backtest:
+        try:
+            backtest_params = parse_backtest_params(args)
+        except ValueError as e:
+            print(f"[X] {e}")
+            return 2
+    elif args.sweep or args.backtest_params:
+        print("[X] --sweep and --backtest-params require --backtest")
+        return 2
+    weights = None
+    if args.portfolio:
+        if args.corr_window < 2:
+            print("[X] --corr-window must be at least 2")
+            return 2
+        if args.weights:
+            try:
+                weights = parse_portfolio_weights(args.weights)
+            except ValueError as e:
+                print(f"[X] {e}")
+                return 2
+    elif args.weights or args.beta_vs:
+        print("[X] --weights and --beta-vs require --portfolio")
+        return 2
+
+    if args.symbols_file:
+        symbols = read_symbols_file(args.symbols_file)
+    else:
+        mark_startup('first prompt')
+        symbols_input = input("Enter US stock symbols separated by comma (e.g., AAPL,MSFT,TSLA): ")
+        symbols = [s.strip().upper() for s in symbols_input.split(",")]
+
+    print(f"\nWill analyze: {', '.join(symbols)}")
+    print("=" * 60)
+    members = list(dict.fromkeys(symbols))
+    benchmark = args.beta_vs.strip().upper() if args.portfolio and args.beta_vs else None
+    if weights is not None:
+        unknown = [symbol for symbol in weights if symbol not in members]
+        if unknown:
+            print(f"[X] --weights lists symbols that are not being analyzed: {', '.join(unknown)}")
+            return 2
+    fetch_symbols = symbols
+    if benchmark is not None and benchmark not in members:
+        # 基準只用於投資組合分析：與其他股票一起下載，之後不進入分析、圖表與報表
+        fetch_symbols = symbols + [benchmark]
+
+    print(f"\n[Downloading] Fetching data for {len(fetch_symbols)} symbols...")
+    cache = None
+    period = DOWNLOAD_PERIOD
+    if not args.report or args.period in CHART_LONG_PERIODS:
+        # 互動圖表（可切換到 5Y / MAX）或長區間的報表圖表需要較長的日線歷史
+        period = CHART_HISTORY_PERIOD
+    rate = args.rate if args.rate is not None else 0
+    if intraday:
+        # 分鐘線一律經過 IntradayStore；本地檔案與假數據使用暫存目錄，不混入 yfinance 的分鐘線儲存
+        period = INTRADAY_PERIODS[args.interval]
+        store_root = INTRADAY_STORE_DIR
+        if args.source != 'yfinance':
+            store_root = tempfile.mkdtemp(prefix='stock-price-track-')
+            atexit.register(shutil.rmtree, store_root, True)
+        cache = IntradayStore(store_root, args.interval, window_bars=max(args.intraday_bars, MIN_DATA_POINTS))
+    if args.source == 'file':
+        source = FileSource(args.data_dir, max_connections=args.connections)
+    elif args.source == 'fake':
+        num_bars = int(period[:-1]) * 390 // RESOLUTIONS[args.interval][1] if intraday else FAKE_SOURCE_BARS
+        source = synthetic_source(fetch_symbols, num_bars=num_bars, interval=args.interval, max_connections=args.connections)
+    else:
+        if not intraday:
+            cache = OHLCVCache()
+        source = YFinanceSource(max_connections=args.connections, interval=args.interval)
+        if args.rate is None:
+            rate = RATE_LIMIT_PER_SECOND
+    downloaded, _ = fetch_stocks_data_async(fetch_symbols, source, cache=cache, period=period, rate=rate, retries=args.retries)
+    if intraday:
+        # 分析與圖表只載入最近的 K 線，較早的歷史留在記憶體映射檔中
+        downloaded = {symbol: cache.frame(symbol, last=cache.window_bars) for symbol in downloaded}
+        print(f"   [Intraday] {args.interval} bars in {cache.root}, "
+              f"loaded the last {cache.window_bars:,} bars per symbol")
+    elif cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            print(f"   [Cache] Evicted {evicted} entries from {cache.cache_dir}")
+    print("-" * 60)
+    references = {}
+    if benchmark is not None and benchmark not in members and benchmark in downloaded:
+        references[benchmark] = downloaded.pop(benchmark)
+    if len(downloaded) == 0:
+        print("\n[X] No valid stock data to analyze.")
+        return 1
+
+    live_source = None
+    if args.live:
+        if args.replay > 0:
+            live_source = ReplayBarSource({**downloaded, **references}, holdback=args.replay)
+            initial = live_source.initial_data()
+            downloaded = {symbol: initial[symbol] for symbol in downloaded}
+            references = {symbol: initial[symbol] for symbol in references}
+            print(f"[Live] Replaying the last {args.replay} bars of each symbol locally")
+        else:
+            live_source = YFinanceBarSource()
+
+    # 篩選、回測與投資組合分析只使用最近 DOWNLOAD_PERIOD 的數據，結果不受圖表下載的歷史長度影響
+    analysis, analysis_references = downloaded, references
+    if period == CHART_HISTORY_PERIOD:
+        analysis, analysis_references = trim_to_period(downloaded), trim_to_period(references)
+
+    screener = None
+    if args.screen and len(downloaded) > 0:
+        screener = Screener.from_frames(analysis)
+        for text in args.screen:
+            screener.add(text)
+
+    backtest = None
+    if args.backtest and len(downloaded) > 0:
+        backtest = run_backtest(analysis, args.backtest, backtest_params, fee=args.fee, workers=args.parallel)
+
+    portfolio = None
+    portfolio_seconds = 0.0
+    if args.portfolio and len(downloaded) > 0:
+        loaded = [symbol for symbol in members if symbol in downloaded]
+        if weights is not None and len(loaded) < len(members):
+            missing = [symbol for symbol in weights if symbol not in downloaded]
+            if missing:
+                print(f"[!] No data for weighted symbols {', '.join(missing)}; the remaining weights are renormalized")
+        if benchmark is not None and benchmark not in downloaded and benchmark not in references:
+            print(f"[!] No data for benchmark {benchmark}; beta is computed against the equal-weighted average")
+            benchmark = None
+        try:
+            start = time.perf_counter()
+            portfolio = PortfolioAnalytics({**analysis, **analysis_references}, loaded, weights, benchmark,
+                                           window=args.corr_window)
+            portfolio_seconds = time.perf_counter() - start
+        except ValueError as e:
+            print(f"[X] Portfolio analytics skipped: {e}")
+
+    # 儲存所有股票數據
+    stocks_data = {}
+    stats_by_symbol = {}
+    results_by_symbol = {}
+    if args.matrix and len(downloaded) > 0:
+        print(f"\n[Analyzing] {len(downloaded)} symbols in matrix mode")
+        stocks_data, stats_by_symbol = calculate_indicators_batch(downloaded, workers=args.parallel)
+    if args.compact and len(downloaded) > 0:
+        print(f"\n[Analyzing] {len(downloaded)} symbols in compact mode")
+        stocks_data = CompactStockStore(downloaded)
+        # 原始 DataFrame 已複製進精簡陣列，之後只透過 stocks_data 取用
+        downloaded = dict.fromkeys(stocks_data.keys())
+        print_memory_report(stocks_data)
+
+    for i, (symbol, data) in enumerate(downloaded.items()):
+        try:
+            print(f"\n[Analyzing] {symbol} ({i+1}/{len(downloaded)})")
+            if symbol in stocks_data:
+                data = stocks_data[symbol]['data_full']
+            else:
+                # 指標與成交量顏色延後到第一次顯示這支股票時才計算
+                stocks_data[symbol] = {'data_full': data}
+            custom = custom_indicator_columns()
+            indicators = latest_indicator_values(symbol, data, custom) if custom else None
+            results_by_symbol[symbol] = print_analysis_results(symbol, data, stats_by_symbol.get(symbol), indicators)
+        except KeyboardInterrupt:
+            print(f"\n[!] Analysis interrupted by user")
+            break
+        except Exception as e:
+            print(f"[X] Error analyzing {symbol}: {str(e)}")
+            print(f"   Skipping {symbol}...")
+            traceback.print_exc()
+            continue
+        print("-" * 60)
+
+    print(f"\n[OK] Analysis completed! Processed {len(stocks_data)} stocks")
+    if screener is not None:
+        print_screen_results(screener)
+    if backtest is not None:
+        print_backtest_results(backtest)
+    if portfolio is not None:
+        print_portfolio_results(portfolio, portfolio_seconds)
+
+    if args.report:
+        os.makedirs(args.output_dir, exist_ok=True)
+        json_path, csv_path = write_results_report(results_by_symbol, args.output_dir)
+        print(f"\n[Report] Results written to {json_path} and {csv_path}")
+        if portfolio is not None:
+            json_path, chart_path = write_portfolio_report(portfolio, args.output_dir, fmt=args.format)
+            print(f"[Report] Portfolio written to {json_path} and {chart_path}")
+        written = render_report_charts({s: stocks_data[s] for s in results_by_symbol}, args.output_dir,
+                                       fmt=args.format, period=args.period, workers=args.workers,
+                                       indicators=args.indicator)
+        mark_startup('report written')
+        # 分析失敗或圖表輸出失敗的股票都不在報表中
+        if len(written) < len(results_by_symbol) or len(results_by_symbol) < len(downloaded):
+            print(f"[X] {len(downloaded) - len(written)} of {len(downloaded)} symbols are missing from the report")
+            return 1
+        return 0
+
+    if len(stocks_data) > 0:
+        print("\n[TIP] Click on legend items to show/hide MA lines")
+        print("[TIP] Click 'Fibonacci Tool' in legend to draw retracement levels")
+        if len(stocks_data) > 1:
+            print(f"[TIP] Use radio buttons at the top to switch between {len(stocks_data)} stocks")
+        if portfolio is not None:
+            print("[TIP] Click 'CORR' below the time periods to show the correlation heatmap")
+        print("\n[INFO] Creating interactive chart...")
+        live_updater = None
+        if live_source is not None:
+            live_updater = LiveUpdater(stocks_data, live_source, interval=args.live_interval, screener=screener,
+                                       references=references)
+            live_updater.start()
+            print(f"[Live] Updating every {args.live_interval:g}s")
+        profiler = InteractionProfiler(args.profile_events) if args.profile_events else None
+        fig, radio_buttons = create_multi_stock_chart(stocks_data, live_updater=live_updater,
+                                                      live_interval=args.live_interval, profiler=profiler,
+                                                      portfolio=portfolio)
+        print("[INFO] Chart displayed. Close the chart window to exit the program.")
+        plt.show()
+        return 0
+    print("\n[X] No valid stock data to display.")
+    return 1
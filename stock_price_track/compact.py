@@ -0,0 +1,135 @@
+"""精簡記憶體模式"""
+from .lazy import np, pd
+from .config import COMPACT_CACHE_SIZE, COMPACT_REPORT_SAMPLE
+from .indicators import compute_indicator_arrays, compute_volume_colors, ensure_indicators
+
+
+class CompactStockStore:
+    """精簡版 stocks_data：所有股票的 OHLCV 依序存放在同一組連續陣列中
+
+    OHLC 以 float32 存成 (總 K 線數 × 4) 矩陣，成交量與日期為 int64，
+    第 i 支股票佔用 offsets[i]:offsets[i + 1] 列。
+    store[symbol] 才計算指標並組成與一般模式相同的 {'data_full': DataFrame, 'volume_colors': 陣列}，
+    最近使用的 cache_size 支股票保留在 LRU 快取中；視圖不含多餘的 BB_std 欄位。
+    """
+    PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+    def __init__(self, frames, cache_size=COMPACT_CACHE_SIZE):
+        self.symbols = list(frames.keys())
+        self._slots = {symbol: i for i, symbol in enumerate(self.symbols)}
+        lengths = [len(frames[symbol]) for symbol in self.symbols]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        total = int(self.offsets[-1])
+        self.prices = np.full((total, len(self.PRICE_COLUMNS)), np.nan, dtype=np.float32)
+        self.volume = np.zeros(total, dtype=np.int64)
+        self.dates = np.empty(total, dtype='datetime64[ns]')
+        for i, symbol in enumerate(self.symbols):
+            data = frames[symbol]
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            for k, column in enumerate(self.PRICE_COLUMNS):
+                if column in data.columns:
+                    self.prices[lo:hi, k] = data[column].to_numpy(dtype=np.float32)
+            if 'Volume' in data.columns:
+                self.volume[lo:hi] = data['Volume'].fillna(0).to_numpy(dtype=np.int64)
+            self.dates[lo:hi] = data.index.values.astype('datetime64[ns]')
+        self.cache_size = max(1, cache_size)
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._slots
+
+    def keys(self):
+        return list(self.symbols)
+
+    def items(self):
+        for symbol in self.symbols:
+            yield symbol, self[symbol]
+
+    def _range(self, symbol):
+        i = self._slots[symbol]
+        return self.offsets[i], self.offsets[i + 1]
+
+    def close(self, symbol):
+        """回傳收盤價（float64），不建立 DataFrame"""
+        lo, hi = self._range(symbol)
+        return self.prices[lo:hi, 3].astype(np.float64)
+
+    def _build(self, symbol):
+        lo, hi = self._range(symbol)
+        close = self.prices[lo:hi, 3].astype(np.float64)
+        data = pd.DataFrame(self.prices[lo:hi], columns=self.PRICE_COLUMNS,
+                            index=pd.DatetimeIndex(self.dates[lo:hi], name='Date'))
+        data['Volume'] = self.volume[lo:hi]
+        for name, values in compute_indicator_arrays(close).items():
+            if name != 'BB_std':
+                data[name] = values
+        return {'data_full': data, 'volume_colors': compute_volume_colors(close)}
+
+    def __getitem__(self, symbol):
+        stock = self._cache.pop(symbol, None)
+        if stock is None:
+            self.misses += 1
+            stock = self._build(symbol)
+        else:
+            self.hits += 1
+        self._cache[symbol] = stock
+        while len(self._cache) > self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
+        return stock
+
+    def nbytes(self):
+        """連續陣列佔用的位元組數（不含 LRU 快取中的視圖）"""
+        return self.prices.nbytes + self.volume.nbytes + self.dates.nbytes + self.offsets.nbytes
+
+    def cached_nbytes(self):
+        return sum(int(stock['data_full'].memory_usage(deep=True).sum()) + stock['volume_colors'].nbytes
+                   for stock in self._cache.values())
+
+
+def dataframe_layout(store, symbol):
+    """一般模式下這支股票的 stocks_data 項目：float64 OHLC、int64 成交量、全部指標欄位與成交量顏色"""
+    lo, hi = store._range(symbol)
+    data = pd.DataFrame(store.prices[lo:hi].astype(np.float64), columns=store.PRICE_COLUMNS,
+                        index=pd.DatetimeIndex(store.dates[lo:hi], name='Date'))
+    data['Volume'] = store.volume[lo:hi]
+    stock = {'data_full': data}
+    ensure_indicators(stock)
+    stock['volume_colors'] = compute_volume_colors(data['Close'])
+    return stock
+
+
+def dataframe_layout_nbytes(store, sample=COMPACT_REPORT_SAMPLE):
+    """實際建立前 sample 支股票的一般模式數據並量測位元組數，再依 K 線數換算成全部股票的用量
+
+    回傳 (換算後的位元組數, 實際量測的股票數)。
+    """
+    symbols = store.symbols[:max(sample, 1)]
+    measured = 0
+    measured_bars = 0
+    for symbol in symbols:
+        stock = dataframe_layout(store, symbol)
+        measured += int(stock['data_full'].memory_usage(deep=True).sum()) + stock['volume_colors'].nbytes
+        measured_bars += len(stock['data_full'])
+    if measured_bars == 0:
+        return 0, len(symbols)
+    return measured * int(store.offsets[-1]) / measured_bars, len(symbols)
+
+
+def print_memory_report(store):
+    """輸出精簡模式與一般 DataFrame 模式每 1,000 支股票的記憶體用量"""
+    num_symbols = max(len(store), 1)
+    compact = store.nbytes() + store.cached_nbytes()
+    dataframe, measured = dataframe_layout_nbytes(store)
+    per_thousand = 1000 / num_symbols / 1024 ** 2
+    print(f"   [Memory] DataFrame layout (measured on {measured} symbols): "
+          f"{dataframe * per_thousand:.1f} MB per 1,000 symbols")
+    print(f"   [Memory] Compact store: {compact * per_thousand:.1f} MB per 1,000 symbols "
+          f"({store.nbytes() / 1024 ** 2:.1f} MB arrays + {len(store._cache)} cached views)")
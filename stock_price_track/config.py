@@ -0,0 +1,126 @@
+"""全域參數"""
+import os
+
+# 定義移動平均線參數
+MA_PERIODS = {
+    'MA10': (10, '#FF6B6B', '-'),
+    'MA20': (20, '#4ECDC4', '--'),
+    'MA50': (50, '#45B7D1', '-.'),
+    'MA60': (60, '#FFA07A', ':'),
+    'MA200': (200, '#9B59B6', '-.')
+}
+
+# 下載參數
+DOWNLOAD_PERIOD = "15mo"
+# 圖表的 5Y / MAX 區間需要更長的日線歷史：顯示互動圖表、或以這些區間輸出報表圖表時改為下載 CHART_HISTORY_PERIOD
+# （篩選、回測與投資組合分析仍只使用最近 DOWNLOAD_PERIOD 的數據）
+CHART_HISTORY_PERIOD = "max"
+CHART_LONG_PERIODS = ('5Y', 'MAX')
+MIN_DATA_POINTS = 50
+MAX_DOWNLOAD_WORKERS = 8
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# 非同步數據來源：限速（每秒請求數 / 允許連續請求數）與重試參數
+RATE_LIMIT_PER_SECOND = 4.0
+RATE_LIMIT_BURST = 8
+FETCH_MAX_RETRIES = 3
+FETCH_BACKOFF_SECONDS = 1.0
+FETCH_BACKOFF_MAX_SECONDS = 30.0
+
+# 本地快取參數
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'stock-price-track')
+CACHE_TTL_SECONDS = 6 * 60 * 60
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+# 補抓時重疊 K 線的收盤價與快取的相對誤差上限；超過時視為分割或除息調整了歷史價格，重新下載完整期間
+CACHE_ADJUST_TOLERANCE = 1e-4
+# 快取的歷史數據最久沿用的秒數（之後重新下載完整期間，涵蓋低於容差的小額除息調整）
+CACHE_REBASE_SECONDS = 7 * 24 * 60 * 60
+
+# 分鐘線：K 線間隔 -> yfinance 可下載的最長期間，分鐘線儲存的位置，以及分析與圖表載入的最近 K 線根數
+INTRADAY_PERIODS = {'1m': '7d', '5m': '60d', '15m': '60d'}
+INTRADAY_STORE_DIR = os.path.join(CACHE_DIR, 'intraday')
+INTRADAY_WINDOW_BARS = 20_000
+
+# 布林通道參數
+BOLLINGER_PERIOD = 20
+BOLLINGER_STD = 2
+
+# 自訂指標：快取已計算指標節點的股票數（LRU），以及畫在價格圖上的自訂指標線顏色
+INDICATOR_CACHE_SYMBOLS = 64
+INDICATOR_OVERLAY_COLORS = ['#E67E22', '#16A085', '#8E44AD', '#2980B9', '#C0392B', '#7F8C8D']
+
+# 回測：每次買進或賣出的手續費（成交金額比例）、參數掃描時布林通道的標準差倍數，
+# 以及每批向量化計算的元素上限與每個分片的股票數（控制暫存陣列的記憶體用量）
+BACKTEST_FEE = 0.001
+BACKTEST_BB_STD_GRID = (1.5, 2.0, 2.5, 3.0)
+BACKTEST_CHUNK_ELEMENTS = 1_000_000
+BACKTEST_SHARD_SYMBOLS = 128
+
+# 投資組合分析：滾動相關 / 共變異數視窗（K 線根數）、逐列更新幾次後重新計算一次累加和（避免浮點誤差累積），
+# 以及熱圖上標示股票代碼的最大股票數
+PORTFOLIO_WINDOW = 60
+PORTFOLIO_RESYNC_STEPS = 500
+PORTFOLIO_HEATMAP_LABELS = 40
+
+# 即時模式：附加 K 線的緩衝區在目前根數之外預留的根數（用完時容量加倍），
+# 以及自訂指標（沒有逐根更新的版本）整欄重新計算的最短間隔秒數
+LIVE_BUFFER_HEADROOM = 1024
+LIVE_CUSTOM_REFRESH_SECONDS = 5.0
+
+# 精簡記憶體模式：同時保留的 DataFrame 視圖數（LRU），以及記憶體報告實際建立一般模式 DataFrame 量測的股票數
+COMPACT_CACHE_SIZE = 4
+COMPACT_REPORT_SAMPLE = 20
+
+# 圖表時間區間按鈕（顯示的日線根數，None 表示全部歷史）
+TIME_PERIOD_DAYS = {'1M': 22, '3M': 65, '6M': 130, '1Y': 252, '5Y': 1260, 'MAX': None}
+
+# 多解析度 K 線：解析度代碼 -> (名稱, 每根 K 線的分鐘數)，由細到粗排列；
+# 可見區間的 K 線根數超過「座標軸像素寬度 / RESOLUTION_PIXELS_PER_BAR」時改用較粗的解析度
+RESOLUTIONS = {
+    '1m': ('1-Minute', 1),
+    '5m': ('5-Minute', 5),
+    '15m': ('15-Minute', 15),
+    '1h': ('Hourly', 60),
+    'D': ('Daily', 1440),
+    'W': ('Weekly', 7 * 1440),
+    'M': ('Monthly', 30 * 1440),
+}
+RESOLUTION_PIXELS_PER_BAR = 2
+
+# 離線假數據來源（--source fake）每支股票的日線根數（約 10 年）
+FAKE_SOURCE_BARS = 2520
+
+# 統計數據回溯區間（K 線根數）
+STATS_LOOKBACKS = {'1M': 22, '3M': 65, '6M': 130, '1Y': 252}
+STATS_FIELDS = ['start_price', 'end_price', 'return_pct', 'max_price',
+                'min_price', 'avg_price', 'volatility', 'max_drawdown']
+# 股票數少於此值時不值得匯入與載入 Numba 核心，直接使用 NumPy 版本
+STATS_NUMBA_MIN_SYMBOLS = 64
+
+# 繪圖降採樣：可見點數上限為座標軸像素寬度（至少保留此點數）
+DOWNSAMPLE_MIN_POINTS = 200
+
+# 股票選擇列：每頁按鈕數，以及切換後預先建立相鄰股票圖表元件的延遲（毫秒）
+SELECTOR_PAGE_SIZE = 10
+SELECTOR_PREFETCH_DELAY_MS = 150
+
+# 互動事件效能分析：延遲直方圖各區間的上界（毫秒）
+PROFILE_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# 成交量柱顏色
+VOLUME_UP_COLOR = '#EF5350'
+VOLUME_DOWN_COLOR = '#26A69A'
+VOLUME_FLAT_COLOR = '#808080'
+
+# 費波那契回調比例
+FIBONACCI_LEVELS = [0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
+FIBONACCI_COLORS = {
+    0: '#808080',
+    0.236: '#9C27B0',
+    0.382: '#2196F3',
+    0.5: '#4CAF50',
+    0.618: '#FF9800',
+    0.786: '#F44336',
+    1.0: '#808080'
+}
@@ -0,0 +1,692 @@
+"""數據下載與快取：yfinance 下載、本地快取、分鐘線儲存與非同步數據來源"""
+import os
+import asyncio
+import json
+import random
+import zlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .lazy import np, pd, yf
+from .config import (
+    CACHE_ADJUST_TOLERANCE, CACHE_DIR, CACHE_MAX_AGE_SECONDS, CACHE_MAX_BYTES, CACHE_REBASE_SECONDS,
+    CACHE_TTL_SECONDS, DOWNLOAD_PERIOD,
+    FETCH_BACKOFF_MAX_SECONDS, FETCH_BACKOFF_SECONDS, FETCH_MAX_RETRIES, INTRADAY_STORE_DIR,
+    INTRADAY_WINDOW_BARS, MAX_DOWNLOAD_WORKERS, MIN_DATA_POINTS, OHLCV_COLUMNS, RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_SECOND, RESOLUTIONS,
+)
+
+
+def yfinance_downloader(symbol, period=DOWNLOAD_PERIOD, start=None, session=None, interval='1d'):
+    """預設數據來源：透過 yfinance 下載單一股票日線或分鐘線數據（指定 start 時只抓之後的數據）
+
+    yf.download 共用全域結果表，多執行緒同時呼叫並不安全，
+    因此改用每支股票獨立的 Ticker.history；session 可傳入共用的 HTTP 連線池。
+    分鐘線只能下載最近 period（INTRADAY_PERIODS）內的數據，更早的 start 會被調整到該範圍內。
+    """
+    ticker = yf.Ticker(symbol, session=session)
+    if start is not None and interval != '1d':
+        start = max(pd.Timestamp(start), pd.Timestamp.now().normalize() - _period_offset(period) + pd.Timedelta(days=1))
+    if start is not None:
+        data = ticker.history(start=start, interval=interval, auto_adjust=True)
+    else:
+        data = ticker.history(period=period, interval=interval, auto_adjust=True)
+    if data.empty:
+        return data
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    return data[[c for c in OHLCV_COLUMNS if c in data.columns]]
+
+
+def _period_offset(period):
+    """將 yfinance 的期間字串（如 15mo、2y、30d）轉為 DateOffset；max 表示不限制，回傳 None"""
+    if period == 'max':
+        return None
+    if period.endswith('mo'):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return pd.DateOffset(years=int(period[:-1]))
+    if period.endswith('d'):
+        return pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def _safe_filename(symbol):
+    """將股票代碼轉為安全的檔名"""
+    return ''.join(c if c.isalnum() or c in '-_.^=' else '_' for c in symbol)
+
+
+class OHLCVCache:
+    """本地 OHLCV 快取（每支股票一組記憶體映射的 .npy 檔）
+
+    每個 symbol 存成三個檔案：
+      <symbol>.index.npy  日期（int64 奈秒）
+      <symbol>.ohlcv.npy  float64 矩陣（列 = 日期，欄 = OHLCV_COLUMNS）
+      <symbol>.json       下載時間、完整下載時間、最後存取時間與欄位名稱
+    超過 ttl 秒的項目視為過期，只補抓最後一筆之後的數據；
+    距離上次完整下載超過 rebase 秒的項目視為不存在，重新下載完整期間，
+    每天都被補抓的股票因此不會一直沿用舊的歷史價格。
+    超過 max_age 秒未使用的項目會被刪除，總大小超過 max_bytes 時
+    再依最後存取時間淘汰最舊的項目。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL_SECONDS,
+                 max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE_SECONDS, rebase=CACHE_REBASE_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.rebase = rebase
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, symbol):
+        base = os.path.join(self.cache_dir, _safe_filename(symbol))
+        return base + '.index.npy', base + '.ohlcv.npy', base + '.json'
+
+    def _read_meta(self, symbol):
+        meta_path = self._paths(symbol)[2]
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, symbol, meta):
+        meta_path = self._paths(symbol)[2]
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def load(self, symbol, period=DOWNLOAD_PERIOD):
+        """讀取快取，回傳 (DataFrame 或 None, 是否仍在 TTL 內)
+
+        以不同的下載期間（例如 DOWNLOAD_PERIOD 與圖表用的 CHART_HISTORY_PERIOD）存入、或距離上次完整下載
+        超過 rebase 秒的快取視為不存在，重新下載完整期間。
+        """
+        meta = self._read_meta(symbol)
+        if meta is None or meta.get('period', '15mo') != period:
+            return None, False
+        if time.time() - meta.get('rebased_at', 0) > self.rebase:
+            return None, False
+        index_path, values_path, _ = self._paths(symbol)
+        try:
+            index = np.load(index_path, mmap_mode='r')
+            values = np.load(values_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None, False
+        data = pd.DataFrame(np.array(values), columns=meta['columns'],
+                            index=pd.DatetimeIndex(np.array(index).astype('datetime64[ns]'), name='Date'))
+        if 'Volume' in data.columns:
+            data['Volume'] = data['Volume'].astype('int64')
+        meta['accessed_at'] = time.time()
+        self._write_meta(symbol, meta)
+        fresh = time.time() - meta['fetched_at'] < self.ttl
+        return data, fresh
+
+    def save(self, symbol, data, period=DOWNLOAD_PERIOD, full=True):
+        """原子寫入一支股票的完整快取（period 為這份數據的下載期間，full 為 False 表示只補抓了最新的數據）"""
+        rebased_at = None if full else (self._read_meta(symbol) or {}).get('rebased_at')
+        index_path, values_path, _ = self._paths(symbol)
+        columns = [c for c in OHLCV_COLUMNS if c in data.columns]
+        index = data.index.values.astype('datetime64[ns]').astype('int64')
+        values = np.ascontiguousarray(data[columns].to_numpy(dtype='float64'))
+        for path, array in ((index_path, index), (values_path, values)):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        now = time.time()
+        self._write_meta(symbol, {'columns': columns, 'period': period, 'fetched_at': now,
+                                  'rebased_at': now if rebased_at is None else rebased_at, 'accessed_at': now})
+
+    def _remove(self, symbol):
+        for path in self._paths(symbol):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """刪除太久未使用或超出大小上限的項目，回傳被淘汰的 symbol 數量"""
+        entries = []
+        total = 0
+        evicted = 0
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            symbol = name[:-len('.json')]
+            meta = self._read_meta(symbol) or {}
+            accessed_at = meta.get('accessed_at', 0)
+            if now - accessed_at > self.max_age:
+                self._remove(symbol)
+                evicted += 1
+                continue
+            size = sum(os.path.getsize(p) for p in self._paths(symbol) if os.path.exists(p))
+            entries.append((accessed_at, symbol, size))
+            total += size
+        for _, symbol, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(symbol)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+class IntradayStore:
+    """分鐘線的附加式欄位儲存（每支股票一個目錄，每個欄位一個記憶體映射的二進位檔）
+
+      <root>/<interval>/<symbol>/timestamp.bin  時間（int64 奈秒，遞增）
+      <root>/<interval>/<symbol>/<欄位>.bin      float64（OHLCV_COLUMNS 各一個檔案）
+    新的 K 線只附加到檔案結尾（與最後一根同時間的 K 線原地覆寫），既有數據不會重寫；
+    window() 以二分搜尋找出時間區間並回傳記憶體映射陣列的切片（不複製），
+    指標與圖表因此只讀取需要的區間，不必把整段歷史載入 pandas。
+    load / save 的介面與 OHLCVCache 相同，可直接作為 fetch_stocks_data_async 的 cache。
+    """
+
+    def __init__(self, root=INTRADAY_STORE_DIR, interval='5m', window_bars=INTRADAY_WINDOW_BARS):
+        self.root = os.path.join(root, interval)
+        self.interval = interval
+        self.window_bars = window_bars
+        self._maps = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol, column):
+        return os.path.join(self.root, _safe_filename(symbol), column + '.bin')
+
+    def length(self, symbol):
+        """已儲存的 K 線根數（以時間檔為準；寫到一半中斷時多出的位元組不計入）"""
+        try:
+            return os.path.getsize(self._path(symbol, 'timestamp')) // 8
+        except OSError:
+            return 0
+
+    def columns(self, symbol):
+        """回傳 {'timestamp' 與各欄位: 唯讀記憶體映射陣列}，檔案長度改變後才重新映射"""
+        length = self.length(symbol)
+        cached = self._maps.get(symbol)
+        if cached is not None and cached[0] == length:
+            return cached[1]
+        arrays = {}
+        if length:
+            arrays['timestamp'] = np.memmap(self._path(symbol, 'timestamp'), dtype=np.int64, mode='r', shape=(length,))
+            for column in OHLCV_COLUMNS:
+                arrays[column] = np.memmap(self._path(symbol, column), dtype=np.float64, mode='r', shape=(length,))
+        self._maps[symbol] = (length, arrays)
+        return arrays
+
+    def window(self, symbol, start=None, end=None, last=None):
+        """時間區間 [start, end) 內（再限制為最後 last 根）K 線的零複製切片，回傳 {欄位: 陣列}"""
+        arrays = self.columns(symbol)
+        if not arrays:
+            return {}
+        stamps = arrays['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(stamps, pd.Timestamp(start).value))
+        hi = len(stamps) if end is None else int(np.searchsorted(stamps, pd.Timestamp(end).value))
+        if last is not None:
+            lo = max(lo, hi - last)
+        return {column: values[lo:hi] for column, values in arrays.items()}
+
+    def frame(self, symbol, start=None, end=None, last=None):
+        """將區間內的 K 線複製成一般 DataFrame（只複製該區間，之後與記憶體映射檔無關）"""
+        window = self.window(symbol, start, end, last)
+        if not window:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        index = pd.DatetimeIndex(np.array(window['timestamp']).astype('datetime64[ns]'), name='Date')
+        data = pd.DataFrame({column: np.array(window[column]) for column in OHLCV_COLUMNS}, index=index)
+        data['Volume'] = np.nan_to_num(data['Volume'].to_numpy()).astype('int64')
+        return data
+
+    def append(self, symbol, data):
+        """附加比最後一根更新的 K 線（與最後一根同時間的 K 線原地覆寫，更早的忽略），回傳寫入的根數"""
+        if data is None or data.empty:
+            return 0
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        stamps = data.index.values.astype('datetime64[ns]').astype(np.int64)
+        values = {column: data[column].to_numpy(dtype=np.float64) if column in data.columns
+                  else np.full(len(data), np.nan) for column in OHLCV_COLUMNS}
+        os.makedirs(os.path.dirname(self._path(symbol, 'timestamp')), exist_ok=True)
+        length = self.length(symbol)
+        written = 0
+        if length:
+            last = int(self.columns(symbol)['timestamp'][-1])
+            same = np.flatnonzero(stamps == last)
+            if len(same):
+                for column in OHLCV_COLUMNS:
+                    with open(self._path(symbol, column), 'r+b') as f:
+                        f.seek((length - 1) * 8)
+                        f.write(values[column][same[0]:same[0] + 1].tobytes())
+                written += 1
+            newer = stamps > last
+            stamps = stamps[newer]
+            values = {column: array[newer] for column, array in values.items()}
+        if len(stamps):
+            # 先寫欄位、最後寫時間：中途中斷時時間檔的長度仍對應完整的 K 線，多出的位元組下次截掉
+            for column in OHLCV_COLUMNS:
+                with open(self._path(symbol, column), 'ab') as f:
+                    f.truncate(length * 8)
+                    f.write(values[column].tobytes())
+            with open(self._path(symbol, 'timestamp'), 'ab') as f:
+                f.truncate(length * 8)
+                f.write(stamps.tobytes())
+            written += len(stamps)
+        return written
+
+    def load(self, symbol, period=None):
+        """讀取最近 window_bars 根 K 線，回傳 (DataFrame 或 None, False)
+
+        分鐘線在盤中持續更新，因此一律視為過期，只補抓最後一根之後的數據。
+        """
+        if not self.length(symbol):
+            return None, False
+        return self.frame(symbol, last=self.window_bars), False
+
+    def save(self, symbol, data, period=None, full=False):
+        """將下載的數據附加進儲存（已存在的較早 K 線不會重寫）
+
+        full 為 True 表示重新下載了完整期間（例如分割後價格基準改變），先清除既有的 K 線再寫入。
+        """
+        if full:
+            self._remove(symbol)
+        self.append(symbol, data)
+
+    def _remove(self, symbol):
+        self._maps.pop(symbol, None)
+        for column in ['timestamp'] + OHLCV_COLUMNS:
+            try:
+                os.remove(self._path(symbol, column))
+            except OSError:
+                pass
+
+    def nbytes(self, symbol):
+        """一支股票在磁碟上的大小（位元組）"""
+        return sum(os.path.getsize(self._path(symbol, column))
+                   for column in ['timestamp'] + OHLCV_COLUMNS if os.path.exists(self._path(symbol, column)))
+
+
+def _refresh_start(cached):
+    """補抓的起點：快取倒數第二根 K 線
+
+    最後一根可能是盤中存入、之後還會變動的 K 線；倒數第二根已經收盤，
+    補抓結果中同一根的收盤價應與快取相同，用來檢查價格基準是否改變。
+    """
+    return cached.index[-2]
+
+
+def _merge_cached(cached, delta, period=DOWNLOAD_PERIOD):
+    """將補抓的新數據（從 _refresh_start 起）合併進快取數據，並只保留最近 period 的範圍
+
+    auto_adjust 的價格在分割或除息後會整段重新調整；補抓結果中重疊 K 線的收盤價與快取
+    相差超過 CACHE_ADJUST_TOLERANCE（或補抓結果沒有重疊的 K 線）時，快取與新數據不在同一個
+    基準上，回傳 None，由呼叫端重新下載完整期間。
+    """
+    if delta is not None and not delta.empty:
+        if isinstance(delta.columns, pd.MultiIndex):
+            delta.columns = delta.columns.droplevel(1)
+        anchor = _refresh_start(cached)
+        if anchor not in delta.index:
+            return None
+        expected = float(cached['Close'].iloc[-2])
+        actual = float(delta.loc[[anchor], 'Close'].iloc[-1])
+        if not np.isclose(actual, expected, rtol=CACHE_ADJUST_TOLERANCE, atol=0):
+            return None
+        data = pd.concat([cached, delta[cached.columns]])
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+    else:
+        data = cached
+    offset = _period_offset(period)
+    if offset is None:
+        return data
+    return data[data.index >= data.index[-1] - offset]
+
+
+def _classify_download(data, elapsed):
+    """套用略過規則（無數據、缺少收盤價或 K 線太少），回傳 (狀態, 數據, 耗時, 錯誤)"""
+    if data is None or data.empty:
+        return 'empty', None, elapsed, None
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.droplevel(1)
+    if 'Close' not in data.columns or len(data) < MIN_DATA_POINTS:
+        return 'insufficient', None, elapsed, None
+    return 'ok', data, elapsed, None
+
+
+def _report_downloads(symbols, results, total_elapsed):
+    """輸出每支股票的下載結果，回傳 (依輸入順序排列的 {symbol: DataFrame}, {symbol: 下載秒數})"""
+    downloaded = {}
+    timings = {}
+    for symbol in symbols:
+        if symbol not in results:
+            continue
+        status, data, elapsed, error = results[symbol]
+        timings[symbol] = elapsed
+        if status == 'ok':
+            print(f"   [OK] {symbol}: downloaded {len(data)} bars of data ({elapsed:.2f}s)")
+            downloaded[symbol] = data
+        elif status == 'empty':
+            print(f"[X] No data found for {symbol}. Please check if the symbol is correct. ({elapsed:.2f}s)")
+            print(f"   Skipping {symbol}...")
+        elif status == 'insufficient':
+            print(f"[!] Insufficient data for {symbol}. Skipping... ({elapsed:.2f}s)")
+        else:
+            print(f"[X] Error downloading {symbol}: {type(error).__name__}: {error} ({elapsed:.2f}s)")
+            print(f"   Skipping {symbol}...")
+    print(f"   [OK] Download stage finished in {total_elapsed:.2f}s "
+          f"(sum of per-symbol time: {sum(timings.values()):.2f}s)")
+    return downloaded, timings
+
+# 非同步數據來源
+class TokenBucket:
+    """權杖桶限速器：平均每秒 rate 個請求，最多允許 burst 個連續請求（rate <= 0 表示不限速）"""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        """取得一個權杖，權杖不足時等待補充"""
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DataSource:
+    """非同步數據來源介面
+
+    子類別實作 fetch(symbol, period, start)，回傳 OHLCV 日線 DataFrame（找不到時回傳空的 DataFrame）；
+    阻塞的 I/O 透過 run_blocking 在 open() 建立的執行緒池中執行，
+    is_retryable 決定錯誤是否值得重試。
+    """
+    name = 'base'
+
+    def __init__(self, max_connections=MAX_DOWNLOAD_WORKERS):
+        self.max_connections = max(1, max_connections)
+        self._executor = None
+
+    async def open(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def run_blocking(self, func, *args):
+        """在數據來源的執行緒池中執行阻塞呼叫"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def fetch(self, symbol, period=DOWNLOAD_PERIOD, start=None):
+        raise NotImplementedError
+
+    def is_retryable(self, error):
+        return not isinstance(error, (ValueError, KeyError, TypeError, NotImplementedError))
+
+
+def _make_http_session(pool_size):
+    """建立所有請求共用的 HTTP session（優先使用 yfinance 所需的 curl_cffi）"""
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate='chrome')
+    except ImportError:
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        return session
+
+
+class YFinanceSource(DataSource):
+    """yfinance 數據來源：所有請求共用同一個連線池 session（interval 為 1d 或分鐘線間隔）"""
+    name = 'yfinance'
+
+    def __init__(self, max_connections=MAX_DOWNLOAD_WORKERS, interval='1d'):
+        super().__init__(max_connections)
+        self.interval = interval
+        self.session = None
+
+    async def open(self):
+        await super().open()
+        self.session = _make_http_session(self.max_connections)
+
+    async def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        await super().close()
+
+    async def fetch(self, symbol, period=DOWNLOAD_PERIOD, start=None):
+        return await self.run_blocking(yfinance_downloader, symbol, period, start, self.session, self.interval)
+
+    def is_retryable(self, error):
+        from yfinance import exceptions as yf_exceptions
+        if isinstance(error, yf_exceptions.YFRateLimitError):
+            return True
+        if isinstance(error, (yf_exceptions.YFTickerMissingError, yf_exceptions.YFInvalidPeriodError)):
+            return False
+        return super().is_retryable(error)
+
+
+class FileSource(DataSource):
+    """本地檔案數據來源：讀取 data_dir 內的 <symbol>.parquet 或 <symbol>.csv（第一欄為日期）
+
+    Parquet 需要另外安裝 pyarrow 或 fastparquet；本地檔案的錯誤不會重試。
+    """
+    name = 'file'
+
+    def __init__(self, data_dir, max_connections=4):
+        super().__init__(max_connections)
+        self.data_dir = data_dir
+
+    def _path(self, symbol):
+        base = os.path.join(self.data_dir, _safe_filename(symbol))
+        for ext in ('.parquet', '.csv'):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def _read(self, symbol, period, start):
+        path = self._path(symbol)
+        if path is None:
+            return pd.DataFrame()
+        if path.endswith('.parquet'):
+            data = pd.read_parquet(path)
+        else:
+            data = pd.read_csv(path, index_col=0, parse_dates=True)
+        data.index = pd.DatetimeIndex(data.index, name='Date')
+        if data.index.tz is not None:
+            data.index = data.index.tz_localize(None)
+        data = data.sort_index()[[c for c in OHLCV_COLUMNS if c in data.columns]]
+        return _slice_period(data, period, start)
+
+    async def fetch(self, symbol, period=DOWNLOAD_PERIOD, start=None):
+        return await self.run_blocking(self._read, symbol, period, start)
+
+    def is_retryable(self, error):
+        return False
+
+
+class MemorySource(DataSource):
+    """記憶體內的假數據來源（離線測試用），可模擬網路延遲與每支股票前 failures 次請求失敗"""
+    name = 'memory'
+
+    def __init__(self, frames, latency=0.0, failures=0, max_connections=MAX_DOWNLOAD_WORKERS):
+        super().__init__(max_connections)
+        self.frames = frames
+        self.latency = latency
+        self.failures = failures
+        self.attempts = {}
+
+    async def fetch(self, symbol, period=DOWNLOAD_PERIOD, start=None):
+        self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        if self.attempts[symbol] <= self.failures:
+            raise ConnectionError(f"simulated failure #{self.attempts[symbol]} for {symbol}")
+        data = self.frames.get(symbol)
+        if data is None:
+            return pd.DataFrame()
+        return _slice_period(data.copy(), period, start)
+
+
+def _slice_period(data, period, start):
+    """只保留 start 之後（或最近 period 範圍內）的數據"""
+    if data.empty:
+        return data
+    if start is not None:
+        return data[data.index >= pd.Timestamp(start)]
+    offset = _period_offset(period) if period else None
+    if offset is not None:
+        return data[data.index >= data.index[-1] - offset]
+    return data
+
+
+def trim_to_period(downloaded, period=DOWNLOAD_PERIOD):
+    """{symbol: DataFrame} 只保留每支股票最近 period 範圍的數據（為圖表下載較長歷史時，分析仍使用 period）"""
+    return {symbol: _slice_period(data, period, None) for symbol, data in downloaded.items()}
+
+
+class AsyncFetcher:
+    """在 DataSource 之上加入限速與抖動指數退避重試"""
+
+    def __init__(self, source, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST,
+                 retries=FETCH_MAX_RETRIES, backoff=FETCH_BACKOFF_SECONDS,
+                 max_backoff=FETCH_BACKOFF_MAX_SECONDS):
+        self.source = source
+        self.limiter = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {'requests': 0, 'retries': 0}
+        self._semaphore = None
+
+    async def fetch(self, symbol, period=DOWNLOAD_PERIOD, start=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.source.max_connections)
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self.limiter.acquire()
+                self.stats['requests'] += 1
+                try:
+                    return await self.source.fetch(symbol, period=period, start=start)
+                except Exception as e:
+                    error = e
+            if attempt >= self.retries or not self.source.is_retryable(error):
+                raise error
+            # full jitter：在 [0, 指數退避上限] 之間隨機等待，避免所有請求同時重試
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            attempt += 1
+            self.stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+
+async def _fetch_one_async(fetcher, symbol, cache, period):
+    """非同步下載單一股票（有快取時只補抓新數據）並套用略過規則"""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        cached, fresh = (None, False) if cache is None else await loop.run_in_executor(None, cache.load, symbol, period)
+        if cached is not None and fresh:
+            data = cached
+        else:
+            data = None
+            if cached is not None and len(cached) > 1:
+                delta = await fetcher.fetch(symbol, period, start=_refresh_start(cached))
+                data = _merge_cached(cached, delta, period)
+            full = data is None
+            if full:
+                # 沒有快取，或補抓結果顯示價格基準改變（分割、除息）：下載完整期間
+                data = await fetcher.fetch(symbol, period)
+                if data is not None and isinstance(data.columns, pd.MultiIndex):
+                    data.columns = data.columns.droplevel(1)
+            if cache is not None and data is not None and not data.empty:
+                await loop.run_in_executor(None, cache.save, symbol, data, period, full)
+    except Exception as e:
+        return 'error', None, time.perf_counter() - start, e
+    return _classify_download(data, time.perf_counter() - start)
+
+
+async def _fetch_all_async(symbols, fetcher, cache, period, results):
+    await fetcher.source.open()
+    try:
+        async def fetch_symbol(symbol):
+            results[symbol] = await _fetch_one_async(fetcher, symbol, cache, period)
+        await asyncio.gather(*(fetch_symbol(symbol) for symbol in symbols))
+    finally:
+        await fetcher.source.close()
+
+
+def fetch_stocks_data_async(symbols, source, cache=None, period=DOWNLOAD_PERIOD, **fetcher_options):
+    """透過非同步 DataSource 下載多支股票數據（限速、重試；重複的代碼只下載一次）
+
+    fetcher_options 會傳給 AsyncFetcher（rate、burst、retries、backoff、max_backoff）。
+    回傳 (依輸入順序排列的 {symbol: DataFrame}, {symbol: 下載秒數})。
+    """
+    requested = list(symbols)
+    symbols = list(dict.fromkeys(requested))
+    fetcher = AsyncFetcher(source, **fetcher_options)
+    rate = fetcher.limiter.rate
+    print(f"   Downloading {len(symbols)} symbols from {source.name} "
+          f"({source.max_connections} connections, {f'{rate:g} req/s' if rate > 0 else 'no rate limit'})...")
+    results = {}
+    total_start = time.perf_counter()
+    try:
+        asyncio.run(_fetch_all_async(symbols, fetcher, cache, period, results))
+    except KeyboardInterrupt:
+        print(f"\n[!] Download interrupted by user")
+    downloaded, timings = _report_downloads(symbols, results, time.perf_counter() - total_start)
+    stats = fetcher.stats
+    print(f"   [Fetch] {stats['requests']} requests, {stats['retries']} retries, "
+          f"{len(requested) - len(symbols)} duplicate symbols skipped")
+    return downloaded, timings
+
+
+def synthetic_source(symbols, num_bars=320, interval='1d', **options):
+    """以隨機漫步數據建立 MemorySource（每支股票的數據由代碼決定，離線測試用）"""
+    frames = {symbol: generate_synthetic_ohlcv(num_bars, seed=zlib.crc32(symbol.encode()), interval=interval)
+              for symbol in symbols}
+    return MemorySource(frames, **options)
+
+
+# 離線假數據
+def generate_synthetic_ohlcv(num_bars, seed=0, start='2000-01-03', interval='1d'):
+    """產生隨機漫步 OHLCV 日線或分鐘線數據（--source fake 與離線測試、效能測試用）
+
+    分鐘線只涵蓋交易時段（09:30 起 390 分鐘），波動度依每日 K 線根數縮小。
+    """
+    rng = np.random.default_rng(seed)
+    if interval == '1d':
+        scale = 1.0
+        index = pd.bdate_range(start, periods=num_bars, name='Date')
+    else:
+        minutes = RESOLUTIONS[interval][1]
+        per_day = 390 // minutes
+        days = pd.bdate_range(start, periods=-(-num_bars // per_day)).values
+        offsets = np.timedelta64(570, 'm') + np.arange(per_day) * np.timedelta64(minutes, 'm')
+        index = pd.DatetimeIndex((days[:, None] + offsets).ravel()[:num_bars], name='Date')
+        scale = per_day ** -0.5
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015 * scale, num_bars)))
+    spread = np.abs(rng.normal(0, 0.01 * scale, num_bars)) * close
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.005 * scale, num_bars) * close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, num_bars).astype('int64'),
+    }, index=index)
@@ -0,0 +1,632 @@
+"""技術指標計算（單次累加和引擎、指標註冊表與自訂指標）、多行程指標計算與 [Results] 分析結果"""
+import contextlib
+import re
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import warnings
+
+from .lazy import np, pd
+from .config import (
+    BOLLINGER_PERIOD, BOLLINGER_STD, INDICATOR_CACHE_SYMBOLS, INDICATOR_OVERLAY_COLORS, MA_PERIODS,
+    STATS_LOOKBACKS, VOLUME_DOWN_COLOR, VOLUME_FLAT_COLOR, VOLUME_UP_COLOR,
+)
+from .stats import align_closes, compute_batch_stats, compute_summary_stats
+
+
+def compute_volume_colors(close):
+    """以向量化差分預先計算成交量柱顏色（上漲紅、下跌綠、第一根灰）"""
+    close = np.asarray(close, dtype=np.float64)
+    colors = np.where(close[1:] >= close[:-1], VOLUME_UP_COLOR, VOLUME_DOWN_COLOR)
+    return np.concatenate([np.array([VOLUME_FLAT_COLOR]), colors]) if len(close) > 0 else colors
+
+
+# 技術指標計算
+def _shifted_values(close):
+    """以平均值平移收盤價（降低大數相減造成的精度損失），NaN 以 0 代替；回傳 (平移後數值, 平移量, NaN 累計數或 None)"""
+    x = np.ascontiguousarray(close, dtype=np.float64)
+    nan_mask = np.isnan(x)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        base = np.nan_to_num(np.nanmean(x, axis=0))
+    shifted = x - base
+    cnan = None
+    if nan_mask.any():
+        shifted[nan_mask] = 0.0
+        cnan = _prefix_sum(nan_mask)
+    return shifted, base, cnan
+
+
+def _prefix_sum(values):
+    """沿第 0 軸的累加和，前面補一列 0（第 i 列為前 i 個數值的和）"""
+    zeros = np.zeros((1,) + values.shape[1:])
+    return np.concatenate([zeros, np.cumsum(values, axis=0)])
+
+
+def _window_mean(csum, base, cnan, window):
+    n = csum.shape[0] - 1
+    mean = np.full((n,) + csum.shape[1:], np.nan)
+    if 0 < window <= n:
+        mean[window - 1:] = (csum[window:] - csum[:-window]) / window + base
+        if cnan is not None:
+            mean[window - 1:][(cnan[window:] - cnan[:-window]) > 0] = np.nan
+    return mean
+
+
+def _window_std(csum, csum_sq, cnan, window):
+    n = csum.shape[0] - 1
+    std = np.full((n,) + csum.shape[1:], np.nan)
+    if 1 < window <= n:
+        window_sum = csum[window:] - csum[:-window]
+        window_sq = csum_sq[window:] - csum_sq[:-window]
+        var = (window_sq - window_sum * window_sum / window) / (window - 1)
+        std[window - 1:] = np.sqrt(np.maximum(var, 0.0))
+        if cnan is not None:
+            std[window - 1:][(cnan[window:] - cnan[:-window]) > 0] = np.nan
+    return std
+
+
+def rolling_windows(close, mean_windows, std_windows=()):
+    """單次累加和 / 平方累加和計算多個視窗的移動平均與標準差
+
+    close 可為 1-D（單一股票）或 2-D（日期 × 股票）陣列，沿第 0 軸計算。
+    相同的視窗只計算一次；含 NaN 的視窗輸出 NaN，與 pandas rolling 一致。
+    回傳 ({window: 平均}, {window: 樣本標準差})。
+    """
+    shifted, base, cnan = _shifted_values(close)
+    csum = _prefix_sum(shifted)
+    csum_sq = _prefix_sum(shifted * shifted) if std_windows else None
+    means = {window: _window_mean(csum, base, cnan, window) for window in sorted(set(mean_windows))}
+    stds = {window: _window_std(csum, csum_sq, cnan, window) for window in sorted(set(std_windows))}
+    return means, stds
+
+
+# 指標註冊表：每個節點以 (種類, 參數..., 輸入節點...) 表示，輸入為單一欄位名稱的節點（例如 ('Close',)）
+# 直接讀取數據；相同的節點（例如同一欄位的累加和）在一次計算中只計算一次
+INDICATOR_NODES = {}
+
+
+def indicator_node(kind, inputs):
+    """註冊一種指標節點：inputs(*參數) 回傳依賴的節點，被裝飾的函式以 (*參數, *依賴結果) 計算"""
+    def register(compute):
+        INDICATOR_NODES[kind] = {'inputs': inputs, 'compute': compute}
+        return compute
+    return register
+
+
+def _ewm(values, alpha, min_periods):
+    """遞迴指數平滑（等同 pandas ewm(alpha=alpha, adjust=False, ignore_na=True)），沿第 0 軸計算
+
+    每個欄位從第一個有效值開始，有效值少於 min_periods 根時輸出 NaN。
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    state = np.full(x.shape[1:], np.nan)
+    count = np.zeros(x.shape[1:], dtype=np.int64)
+    for i in range(x.shape[0]):
+        row = x[i]
+        valid = ~np.isnan(row)
+        state = np.where(valid, np.where(np.isnan(state), row, state + alpha * (row - state)), state)
+        count += valid
+        out[i] = np.where(count >= min_periods, state, np.nan)
+    return out
+
+
+@indicator_node('SHIFT', lambda source: [source])
+def _shift_node(source, values):
+    return _shifted_values(values)
+
+
+@indicator_node('CSUM', lambda source: [('SHIFT', source)])
+def _csum_node(source, shifted):
+    return _prefix_sum(shifted[0])
+
+
+@indicator_node('CSUM_SQ', lambda source: [('SHIFT', source)])
+def _csum_sq_node(source, shifted):
+    return _prefix_sum(shifted[0] * shifted[0])
+
+
+@indicator_node('SMA', lambda window, source: [('SHIFT', source), ('CSUM', source)])
+def _sma_node(window, source, shifted, csum):
+    return _window_mean(csum, shifted[1], shifted[2], window)
+
+
+@indicator_node('STD', lambda window, source: [('SHIFT', source), ('CSUM', source), ('CSUM_SQ', source)])
+def _std_node(window, source, shifted, csum, csum_sq):
+    return _window_std(csum, csum_sq, shifted[2], window)
+
+
+@indicator_node('BB_upper', lambda window, num_std, source: [('SMA', window, source), ('STD', window, source)])
+def _bb_upper_node(window, num_std, source, middle, std):
+    return middle + (num_std * std)
+
+
+@indicator_node('BB_lower', lambda window, num_std, source: [('SMA', window, source), ('STD', window, source)])
+def _bb_lower_node(window, num_std, source, middle, std):
+    return middle - (num_std * std)
+
+
+@indicator_node('EMA', lambda window, source: [source])
+def _ema_node(window, source, values):
+    return _ewm(values, 2.0 / (window + 1), window)
+
+
+@indicator_node('RMA', lambda window, source: [source])
+def _rma_node(window, source, values):
+    """Wilder 平滑（alpha = 1 / window），RSI 與 ATR 使用"""
+    return _ewm(values, 1.0 / window, window)
+
+
+@indicator_node('CHANGE', lambda source: [source])
+def _change_node(source, values):
+    change = np.full(values.shape, np.nan)
+    change[1:] = values[1:] - values[:-1]
+    return change
+
+
+@indicator_node('GAIN', lambda source: [('CHANGE', source)])
+def _gain_node(source, change):
+    return np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+
+
+@indicator_node('LOSS', lambda source: [('CHANGE', source)])
+def _loss_node(source, change):
+    return np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+
+
+@indicator_node('RSI', lambda window: [('RMA', window, ('GAIN', ('Close',))), ('RMA', window, ('LOSS', ('Close',)))])
+def _rsi_node(window, gain, loss):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gain / (gain + loss)
+
+
+@indicator_node('MACD', lambda fast, slow: [('EMA', fast, ('Close',)), ('EMA', slow, ('Close',))])
+def _macd_node(fast, slow, fast_ema, slow_ema):
+    return fast_ema - slow_ema
+
+
+@indicator_node('MACD_signal', lambda fast, slow, signal: [('EMA', signal, ('MACD', fast, slow))])
+def _macd_signal_node(fast, slow, signal, signal_ema):
+    return signal_ema
+
+
+@indicator_node('MACD_hist', lambda fast, slow, signal: [('MACD', fast, slow), ('MACD_signal', fast, slow, signal)])
+def _macd_hist_node(fast, slow, signal, macd, macd_signal):
+    return macd - macd_signal
+
+
+@indicator_node('TR', lambda: [('High',), ('Low',), ('Close',)])
+def _true_range_node(high, low, close):
+    previous = np.full(close.shape, np.nan)
+    previous[1:] = close[:-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+@indicator_node('ATR', lambda window: [('RMA', window, ('TR',))])
+def _atr_node(window, true_range):
+    return true_range
+
+
+@indicator_node('TPV', lambda: [('High',), ('Low',), ('Close',), ('Volume',)])
+def _typical_price_volume_node(high, low, close, volume):
+    return (high + low + close) / 3 * volume
+
+
+@indicator_node('VWAP', lambda window: ([('TPV',), ('Volume',)] if window == 0
+                                        else [('SMA', window, ('TPV',)), ('SMA', window, ('Volume',))]))
+def _vwap_node(window, price_volume, volume):
+    """window 為 0 時從第一根 K 線起累計，否則為最近 window 根的成交量加權平均價"""
+    if window == 0:
+        price_volume = np.cumsum(np.nan_to_num(price_volume), axis=0)
+        volume = np.cumsum(np.nan_to_num(volume), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(volume > 0, price_volume / volume, np.nan)
+
+
+def evaluate_indicator_nodes(inputs, nodes, memo=None):
+    """依相依關係計算指標節點，回傳 {節點: 陣列}
+
+    inputs 為 {欄位名稱: 數值}（DataFrame 或 dict 皆可，數值可為 1-D 或 2-D）；
+    memo 中已有的節點（含共用的中間結果）不會重新計算，新算出的節點也會寫回 memo。
+    """
+    memo = {} if memo is None else memo
+
+    def visit(node):
+        value = memo.get(node)
+        if value is None:
+            spec = INDICATOR_NODES.get(node[0])
+            if spec is None:
+                value = np.asarray(inputs[node[0]], dtype=np.float64)
+            else:
+                params = node[1:]
+                value = spec['compute'](*params, *[visit(dependency) for dependency in spec['inputs'](*params)])
+            memo[node] = value
+        return value
+
+    return {node: visit(node) for node in nodes}
+
+
+# 自訂指標：種類 -> (參數名稱, 預設參數, 是否與價格同尺度)
+INDICATOR_SPECS = {
+    'SMA': (('window',), (50,), True),
+    'EMA': (('window',), (50,), True),
+    'BB': (('window', 'num_std'), (BOLLINGER_PERIOD, BOLLINGER_STD), True),
+    'VWAP': (('window',), (0,), True),
+    'RSI': (('window',), (14,), False),
+    'MACD': (('fast', 'slow', 'signal'), (12, 26, 9), False),
+    'ATR': (('window',), (14,), False),
+}
+
+
+def indicator_columns(kind, params):
+    """將一個自訂指標轉為 {欄位名稱: 指標節點}"""
+    close = ('Close',)
+    if kind in ('SMA', 'EMA', 'RSI', 'ATR'):
+        window = params[0]
+        node = (kind, window, close) if kind in ('SMA', 'EMA') else (kind, window)
+        return {f'{kind}{window}': node}
+    if kind == 'VWAP':
+        return {f'VWAP{params[0] or ""}': ('VWAP', params[0])}
+    if kind == 'BB':
+        window, num_std = params
+        prefix = f'BB{window}x{num_std:g}'
+        return {f'{prefix}_upper': ('BB_upper', window, num_std, close),
+                f'{prefix}_middle': ('SMA', window, close),
+                f'{prefix}_lower': ('BB_lower', window, num_std, close)}
+    fast, slow, signal = params
+    name = f'MACD{fast}_{slow}_{signal}'
+    return {name: ('MACD', fast, slow),
+            f'{name}_signal': ('MACD_signal', fast, slow, signal),
+            f'{name}_hist': ('MACD_hist', fast, slow, signal)}
+
+
+def parse_indicator_spec(text):
+    """解析自訂指標，例如 EMA50、EMA(50)、RSI(14)、MACD(12,26,9)、BB(30,2.5)、VWAP、VWAP(20)
+
+    回傳 (種類, 參數)，格式錯誤時拋出 ValueError。
+    """
+    match = re.fullmatch(r'\s*([A-Za-z]+)\s*(?:\(([^)]*)\)|(\d+))?\s*', text)
+    kind = match.group(1).upper() if match else None
+    if kind not in INDICATOR_SPECS:
+        raise ValueError(f"Unknown indicator '{text}' (available: {', '.join(INDICATOR_SPECS)})")
+    names, defaults, _ = INDICATOR_SPECS[kind]
+    raw = match.group(2) if match.group(2) is not None else match.group(3)
+    values = [v.strip() for v in raw.split(',')] if raw else []
+    if len(values) > len(names):
+        raise ValueError(f"{kind} takes at most {len(names)} parameters ({', '.join(names)}), got '{text}'")
+    params = []
+    for name, default, value in zip(names, defaults, values + [None] * (len(names) - len(values))):
+        if value is None:
+            params.append(default)
+            continue
+        try:
+            number = float(value) if name == 'num_std' else int(value)
+        except ValueError:
+            raise ValueError(f"Invalid {name} '{value}' in indicator '{text}'")
+        if number <= 0 or (name != 'num_std' and number < 2):
+            raise ValueError(f"Invalid {name} '{value}' in indicator '{text}'")
+        params.append(number)
+    if kind == 'MACD' and params[0] >= params[1]:
+        raise ValueError(f"MACD fast window must be shorter than the slow window, got '{text}'")
+    return kind, tuple(params)
+
+
+# 預設指標欄位（MA_PERIODS 與布林通道）；add_indicator 加入的自訂指標也會寫入 INDICATOR_COLUMNS，
+# 與價格同尺度的自訂指標另外記錄在 INDICATOR_OVERLAYS（欄位名稱 -> (圖例文字範本, 顏色, 線型)）
+DEFAULT_INDICATOR_COLUMNS = {ma_name: ('SMA', period, ('Close',)) for ma_name, (period, _, _) in MA_PERIODS.items()}
+DEFAULT_INDICATOR_COLUMNS.update({
+    'BB_middle': ('SMA', BOLLINGER_PERIOD, ('Close',)),
+    'BB_upper': ('BB_upper', BOLLINGER_PERIOD, BOLLINGER_STD, ('Close',)),
+    'BB_lower': ('BB_lower', BOLLINGER_PERIOD, BOLLINGER_STD, ('Close',)),
+})
+INDICATOR_COLUMNS = dict(DEFAULT_INDICATOR_COLUMNS)
+INDICATOR_OVERLAYS = {}
+
+
+def add_indicator(text):
+    """加入一個自訂指標（格式見 parse_indicator_spec），回傳新增的欄位名稱"""
+    kind, params = parse_indicator_spec(text)
+    columns = {name: node for name, node in indicator_columns(kind, params).items() if name not in INDICATOR_COLUMNS}
+    INDICATOR_COLUMNS.update(columns)
+    if INDICATOR_SPECS[kind][2] and columns:
+        color = INDICATOR_OVERLAY_COLORS[len(set(c for _, c, _ in INDICATOR_OVERLAYS.values())) % len(INDICATOR_OVERLAY_COLORS)]
+        window = params[0]
+        for name in columns:
+            # {unit} 由圖表依 K 線解析度填入（日線為 day，分鐘線為 bar）
+            label = f'{name} ({window}-{{unit}})' if kind in ('SMA', 'EMA') or (kind == 'VWAP' and window) else name
+            style = ':' if name.endswith('_middle') else '--' if kind == 'BB' else '-'
+            INDICATOR_OVERLAYS[name] = (label, color, style)
+    return list(columns)
+
+
+def custom_indicator_columns():
+    """add_indicator 加入的 {欄位名稱: 指標節點}"""
+    return {name: node for name, node in INDICATOR_COLUMNS.items() if name not in DEFAULT_INDICATOR_COLUMNS}
+
+
+def data_version(data):
+    """數據版本：K 線數、最後時間與最新收盤價（即時模式附加或更新最後一根 K 線時都會改變）"""
+    if len(data) == 0:
+        return (0, None, None)
+    return (len(data), data.index[-1], float(data['Close'].iloc[-1]))
+
+
+class IndicatorCache:
+    """依 (股票, 指標節點, 數據版本) 保存已計算的指標與中間結果
+
+    同一版本的數據再次要求指標時（例如加入自訂的 EMA50 後重新計算），已存在的節點直接重用；
+    數據版本改變時整組結果作廢。最多保留 max_symbols 支股票（LRU），背景執行緒可同時使用。
+    """
+
+    def __init__(self, max_symbols=INDICATOR_CACHE_SYMBOLS):
+        self.max_symbols = max_symbols
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def evaluate(self, symbol, data, nodes):
+        """計算（或重用）symbol 的指標節點；只在讀取與寫回快取時持有鎖，計算時不阻擋其他執行緒"""
+        version = data_version(data)
+        with self._lock:
+            entry = self._entries.get(symbol)
+            memo = dict(entry[1]) if entry is not None and entry[0] == version else {}
+        known = len(memo)
+        reused = sum(1 for node in nodes if node in memo)
+        values = evaluate_indicator_nodes(data, nodes, memo)
+        with self._lock:
+            self.computed += len(memo) - known
+            self.reused += reused
+            # 計算期間其他執行緒可能已寫回同一版本的節點，合併後再移到 LRU 的尾端
+            entry = self._entries.pop(symbol, None)
+            if entry is not None and entry[0] == version:
+                memo.update(entry[1])
+            self._entries[symbol] = (version, memo)
+            while len(self._entries) > self.max_symbols:
+                self._entries.pop(next(iter(self._entries)))
+        return values
+
+
+INDICATOR_CACHE = IndicatorCache()
+
+
+def compute_indicator_arrays(close):
+    """依 MA_PERIODS 與布林通道參數計算所有指標欄位，回傳 {欄位名稱: 陣列}
+
+    只需要收盤價（可為 (K 線 × 股票) 矩陣），欄位為 DEFAULT_INDICATOR_COLUMNS 加上 BB_std。
+    """
+    columns = dict(DEFAULT_INDICATOR_COLUMNS)
+    columns['BB_std'] = ('STD', BOLLINGER_PERIOD, ('Close',))
+    values = evaluate_indicator_nodes({'Close': close}, columns.values())
+    order = list(MA_PERIODS) + ['BB_middle', 'BB_std', 'BB_upper', 'BB_lower']
+    return {name: values[columns[name]] for name in order}
+
+
+def ensure_indicators(stock, symbol=None):
+    """第一次顯示（或分析）某支股票時才計算指標，回傳含指標的 data_full
+
+    只計算 data_full 缺少的 INDICATOR_COLUMNS 欄位；傳入 symbol 時經由 INDICATOR_CACHE 重用已算過的節點。
+    以新的 DataFrame 取代 stock['data_full']，背景執行緒預先計算時不會修改繪圖中正在讀取的數據。
+    """
+    data = stock['data_full']
+    missing = {name: node for name, node in INDICATOR_COLUMNS.items() if name not in data.columns}
+    if missing:
+        if symbol is None:
+            values = evaluate_indicator_nodes(data, missing.values())
+        else:
+            values = INDICATOR_CACHE.evaluate(symbol, data, missing.values())
+        data = data.assign(**{name: values[node] for name, node in missing.items()})
+        stock['data_full'] = data
+    return data
+
+
+def latest_indicator_values(symbol, data, columns):
+    """回傳 {欄位名稱: 最新值}（經由 INDICATOR_CACHE，之後顯示圖表時不必重新計算）"""
+    values = INDICATOR_CACHE.evaluate(symbol, data, columns.values())
+    return {name: float(values[node][-1]) for name, node in columns.items() if len(data) > 0}
+
+
+def latest_moving_averages(data):
+    """回傳每條移動平均線的最新值（已計算指標時直接讀取，否則只用最後 period 根收盤價計算）"""
+    close = data['Close'].to_numpy(dtype=np.float64)
+    values = {}
+    for ma_name, (period, _, _) in MA_PERIODS.items():
+        if ma_name in data.columns:
+            value = data[ma_name].iloc[-1]
+        elif len(close) >= period:
+            value = close[-period:].mean()
+        else:
+            continue
+        if not pd.isna(value):
+            values[ma_name] = float(value)
+    return values
+
+
+def _calculate_indicators_pandas(data):
+    """原本逐欄呼叫 pandas rolling 的計算方式（僅供驗證與效能比較）"""
+    for ma_name, (period, _, _) in MA_PERIODS.items():
+        data[ma_name] = data['Close'].rolling(window=period).mean()
+    data['BB_middle'] = data['Close'].rolling(window=BOLLINGER_PERIOD).mean()
+    data['BB_std'] = data['Close'].rolling(window=BOLLINGER_PERIOD).std()
+    data['BB_upper'] = data['BB_middle'] + (BOLLINGER_STD * data['BB_std'])
+    data['BB_lower'] = data['BB_middle'] - (BOLLINGER_STD * data['BB_std'])
+    return data
+
+
+def calculate_indicators_batch(downloaded, lookback=130, workers=1):
+    """矩陣模式：一次向量化計算所有股票的 MA、布林通道與統計數據
+
+    結果拆回與逐支計算相同的 {symbol: {'data_full': DataFrame}} 結構，
+    並回傳 {symbol: 統計數據} 供 print_analysis_results 使用。
+    workers > 1 時以共享記憶體將股票分片給多個行程平行計算指標。
+    """
+    symbols, matrix, lengths = align_closes(downloaded)
+    num_bars = matrix.shape[0]
+    t0 = time.perf_counter()
+    if workers > 1:
+        print(f"   Calculating indicators for {len(symbols)} symbols on a {num_bars}x{len(symbols)} matrix "
+              f"with {workers} processes (shared memory)...")
+        with parallel_indicator_arrays(matrix, workers) as columns:
+            stocks_data = _split_indicator_columns(downloaded, symbols, lengths, columns)
+    else:
+        print(f"   Calculating indicators for {len(symbols)} symbols on a {num_bars}x{len(symbols)} matrix...")
+        stocks_data = _split_indicator_columns(downloaded, symbols, lengths, compute_indicator_arrays(matrix))
+    batch_stats = compute_batch_stats(matrix, lookback)
+    stats_by_symbol = {}
+    for j, symbol in enumerate(symbols):
+        stats_by_symbol[symbol] = {key: float(values[j]) for key, values in batch_stats.items()}
+    print(f"   [OK] Matrix indicators calculated in {time.perf_counter() - t0:.2f}s")
+    return stocks_data, stats_by_symbol
+
+
+def _split_indicator_columns(downloaded, symbols, lengths, columns):
+    """將 (K 線 × 股票) 指標矩陣拆回每支股票的 data_full（複製成各自的 DataFrame）"""
+    names = list(columns.keys())
+    num_bars = next(iter(columns.values())).shape[0]
+    stocks_data = {}
+    for j, symbol in enumerate(symbols):
+        data = downloaded[symbol]
+        start = num_bars - lengths[j]
+        block = np.column_stack([columns[name][start:, j] for name in names])
+        indicators = pd.DataFrame(block, index=data.index, columns=names)
+        data = pd.concat([data.drop(columns=names, errors='ignore'), indicators], axis=1)
+        stocks_data[symbol] = {
+            'data_full': data,
+            'volume_colors': compute_volume_colors(data['Close'])
+        }
+    return stocks_data
+
+
+def _attach_shared_memory(name):
+    """工作行程附加到父行程建立的共享記憶體
+
+    Python 3.13 起以 track=False 不登記到 resource_tracker；較舊版本的子行程與父行程共用同一個
+    resource_tracker，重複登記不影響，仍由父行程在 unlink 時移除。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _indicator_shard_worker(input_name, output_name, shape, names, start, stop):
+    """工作行程：計算第 start:stop 支股票的指標，直接寫入共享的輸出緩衝區"""
+    shm_in = _attach_shared_memory(input_name)
+    shm_out = _attach_shared_memory(output_name)
+    try:
+        closes = np.ndarray(shape, dtype=np.float64, buffer=shm_in.buf)
+        outputs = np.ndarray((len(names),) + tuple(shape), dtype=np.float64, buffer=shm_out.buf)
+        columns = compute_indicator_arrays(closes[:, start:stop])
+        for k, name in enumerate(names):
+            outputs[k, :, start:stop] = columns[name]
+        del closes, outputs, columns
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return stop - start
+
+
+@contextlib.contextmanager
+def parallel_indicator_arrays(matrix, workers, shards_per_worker=2):
+    """將收盤價矩陣放進共享記憶體，依股票分片給多個行程計算指標
+
+    產生 {欄位名稱: 共享輸出緩衝區中的 (K 線 × 股票) 陣列}，父行程不需複製結果；
+    離開 with 區塊後緩衝區即被釋放，需要保留的數據必須先複製出來。
+    """
+    num_bars, num_symbols = matrix.shape
+    names = list(compute_indicator_arrays(matrix[:1, :1]).keys())
+    shm_in = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(len(names) * matrix.nbytes, 1))
+    columns = {}
+    try:
+        closes = np.ndarray(matrix.shape, dtype=np.float64, buffer=shm_in.buf)
+        closes[:] = matrix
+        del closes
+        bounds = np.linspace(0, num_symbols, min(num_symbols, workers * shards_per_worker) + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_indicator_shard_worker, shm_in.name, shm_out.name, matrix.shape,
+                                       names, int(start), int(stop))
+                       for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+            for future in as_completed(futures):
+                future.result()
+        outputs = np.ndarray((len(names), num_bars, num_symbols), dtype=np.float64, buffer=shm_out.buf)
+        columns.update({name: outputs[k] for k, name in enumerate(names)})
+        del outputs
+        yield columns
+    finally:
+        columns.clear()
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+
+def compute_analysis_results(data, stats=None, indicators=None):
+    """計算單一股票的 [Results] 統計數據、MA 偏離程度與技術趨勢
+
+    stats 為矩陣模式預先算好的統計數據；indicators 為自訂指標的最新值（latest_indicator_values）。
+    """
+    if stats is None:
+        stats = compute_summary_stats(data['Close'].to_numpy(), {'6M': STATS_LOOKBACKS['6M']})['6M']
+    end_price = stats['end_price']
+    return_rate = stats['return_pct']
+    max_price = stats['max_price']
+    min_price = stats['min_price']
+    avg_price = stats['avg_price']
+    volatility = stats['volatility']
+    max_drawdown = stats['max_drawdown']
+    results = {
+        'latest_price': float(end_price),
+        'return_pct': float(return_rate),
+        'avg_price': float(avg_price),
+        'high': float(max_price),
+        'low': float(min_price),
+        'range_pct': float((max_price - min_price) / min_price * 100),
+        'volatility_pct': float(volatility),
+        'max_drawdown_pct': float(max_drawdown),
+        'ma': {},
+        'trend': None,
+        'indicators': dict(indicators or {})
+    }
+    latest_ma = latest_moving_averages(data)
+    for ma_name, ma_value in latest_ma.items():
+        diff_pct = ((end_price - ma_value) / ma_value) * 100
+        results['ma'][ma_name] = {'value': ma_value, 'diff_pct': float(diff_pct)}
+    if 'MA20' in latest_ma:
+        current_vs_ma20 = data['Close'].iloc[-1] / latest_ma['MA20']
+        if current_vs_ma20 > 1.02:
+            trend = "[++] Strong (Price well above MA20)"
+        elif current_vs_ma20 > 1.00:
+            trend = "[+] Neutral-Bullish"
+        elif current_vs_ma20 > 0.98:
+            trend = "[-] Neutral-Bearish"
+        else:
+            trend = "[--] Weak (Price well below MA20)"
+        results['trend'] = trend
+    return results
+
+
+def print_analysis_results(symbol, data, stats=None, indicators=None):
+    """輸出單一股票的統計結果與 MA 偏離程度，並回傳 compute_analysis_results 的結果"""
+    results = compute_analysis_results(data, stats, indicators)
+    print(f"\n[Results] {symbol} Analysis Results:")
+    print(f"   Latest Price: ${results['latest_price']:.2f}")
+    print(f"   6-Month Return: {results['return_pct']:+.2f}%")
+    print(f"   Average Price: ${results['avg_price']:.2f}")
+    print(f"   Period High: ${results['high']:.2f}")
+    print(f"   Period Low: ${results['low']:.2f}")
+    print(f"   Price Range: {results['range_pct']:.1f}%")
+    print(f"   Annualized Volatility: {results['volatility_pct']:.1f}%")
+    print(f"   Maximum Drawdown: {results['max_drawdown_pct']:.1f}%")
+    print(f"\n[MA Values] Moving Averages (Latest Values):")
+    for ma_name, ma in results['ma'].items():
+        print(f"   {ma_name}: ${ma['value']:.2f} ({ma['diff_pct']:+.2f}% from current)")
+    if results['trend'] is not None:
+        print(f"   Technical Trend: {results['trend']}")
+    if results['indicators']:
+        print(f"\n[Indicators] Custom Indicators (Latest Values):")
+        for name, value in results['indicators'].items():
+            print(f"   {name}: {value:.2f}")
+    return results
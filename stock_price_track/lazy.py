@@ -0,0 +1,112 @@
+"""啟動相關的共用機制：延後匯入 numpy / pandas / matplotlib / yfinance / Numba，以及 --import-times 的時間紀錄"""
+import sys
+import importlib
+import importlib.util
+import time
+import threading
+
+# 開始載入套件的時間（--import-times 用）
+SCRIPT_LOAD_STARTED = time.perf_counter()
+
+# 延後匯入的套件：第一次存取時才匯入，啟動到輸入提示、報表與效能測試只載入實際用到的部分
+DEFERRED_MODULES = {
+    'np': 'numpy',
+    'pd': 'pandas',
+    'plt': 'matplotlib.pyplot',
+    'mdates': 'matplotlib.dates',
+    'yf': 'yfinance',
+}
+IMPORT_TIMES = []  # [(模組名稱, 秒數)]，依實際匯入順序
+STARTUP_MARKS = []  # [(階段, 距開始載入套件的秒數)]
+_import_lock = threading.RLock()
+_matplotlib_backend = {'name': None}
+
+
+class _DeferredModule:
+    """套件的替身：第一次存取屬性時匯入真正的模組，並取代各模組中同名的全域變數"""
+
+    def __init__(self, alias):
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        return getattr(load_module(self._alias), attr)
+
+
+def _timed_import(name):
+    """匯入模組並記錄耗時（已載入的模組不重複記錄）"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.append((name, time.perf_counter() - start))
+    return module
+
+
+def load_module(alias):
+    """匯入 DEFERRED_MODULES 中的套件（只做一次）並回傳真正的模組"""
+    module = globals()[alias]
+    if not isinstance(module, _DeferredModule):
+        return module
+    with _import_lock:
+        module = globals()[alias]
+        if isinstance(module, _DeferredModule):
+            name = DEFERRED_MODULES[alias]
+            if name == 'matplotlib.pyplot' and _matplotlib_backend['name']:
+                _timed_import('matplotlib').use(_matplotlib_backend['name'])
+            module = _timed_import(name)
+            if name == 'matplotlib.pyplot':
+                module.rcParams['axes.unicode_minus'] = False
+                module.style.use('default')
+            # 各模組以 from .lazy import np 取得替身；換成真正的模組後，之後的存取不再經過 __getattr__
+            prefix = __name__.rpartition('.')[0] + '.'
+            for module_name, package_module in list(sys.modules.items()):
+                if module_name.startswith(prefix) and isinstance(getattr(package_module, alias, None), _DeferredModule):
+                    setattr(package_module, alias, module)
+    return module
+
+
+def mark_startup(stage):
+    """記錄啟動過程中某個階段完成的時間點"""
+    STARTUP_MARKS.append((stage, time.perf_counter() - SCRIPT_LOAD_STARTED))
+
+
+def print_import_times():
+    """輸出類似 -X importtime 的啟動時間分解：套件載入、各延後匯入的套件與主要階段"""
+    print("\n[Startup] Deferred imports (in load order, self + dependencies):")
+    for name, seconds in IMPORT_TIMES:
+        print(f"   {seconds * 1000:8.1f} ms  {name}")
+    if not IMPORT_TIMES:
+        print("   (none)")
+    for stage, seconds in STARTUP_MARKS:
+        print(f"   [{stage}] reached at {seconds * 1000:.0f} ms")
+
+
+def use_headless_backend():
+    """報表與效能測試改用 Agg；pyplot 尚未匯入時直接以 Agg 載入，不必先初始化 GUI 後端"""
+    with _import_lock:
+        _matplotlib_backend['name'] = 'Agg'
+        if not isinstance(plt, _DeferredModule):
+            plt.switch_backend('Agg')
+
+
+np = _DeferredModule('np')
+pd = _DeferredModule('pd')
+plt = _DeferredModule('plt')
+mdates = _DeferredModule('mdates')
+yf = _DeferredModule('yf')
+
+# Numba 為選用套件：未安裝時統計核心改用 NumPy 向量化版本；安裝時到第一次呼叫才匯入與編譯
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+
+def lazy_njit(function):
+    """等同 numba.njit(cache=True)(function)，但延到第一次呼叫時才匯入 Numba 並編譯"""
+    compiled = []
+
+    def call(*args):
+        if not compiled:
+            with _import_lock:
+                if not compiled:
+                    compiled.append(_timed_import('numba').njit(cache=True)(function))
+        return compiled[0](*args)
+    return call
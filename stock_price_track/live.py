@@ -0,0 +1,377 @@
+"""即時更新"""
+import time
+import queue
+import threading
+
+from .lazy import np, pd
+from .config import (
+    BOLLINGER_PERIOD, BOLLINGER_STD, LIVE_BUFFER_HEADROOM, LIVE_CUSTOM_REFRESH_SECONDS, MA_PERIODS,
+    MIN_DATA_POINTS, OHLCV_COLUMNS, VOLUME_DOWN_COLOR, VOLUME_UP_COLOR,
+)
+from .indicators import INDICATOR_CACHE, custom_indicator_columns, ensure_indicators
+from .data import yfinance_downloader
+
+
+class IncrementalIndicators:
+    """以環形緩衝區與累加和逐根 O(1) 更新 MA 與布林通道
+
+    緩衝區保存最近 max(視窗) 根收盤價；每個視窗維護一個累加和，
+    布林通道視窗另外維護平方累加和。每 RESYNC_INTERVAL 次更新後
+    從緩衝區重新計算累加和，避免浮點誤差累積。
+    """
+
+    RESYNC_INTERVAL = 1000
+
+    def __init__(self, closes):
+        self.ma_windows = {ma_name: period for ma_name, (period, _, _) in MA_PERIODS.items()}
+        self.windows = sorted(set(self.ma_windows.values()) | {BOLLINGER_PERIOD})
+        self.size = max(self.windows)
+        closes = np.asarray(closes, dtype=np.float64)
+        closes = closes[~np.isnan(closes)][-self.size:]
+        # 以最近的收盤價為基準平移，降低平方和相減的誤差
+        self.base = float(closes[-1]) if len(closes) > 0 else 0.0
+        self.buffer = np.zeros(self.size)
+        self.count = len(closes)
+        self.buffer[:self.count] = closes - self.base
+        self.pos = self.count % self.size
+        self.updates = 0
+        self._resync()
+
+    def _window_values(self, window):
+        """緩衝區中最近 window 根（已平移）的數值"""
+        n = min(window, self.count)
+        idx = (self.pos - n + np.arange(n)) % self.size
+        return self.buffer[idx]
+
+    def _resync(self):
+        self.sums = {w: float(self._window_values(w).sum()) for w in self.windows}
+        values = self._window_values(BOLLINGER_PERIOD)
+        self.sq_sum = float((values * values).sum())
+
+    def push(self, close):
+        """加入一根新的收盤價"""
+        x = close - self.base
+        for w in self.windows:
+            if self.count >= w:
+                self.sums[w] -= self.buffer[(self.pos - w) % self.size]
+            self.sums[w] += x
+        if self.count >= BOLLINGER_PERIOD:
+            leaving = self.buffer[(self.pos - BOLLINGER_PERIOD) % self.size]
+            self.sq_sum -= leaving * leaving
+        self.sq_sum += x * x
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        self._after_update()
+
+    def replace_last(self, close):
+        """更新最後一根收盤價（盤中同一根 K 線的報價變動）"""
+        if self.count == 0:
+            self.push(close)
+            return
+        x = close - self.base
+        last_pos = (self.pos - 1) % self.size
+        old = self.buffer[last_pos]
+        for w in self.windows:
+            self.sums[w] += x - old
+        self.sq_sum += x * x - old * old
+        self.buffer[last_pos] = x
+        self._after_update()
+
+    def _after_update(self):
+        self.updates += 1
+        if self.updates % self.RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def values(self):
+        """回傳最新一根的指標值（與 compute_indicator_arrays 相同欄位）"""
+        means = {w: (self.sums[w] / w + self.base if self.count >= w else np.nan) for w in self.windows}
+        columns = {ma_name: means[w] for ma_name, w in self.ma_windows.items()}
+        if self.count >= BOLLINGER_PERIOD and BOLLINGER_PERIOD > 1:
+            s = self.sums[BOLLINGER_PERIOD]
+            var = (self.sq_sum - s * s / BOLLINGER_PERIOD) / (BOLLINGER_PERIOD - 1)
+            bb_std = float(np.sqrt(max(var, 0.0)))
+        else:
+            bb_std = np.nan
+        bb_middle = means[BOLLINGER_PERIOD]
+        columns['BB_middle'] = bb_middle
+        columns['BB_std'] = bb_std
+        columns['BB_upper'] = bb_middle + (BOLLINGER_STD * bb_std)
+        columns['BB_lower'] = bb_middle - (BOLLINGER_STD * bb_std)
+        return columns
+
+
+class BarBuffer:
+    """data_full 與成交量顏色的預先配置緩衝區：新 K 線寫入尾端的空位，容量用完時加倍
+
+    每個欄位一個 NumPy 陣列；frame 是指向前 size 列的 DataFrame（不複製數據），
+    因此附加 K 線的攤銷成本與歷史長度無關（有時區的分鐘線索引重建時仍會複製一次時間戳）。
+    """
+
+    def __init__(self, data, volume_colors=None):
+        self.size = len(data)
+        capacity = self.size + LIVE_BUFFER_HEADROOM
+        self.tz = data.index.tz
+        self.name = data.index.name
+        self.index = self._allocate(data.index.values, capacity)
+        self.columns = {column: self._allocate(data[column].to_numpy(), capacity) for column in data.columns}
+        # 附加的 K 線缺少某欄時填入的值（整數欄位無法存 NaN）
+        self.missing = {column: np.nan if values.dtype.kind == 'f' else 0 for column, values in self.columns.items()}
+        self.colors = None if volume_colors is None else self._allocate(np.asarray(volume_colors), capacity)
+        self._publish()
+
+    def _allocate(self, values, capacity):
+        buffer = np.empty(capacity, dtype=values.dtype)
+        buffer[:len(values)] = values
+        return buffer
+
+    def _grow(self):
+        capacity = 2 * len(self.index)
+        self.index = self._allocate(self.index[:self.size], capacity)
+        self.columns = {column: self._allocate(values[:self.size], capacity) for column, values in self.columns.items()}
+        if self.colors is not None:
+            self.colors = self._allocate(self.colors[:self.size], capacity)
+
+    def _publish(self):
+        n = self.size
+        index = pd.DatetimeIndex(self.index[:n], copy=False, name=self.name)
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        self.frame = pd.DataFrame({column: values[:n] for column, values in self.columns.items()},
+                                  index=index, copy=False)
+        self.volume_colors = None if self.colors is None else self.colors[:n]
+
+    def tracks(self, stock):
+        """stock 的 data_full 與成交量顏色是否仍是此緩衝區發出的視圖（其他程式碼替換後需重建緩衝區）"""
+        return stock['data_full'] is self.frame and stock.get('volume_colors') is self.volume_colors
+
+    def replace_last(self, row, color=None):
+        """原地更新最後一根 K 線（已發出的 frame 立即看到新值）"""
+        for column, value in row.items():
+            if column in self.columns:
+                self.columns[column][self.size - 1] = value
+        if self.colors is not None and color is not None:
+            self.colors[self.size - 1] = color
+
+    def append(self, timestamp, row, color=None):
+        """寫入一根新的 K 線；呼叫 publish() 前 frame 仍是附加前的視圖"""
+        if self.size == len(self.index):
+            self._grow()
+        self.index[self.size] = timestamp
+        for column, values in self.columns.items():
+            values[self.size] = row.get(column, self.missing[column])
+        if self.colors is not None:
+            self.colors[self.size] = color
+        self.size += 1
+
+    def publish(self, stock):
+        """把目前的 frame 與成交量顏色寫回 stock"""
+        if len(self.frame) != self.size:
+            self._publish()
+        stock['data_full'] = self.frame
+        if self.volume_colors is not None:
+            stock['volume_colors'] = self.volume_colors
+
+
+class ReplayBarSource:
+    """本地重播來源：保留每支股票最後 holdback 根 K 線，之後每次 poll 依序吐出
+
+    poll(symbol, last_timestamp) 回傳時間 >= last_timestamp 的新 K 線
+    （與 last_timestamp 相同的 K 線代表更新最後一根）。
+    """
+
+    def __init__(self, frames, holdback=60, bars_per_poll=1):
+        self.bars_per_poll = bars_per_poll
+        self.pending = {}
+        self.initial = {}
+        for symbol, data in frames.items():
+            holdback_bars = min(holdback, max(len(data) - MIN_DATA_POINTS, 0))
+            self.initial[symbol] = data.iloc[:len(data) - holdback_bars].copy()
+            self.pending[symbol] = data.iloc[len(data) - holdback_bars:]
+
+    def initial_data(self):
+        """開始重播前的歷史數據"""
+        return self.initial
+
+    def poll(self, symbol, last_timestamp):
+        pending = self.pending.get(symbol)
+        if pending is None or len(pending) == 0:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        bars = pending.iloc[:self.bars_per_poll]
+        self.pending[symbol] = pending.iloc[self.bars_per_poll:]
+        return bars
+
+
+class YFinanceBarSource:
+    """以 yfinance 輪詢最新 K 線（每支股票至少間隔 min_interval 秒，避免被限流）"""
+
+    def __init__(self, min_interval=60.0):
+        self.min_interval = min_interval
+        self.last_poll = {}
+
+    def poll(self, symbol, last_timestamp):
+        now = time.time()
+        if now - self.last_poll.get(symbol, 0) < self.min_interval:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        self.last_poll[symbol] = now
+        data = yfinance_downloader(symbol, start=last_timestamp)
+        if data is None or data.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return data[data.index >= last_timestamp]
+
+
+class LiveUpdater:
+    """即時模式：背景執行緒輪詢數據來源，主執行緒套用新 K 線並以 O(1) 更新指標
+
+    poll_once() 由背景執行緒（或測試）呼叫，只把新 K 線放進佇列；
+    drain() 在繪圖執行緒呼叫，寫入 data_full、更新指標與成交量顏色，
+    並回傳有變動的股票代碼（包含 references）。新 K 線寫入每支股票的 BarBuffer，不會每根複製整段歷史。
+    自訂指標（--indicator）沒有逐根更新的版本，每支股票最多每 custom_refresh 秒整欄重新計算一次，
+    期間新 K 線的自訂指標欄位為 NaN。
+    references 為只輪詢、不顯示也不分析的數據 {symbol: DataFrame}（例如 --beta-vs 的基準），
+    更新後以 frame(symbol) 取得。
+    """
+
+    def __init__(self, stocks_data, source, interval=1.0, screener=None, references=None,
+                 custom_refresh=LIVE_CUSTOM_REFRESH_SECONDS):
+        self.stocks_data = stocks_data
+        self.references = {symbol: {'data_full': data} for symbol, data in (references or {}).items()}
+        self.source = source
+        self.interval = interval
+        self.screener = screener
+        self.queue = queue.Queue()
+        # 即時更新會逐根寫入所有指標欄位，因此先補齊尚未計算的股票
+        for symbol, stock in stocks_data.items():
+            ensure_indicators(stock, symbol)
+        tracked = list(stocks_data.items()) + list(self.references.items())
+        self.indicators = {symbol: IncrementalIndicators(stock['data_full']['Close'].to_numpy())
+                           for symbol, stock in tracked}
+        self.last_timestamp = {symbol: stock['data_full'].index[-1] for symbol, stock in tracked}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.timer = None
+        self.tick_times = []
+        self.last_closes = {}
+        self.buffers = {}
+        self.custom_refresh = custom_refresh
+        self.custom_refreshed = {}
+        self.custom_stale = set()
+
+    def frame(self, symbol):
+        """股票或 references 目前的 data_full"""
+        stock = self.stocks_data[symbol] if symbol in self.stocks_data else self.references[symbol]
+        return stock['data_full']
+
+    def poll_once(self):
+        for symbol in self.last_timestamp:
+            try:
+                bars = self.source.poll(symbol, self.last_timestamp[symbol])
+            except Exception as e:
+                print(f"[X] Live update failed for {symbol}: {str(e)}")
+                continue
+            if bars is None or len(bars) == 0:
+                continue
+            self.last_timestamp[symbol] = bars.index[-1]
+            self.queue.put((symbol, bars))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            self.poll_once()
+            self.stop_event.wait(max(self.interval - (time.perf_counter() - start), 0))
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def drain(self):
+        changed = []
+        while True:
+            try:
+                symbol, bars = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self._apply_bars(symbol, bars)
+            if symbol not in changed:
+                changed.append(symbol)
+        for symbol in self._refresh_custom_indicators():
+            if symbol not in changed:
+                changed.append(symbol)
+        if self.screener is not None:
+            for symbol in (s for s in changed if s in self.stocks_data):
+                close = self.stocks_data[symbol]['data_full']['Close'].to_numpy(dtype=np.float64)
+                for text, matched in self.screener.update(symbol, close):
+                    print(f"[Screen] {symbol} {'now matches' if matched else 'no longer matches'} '{text}'")
+        return changed
+
+    def _apply_bars(self, symbol, bars):
+        """套用一批新 K 線：更新最後一根直接寫入緩衝區，新的 K 線寫入緩衝區尾端"""
+        stock = self.stocks_data[symbol] if symbol in self.stocks_data else self.references[symbol]
+        buffer = self.buffers.get(symbol)
+        if buffer is None or not buffer.tracks(stock):
+            buffer = self.buffers[symbol] = BarBuffer(stock['data_full'], stock.get('volume_colors'))
+        data = buffer.frame
+        indicators = self.indicators[symbol]
+        columns = [column for column in OHLCV_COLUMNS if column in bars.columns and column in data.columns]
+        values = bars.to_numpy(dtype=np.float64)[:, bars.columns.get_indexer(columns)]
+        close_index = columns.index('Close')
+        last_timestamp = data.index[-1]
+        # 新時間戳以緩衝區的單位（有時區時為 UTC）寫入
+        timestamps = pd.DatetimeIndex(bars.index)
+        if buffer.tz is not None:
+            timestamps = timestamps.tz_convert('UTC').tz_localize(None)
+        timestamps = timestamps.as_unit(np.datetime_data(buffer.index.dtype)[0]).values
+        previous, before_last = self.last_closes.get(symbol) or self._last_closes(data)
+        appended = False
+        for timestamp, stamp, row_values in zip(bars.index, timestamps, values):
+            close = row_values[close_index]
+            if np.isnan(close):
+                continue
+            row = dict(zip(columns, row_values))
+            if 'Volume' in row:
+                row['Volume'] = int(row['Volume'])
+            if timestamp == last_timestamp and not appended:
+                indicators.replace_last(close)
+                row.update(indicators.values())
+                buffer.replace_last(row, VOLUME_UP_COLOR if close >= before_last else VOLUME_DOWN_COLOR)
+                previous = close
+                continue
+            indicators.push(close)
+            row.update(indicators.values())
+            buffer.append(stamp, row, VOLUME_UP_COLOR if close >= previous else VOLUME_DOWN_COLOR)
+            appended = True
+            before_last, previous = previous, close
+        self.last_closes[symbol] = (previous, before_last)
+        buffer.publish(stock)
+        if symbol in self.stocks_data:
+            self.custom_stale.add(symbol)
+
+    def _refresh_custom_indicators(self):
+        """整欄重新計算數據已變動、且距離上次計算超過 custom_refresh 秒的股票的自訂指標，回傳這些股票"""
+        custom = custom_indicator_columns()
+        if not custom:
+            self.custom_stale.clear()
+            return []
+        now = time.monotonic()
+        refreshed = []
+        for symbol in list(self.custom_stale):
+            if now - self.custom_refreshed.get(symbol, -np.inf) < self.custom_refresh:
+                continue
+            stock = self.stocks_data[symbol]
+            buffer = self.buffers[symbol]
+            if buffer.tracks(stock):
+                values = INDICATOR_CACHE.evaluate(symbol, buffer.frame, custom.values())
+                for name, node in custom.items():
+                    buffer.columns[name][:buffer.size] = values[node]
+            self.custom_refreshed[symbol] = now
+            self.custom_stale.discard(symbol)
+            refreshed.append(symbol)
+        return refreshed
+
+    @staticmethod
+    def _last_closes(data):
+        close = data['Close'].to_numpy(dtype=np.float64)
+        return float(close[-1]), float(close[-2]) if len(close) > 1 else float(close[-1])
@@ -0,0 +1,264 @@
+"""投資組合分析"""
+from .lazy import np, pd
+from .config import PORTFOLIO_HEATMAP_LABELS, PORTFOLIO_RESYNC_STEPS, PORTFOLIO_WINDOW, RESOLUTIONS
+from .pyramid import base_resolution
+
+
+class RollingCovariance:
+    """滾動視窗共變異數矩陣：環形緩衝區保存最近 window 列報酬，並維護累加和與外積和
+
+    加入（或取代最後）一列只需 O(欄數²) 的秩 2 更新，不必重新計算整個視窗；
+    每 resync 次更新以緩衝區重新計算一次累加和，避免加減累積浮點誤差。
+    """
+
+    def __init__(self, num_columns, window=PORTFOLIO_WINDOW, resync=PORTFOLIO_RESYNC_STEPS):
+        self.window = window
+        self.resync = resync
+        self.buffer = np.zeros((window, num_columns))
+        self.count = 0
+        self.pos = 0
+        self.steps = 0
+        self.sums = np.zeros(num_columns)
+        self.cross = np.zeros((num_columns, num_columns))
+
+    def rows(self):
+        """視窗內的報酬（由舊到新）"""
+        return np.roll(self.buffer, -self.pos, axis=0)[self.window - self.count:]
+
+    def reset(self, rows):
+        """以多列報酬重設視窗（只保留最後 window 列），外積和以一次矩陣乘法計算"""
+        rows = np.nan_to_num(np.asarray(rows, dtype=np.float64)[-self.window:])
+        self.buffer[:] = 0
+        self.buffer[:len(rows)] = rows
+        self.count = len(rows)
+        self.pos = len(rows) % self.window
+        self.sums = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+        self.steps = 0
+
+    def update(self, row, replace=False):
+        """加入一列報酬（NaN 視為 0）；replace 為 True 時取代最後加入的一列（最後一根 K 線被更新）"""
+        row = np.nan_to_num(np.asarray(row, dtype=np.float64))
+        if replace and self.count:
+            slot = (self.pos - 1) % self.window
+        else:
+            slot = self.pos
+            self.pos = (self.pos + 1) % self.window
+            self.count = min(self.count + 1, self.window)
+        old = self.buffer[slot].copy()
+        self.sums += row - old
+        # cross += row rowᵀ - old oldᵀ（視窗未滿時 old 為 0）
+        pair = np.stack([row, old])
+        self.cross += pair.T @ (pair * np.array([[1.0], [-1.0]]))
+        self.buffer[slot] = row
+        self.steps += 1
+        if self.steps >= self.resync:
+            self.reset(self.rows())
+
+    def covariance(self):
+        """樣本共變異數矩陣（ddof=1）"""
+        n = self.count
+        if n < 2:
+            return np.full(self.cross.shape, np.nan)
+        mean = self.sums / n
+        return (self.cross - n * np.outer(mean, mean)) / (n - 1)
+
+    def correlation(self):
+        """相關係數矩陣（報酬全為 0 的欄位為 NaN）"""
+        cov = self.covariance()
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr[np.outer(std, std) == 0] = np.nan
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return np.clip(corr, -1, 1)
+
+
+def parse_portfolio_weights(text):
+    """解析 'AAPL=0.5,MSFT=0.3,TSLA=0.2' 形式的權重（會依總和正規化，可為負數表示放空）"""
+    weights = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        symbol, sep, value = item.partition('=')
+        try:
+            if not sep or not symbol.strip():
+                raise ValueError
+            weights[symbol.strip().upper()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight '{item.strip()}', expected SYMBOL=WEIGHT") from None
+    if not weights:
+        raise ValueError(f"No weights in '{text}'")
+    return weights
+
+
+class PortfolioAnalytics:
+    """投資組合分析：滾動相關 / 共變異數矩陣、對基準的 beta，以及指定權重下的波動度與回撤
+
+    收盤價依日期對齊（較晚上市或休市的日期沿用前一收盤價，報酬視為 0）。
+    共變異數矩陣的最後一欄為基準：benchmark 股票，未指定時為成分股的等權平均報酬。
+    refresh() 只處理最後一個已處理日期起的新 K 線（該日可被更新），以逐列更新維持滾動視窗。
+    """
+
+    def __init__(self, frames, symbols=None, weights=None, benchmark=None, window=PORTFOLIO_WINDOW):
+        if benchmark is not None and benchmark not in frames:
+            raise ValueError(f"No data for benchmark {benchmark}")
+        self.symbols = list(symbols) if symbols is not None else [s for s in frames if s != benchmark]
+        if len(self.symbols) < 2:
+            raise ValueError("Portfolio analytics needs at least 2 symbols")
+        if weights is None:
+            weights = dict.fromkeys(self.symbols, 1.0)
+        self.weights = np.array([weights.get(symbol, 0.0) for symbol in self.symbols], dtype=np.float64)
+        if self.weights.sum() == 0:
+            raise ValueError("Portfolio weights of the loaded symbols sum to 0")
+        self.weights /= self.weights.sum()
+        self.benchmark = benchmark
+        self.window = window
+        self.columns = self.symbols + ([benchmark] if benchmark is not None else [])
+
+        closes = pd.concat({s: frames[s]['Close'] for s in self.columns}, axis=1).sort_index().ffill()
+        values = closes.to_numpy(dtype=np.float64)
+        returns = self._returns(values[:-1], values[1:])
+        self.dates = closes.index[1:]
+        self.prev_close, self.last_close = values[-2], values[-1]
+        self.rolling = RollingCovariance(len(self.symbols) + 1, window)
+        self.rolling.reset(returns[-window:])
+        self.portfolio_returns = returns[:, :len(self.symbols)] @ self.weights
+        minutes = RESOLUTIONS[base_resolution(self.dates)][1]
+        self.periods_per_year = 252 if minutes >= 1440 else 252 * 390 / minutes
+        self.order = None
+
+    def _returns(self, previous, current):
+        """報酬矩陣（列 = 日期，欄 = 成分股 + 基準），缺少數據為 0"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.nan_to_num(current / previous - 1, nan=0.0, posinf=0.0, neginf=0.0)
+        if self.benchmark is None:
+            returns = np.column_stack([returns, returns.mean(axis=1)])
+        return returns
+
+    def refresh(self, frames):
+        """套用 frames（有新 K 線的股票）中最後一個已處理日期起的收盤價，回傳更新的列數"""
+        last_date = self.dates[-1].to_datetime64()
+        # 每支股票以二分搜尋取出最後日期起的收盤價（不經過 pandas 對齊，數百支股票也只需數毫秒）
+        tails = []
+        for j, symbol in enumerate(self.columns):
+            if symbol in frames:
+                index = frames[symbol].index.values
+                k = int(np.searchsorted(index, last_date))
+                if k < len(index):
+                    tails.append((j, index[k:], frames[symbol]['Close'].to_numpy(dtype=np.float64)[k:]))
+        if not tails:
+            return 0
+        dates = np.unique(np.concatenate([[last_date]] + [stamps for _, stamps, _ in tails]))
+        values = np.full((len(dates), len(self.columns)), np.nan)
+        for j, stamps, closes in tails:
+            values[np.searchsorted(dates, stamps), j] = closes
+        values[0] = np.where(np.isnan(values[0]), self.last_close, values[0])
+        for i in range(1, len(values)):
+            values[i] = np.where(np.isnan(values[i]), values[i - 1], values[i])
+        returns = self._returns(np.vstack([self.prev_close, values[:-1]]), values)
+        num_symbols = len(self.symbols)
+        self.rolling.update(returns[0], replace=True)
+        for row in returns[1:]:
+            self.rolling.update(row)
+        portfolio = returns[:, :num_symbols] @ self.weights
+        self.portfolio_returns = np.concatenate([self.portfolio_returns[:-1], portfolio])
+        self.dates = self.dates.append(pd.DatetimeIndex(dates[1:]))
+        if len(values) > 1:
+            self.prev_close = values[-2]
+        self.last_close = values[-1]
+        return len(returns)
+
+    def correlation(self):
+        """成分股之間的滾動相關係數矩陣"""
+        n = len(self.symbols)
+        return self.rolling.correlation()[:n, :n]
+
+    def heatmap_order(self):
+        """熱圖的股票排列順序：依相關矩陣第一主成分排序，讓彼此相關的股票相鄰（第一次計算後固定）"""
+        if self.order is None:
+            _, vectors = np.linalg.eigh(np.nan_to_num(self.correlation()))
+            self.order = np.argsort(vectors[:, -1], kind='stable')
+        return self.order
+
+    def summary(self):
+        """投資組合統計：年化波動度、beta、報酬與回撤，以及每支股票對基準的 beta"""
+        n = len(self.symbols)
+        cov = self.rolling.covariance()
+        weights = self.weights
+        benchmark_var = cov[n, n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = cov[:n, n] / benchmark_var if benchmark_var > 0 else np.full(n, np.nan)
+        value = np.cumprod(1 + self.portfolio_returns)
+        drawdown = value / np.maximum.accumulate(value) - 1
+        corr = self.correlation()
+        off_diagonal = corr[~np.eye(n, dtype=bool)]
+        annualize = np.sqrt(self.periods_per_year) * 100
+        return {
+            'symbols': n,
+            'benchmark': self.benchmark or 'equal-weight',
+            'window': self.window,
+            'as_of': self.dates[-1].strftime('%Y-%m-%d' if self.periods_per_year == 252 else '%Y-%m-%d %H:%M'),
+            'volatility': float(np.sqrt(max(weights @ cov[:n, :n] @ weights, 0)) * annualize),
+            'benchmark_volatility': float(np.sqrt(max(benchmark_var, 0)) * annualize),
+            'beta': float(weights @ np.nan_to_num(beta)),
+            'return_pct': float((value[-1] - 1) * 100),
+            'max_drawdown': float(drawdown.min() * 100),
+            'current_drawdown': float(drawdown[-1] * 100),
+            'avg_correlation': float(np.nanmean(off_diagonal)) if np.isfinite(off_diagonal).any() else np.nan,
+            'weights': dict(zip(self.symbols, weights.tolist())),
+            'betas': dict(zip(self.symbols, beta.tolist())),
+        }
+
+    def top_pairs(self, count=5):
+        """相關係數最高的 count 組股票 [(股票 A, 股票 B, 相關係數)]"""
+        corr = self.correlation()
+        rows, cols = np.triu_indices(len(self.symbols), k=1)
+        values = np.nan_to_num(corr[rows, cols], nan=-np.inf)
+        count = min(count, len(values))
+        best = np.argpartition(-values, count - 1)[:count]
+        best = best[np.argsort(-values[best], kind='stable')]
+        return [(self.symbols[rows[i]], self.symbols[cols[i]], float(corr[rows[i], cols[i]])) for i in best]
+
+
+def portfolio_title(summary):
+    """熱圖標題：視窗、波動度、beta 與回撤"""
+    return (f"Correlation ({summary['window']}-bar window, {summary['symbols']} symbols) | "
+            f"Vol {summary['volatility']:.1f}% | Beta {summary['beta']:.2f} vs {summary['benchmark']} | "
+            f"Max DD {summary['max_drawdown']:.1f}%")
+
+
+def draw_correlation_heatmap(fig, ax, portfolio):
+    """在 ax 畫出依主成分排序的相關係數熱圖，回傳 AxesImage（即時模式以 set_data 更新）"""
+    order = portfolio.heatmap_order()
+    corr = portfolio.correlation()[np.ix_(order, order)]
+    image = ax.imshow(corr, cmap='RdBu_r', vmin=-1, vmax=1, interpolation='nearest', aspect='auto')
+    fig.colorbar(image, ax=ax, fraction=0.04, pad=0.02)
+    if len(order) <= PORTFOLIO_HEATMAP_LABELS:
+        labels = [portfolio.symbols[i] for i in order]
+        ax.set_xticks(range(len(order)), labels, rotation=90, fontsize=8)
+        ax.set_yticks(range(len(order)), labels, fontsize=8)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    ax.set_title(portfolio_title(portfolio.summary()), fontsize=12, fontweight='bold')
+    return image
+
+
+def print_portfolio_results(portfolio, seconds, top=5):
+    """輸出投資組合統計、相關係數最高的股票組合，以及 beta 最高 / 最低的股票"""
+    summary = portfolio.summary()
+    print(f"\n[Portfolio] {summary['symbols']} symbols | {summary['window']}-bar window | "
+          f"beta vs {summary['benchmark']} | as of {summary['as_of']} | {seconds:.2f}s")
+    print(f"   Volatility: {summary['volatility']:.2f}% (benchmark {summary['benchmark_volatility']:.2f}%) | "
+          f"Beta: {summary['beta']:.2f} | Average correlation: {summary['avg_correlation']:.2f}")
+    print(f"   Return: {summary['return_pct']:+.2f}% | Max drawdown: {summary['max_drawdown']:.2f}% "
+          f"(current {summary['current_drawdown']:.2f}%)")
+    pairs = ', '.join(f"{a}/{b} {value:.2f}" for a, b, value in portfolio.top_pairs(top))
+    print(f"   Most correlated: {pairs}")
+    betas = sorted(((b, s) for s, b in summary['betas'].items() if np.isfinite(b)), reverse=True)
+    if len(betas) <= 2 * top:
+        print(f"   Beta: {', '.join(f'{s} {b:.2f}' for b, s in betas)}")
+    else:
+        print(f"   Highest beta: {', '.join(f'{s} {b:.2f}' for b, s in betas[:top])}")
+        print(f"   Lowest beta: {', '.join(f'{s} {b:.2f}' for b, s in betas[-top:])}")
@@ -0,0 +1,83 @@
+"""互動事件效能分析"""
+import json
+import time
+
+from .lazy import np
+from .config import PROFILE_BUCKETS_MS
+
+
+class InteractionProfiler:
+    """記錄圖表事件處理函式的延遲分布與重繪次數
+
+    hooks 中的函式會在每次處理後收到 (處理函式名稱, 秒數)，可用來即時輸出或轉送到其他監控工具。
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.samples = {}
+        self.redraws = {'draw': 0, 'draw_idle': 0, 'blit': 0}
+        self.hooks = []
+
+    def call(self, name, handler, event):
+        start = time.perf_counter()
+        try:
+            return handler(event)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples.setdefault(name, []).append(elapsed)
+            for hook in self.hooks:
+                hook(name, elapsed)
+
+    def attach(self, canvas):
+        """計算 canvas 的完整重繪次數，並包裝 draw_idle 與 blit 以計算重繪請求次數"""
+        for name in ('draw_idle', 'blit'):
+            original = getattr(canvas, name)
+
+            def counted(*args, _name=name, _original=original, **kwargs):
+                self.redraws[_name] += 1
+                return _original(*args, **kwargs)
+            setattr(canvas, name, counted)
+        canvas.mpl_connect('draw_event', self._count_draw)
+
+    def _count_draw(self, event):
+        self.redraws['draw'] += 1
+
+    def summary(self):
+        edges = PROFILE_BUCKETS_MS
+        labels = ([f'<{edges[0]}ms'] + [f'{lo}-{hi}ms' for lo, hi in zip(edges, edges[1:])]
+                  + [f'>={edges[-1]}ms'])
+        handlers = {}
+        for name, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            counts = np.bincount(np.searchsorted(edges, ms, side='right'), minlength=len(labels))
+            handlers[name] = {
+                'calls': len(ms),
+                'total_ms': float(ms.sum()),
+                'median_ms': float(np.median(ms)),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'max_ms': float(ms.max()),
+                'histogram': {label: int(count) for label, count in zip(labels, counts) if count},
+            }
+        return {'handlers': handlers, 'redraws': dict(self.redraws)}
+
+    def write_json(self, path=None):
+        path = path or self.log_path
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+    def print_summary(self):
+        summary = self.summary()
+        total = sum(h['calls'] for h in summary['handlers'].values())
+        print(f"[Profile] Event handlers ({total} calls)")
+        for name, h in sorted(summary['handlers'].items(), key=lambda item: -item[1]['total_ms']):
+            print(f"   {name}: {h['calls']} calls | median {h['median_ms']:.2f} ms | "
+                  f"p95 {h['p95_ms']:.2f} ms | max {h['max_ms']:.2f} ms")
+        redraws = summary['redraws']
+        print(f"   Redraws: draw {redraws['draw']} | draw_idle {redraws['draw_idle']} | blit {redraws['blit']}")
+
+    def report(self):
+        """印出摘要，並在指定 log_path 時寫入 JSON"""
+        self.print_summary()
+        if self.log_path:
+            print(f"[Profile] Saved to {self.write_json()}")
@@ -0,0 +1,111 @@
+"""多解析度 K 線"""
+from .lazy import np, pd
+from .config import RESOLUTIONS
+
+
+def _bucket_keys(index, level):
+    """每根 K 線所屬的分鐘區間、日、週（以星期一開始）或月編號"""
+    minutes = RESOLUTIONS[level][1]
+    if level == 'M':
+        return index.values.astype('datetime64[M]').astype(np.int64)
+    days = index.values.astype('datetime64[D]').astype(np.int64)
+    if level == 'W':
+        return (days + 3) // 7  # 1970-01-01 為星期四
+    if level == 'D':
+        return days
+    return index.values.astype('datetime64[m]').astype(np.int64) // minutes
+
+
+def base_resolution(index):
+    """由 K 線間隔推斷數據本身的解析度（日線或分鐘線的 RESOLUTIONS 代碼）"""
+    if len(index) < 2:
+        return 'D'
+    step = np.median(np.diff(index.values[-500:]).astype('timedelta64[m]').astype(np.int64))
+    levels = [level for level, (_, minutes) in RESOLUTIONS.items() if minutes <= min(step, 1440)]
+    return levels[-1] if levels else '1m'
+
+
+def aggregate_bars(data, level):
+    """將 K 線（含指標欄位）彙總為較粗的解析度，回傳 (彙總後的 DataFrame, 每根在原數據中的起始列)
+
+    開盤取第一根、最高 / 最低取極值、成交量加總，收盤與指標欄位取最後一根；
+    日期為該區間最後一根 K 線的時間，與原數據使用同一條時間軸。
+    """
+    if len(data) == 0:
+        return data.iloc[:0].copy(), np.empty(0, dtype=np.int64)
+    keys = _bucket_keys(data.index, level)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    bars = data.iloc[ends].copy()
+    if 'Open' in data.columns:
+        bars['Open'] = data['Open'].to_numpy()[starts]
+    if 'High' in data.columns:
+        bars['High'] = np.fmax.reduceat(data['High'].to_numpy(dtype=np.float64), starts)
+    if 'Low' in data.columns:
+        bars['Low'] = np.fmin.reduceat(data['Low'].to_numpy(dtype=np.float64), starts)
+    if 'Volume' in data.columns:
+        bars['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return bars, starts
+
+
+class BarPyramid:
+    """單一股票的多解析度 K 線：原始 K 線（日線或分鐘線）加上預先彙總的較粗解析度
+
+    日線會彙總出週線與月線；分鐘線另外彙總出較粗的分鐘線、小時線與日線。
+    建立時彙總一次全部數據；之後 update() 收到新的（或更新最後一根的）K 線時，
+    只重新彙總每個解析度最後一根 K 線起算的數據，較早的彙總結果直接沿用。
+    """
+
+    def __init__(self, data, base=None):
+        self.base = base or base_resolution(data.index)
+        names = list(RESOLUTIONS)
+        self.aggregated = names[names.index(self.base) + 1:]
+        self.data = None
+        self.levels = {}
+        self.starts = {}
+        self.stats = {'built': 0, 'incremental': 0}
+        self.update(data)
+
+    def _extends(self, data):
+        """data 是否只在目前數據之後附加或更新最後一根（較早的時間與欄位都沒變）"""
+        previous = self.data
+        if previous is None or list(data.columns) != list(previous.columns) or len(data) < len(previous):
+            return False
+        if len(previous) == 0:
+            return True
+        return data.index[0] == previous.index[0] and data.index[len(previous) - 1] == previous.index[-1]
+
+    def update(self, data):
+        """套用新的 K 線數據（可以是同一個 DataFrame 被原地修改最後一根）"""
+        incremental = self._extends(data) and all(len(self.starts[level]) for level in self.levels)
+        for level in self.aggregated:
+            if not incremental:
+                self.levels[level], self.starts[level] = aggregate_bars(data, level)
+                continue
+            first = int(self.starts[level][-1])
+            tail, tail_starts = aggregate_bars(data.iloc[first:], level)
+            self.levels[level] = pd.concat([self.levels[level].iloc[:-1], tail])
+            self.starts[level] = np.concatenate([self.starts[level][:-1], tail_starts + first])
+        self.data = data
+        self.stats['incremental' if incremental else 'built'] += 1
+
+    def bars(self, level):
+        """某個解析度的全部 K 線"""
+        return self.data if level == self.base else self.levels[level]
+
+    def session_start(self, sessions):
+        """最近 sessions 個交易日第一根 K 線的時間（None 表示全部數據）"""
+        index = self.data.index
+        starts = np.arange(len(index)) if self.base == 'D' else self.starts['D']
+        if sessions is None or sessions >= len(starts):
+            return index[0]
+        return index[starts[-sessions]]
+
+    def select(self, start, max_bars):
+        """回傳 (解析度, 起始列)：從 start 起的 K 線根數不超過 max_bars 的最細解析度（都超過時用最粗的）"""
+        for level in [self.base] + self.aggregated:
+            bars = self.bars(level)
+            first = int(bars.index.searchsorted(start))
+            if len(bars) - first <= max_bars:
+                break
+        return level, min(first, max(len(bars) - 1, 0))
@@ -0,0 +1,100 @@
+"""批次報表"""
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .lazy import load_module, np, pd, plt, use_headless_backend
+from .config import MA_PERIODS
+from .indicators import add_indicator
+from .data import _safe_filename
+from .portfolio import draw_correlation_heatmap
+from .chart import create_multi_stock_chart
+
+
+def _json_safe(value):
+    """將 NaN 轉為 None，讓結果可以寫成標準 JSON"""
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_results_report(results_by_symbol, output_dir):
+    """將所有股票的 [Results] 統計數據寫成 results.json 與 results.csv"""
+    json_path = os.path.join(output_dir, 'results.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({symbol: _json_safe(results) for symbol, results in results_by_symbol.items()},
+                  f, indent=2, ensure_ascii=False)
+
+    rows = []
+    for symbol, results in results_by_symbol.items():
+        row = {'symbol': symbol}
+        row.update({k: v for k, v in results.items() if k not in ('ma', 'indicators')})
+        for ma_name in MA_PERIODS:
+            ma = results['ma'].get(ma_name, {})
+            row[ma_name] = ma.get('value')
+            row[f'{ma_name}_diff_pct'] = ma.get('diff_pct')
+        row.update(results.get('indicators', {}))
+        rows.append(row)
+    csv_path = os.path.join(output_dir, 'results.csv')
+    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    return json_path, csv_path
+
+
+def render_report_chart(symbol, stock, output_path, period='6M', indicators=()):
+    """在工作行程中以 Agg 後端繪製單一股票圖表並存檔（indicators 為主程式加入的自訂指標）"""
+    use_headless_backend()
+    for text in indicators:
+        add_indicator(text)
+    start = time.perf_counter()
+    fig, _ = create_multi_stock_chart({symbol: stock}, initial_period=period, prewarm=False)
+    fig.savefig(output_path)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def render_report_charts(stocks_data, output_dir, fmt='png', period='6M', workers=None, indicators=()):
+    """以 ProcessPoolExecutor 平行繪製所有股票的圖表，回傳成功輸出的檔案路徑"""
+    workers = workers or os.cpu_count() or 1
+    print(f"\n[Report] Rendering {len(stocks_data)} charts with {workers} processes...")
+    start = time.perf_counter()
+    # 先在主行程以 Agg 匯入 pyplot，fork 出來的工作行程不必各自再匯入一次
+    use_headless_backend()
+    load_module('plt')
+    written = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for symbol, stock in stocks_data.items():
+            output_path = os.path.join(output_dir, f'{_safe_filename(symbol)}.{fmt}')
+            futures[executor.submit(render_report_chart, symbol, stock, output_path, period,
+                                    indicators)] = (symbol, output_path)
+        for future in as_completed(futures):
+            symbol, output_path = futures[future]
+            try:
+                elapsed = future.result()
+            except Exception as e:
+                print(f"   [X] {symbol}: chart rendering failed: {str(e)}")
+                continue
+            print(f"   [OK] {symbol}: {output_path} ({elapsed:.2f}s)")
+            written.append(output_path)
+    print(f"[Report] Rendered {len(written)} charts in {time.perf_counter() - start:.2f}s")
+    return written
+
+
+def write_portfolio_report(portfolio, output_dir, fmt='png'):
+    """將投資組合統計寫成 portfolio.json，並輸出相關係數熱圖，回傳兩個檔案路徑"""
+    json_path = os.path.join(output_dir, 'portfolio.json')
+    summary = portfolio.summary()
+    summary['top_pairs'] = [list(pair) for pair in portfolio.top_pairs()]
+    summary['betas'] = {s: None if np.isnan(b) else b for s, b in summary['betas'].items()}
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(_json_safe(summary), f, indent=2, ensure_ascii=False)
+    use_headless_backend()
+    fig, ax = plt.subplots(figsize=(12, 10))
+    draw_correlation_heatmap(fig, ax, portfolio)
+    chart_path = os.path.join(output_dir, f'portfolio.{fmt}')
+    fig.savefig(chart_path)
+    plt.close(fig)
+    return json_path, chart_path
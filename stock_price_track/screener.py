@@ -0,0 +1,163 @@
+"""股票篩選"""
+import operator
+
+from .lazy import np
+from .config import BOLLINGER_PERIOD, MA_PERIODS
+from .stats import align_closes, compute_batch_stats
+from .indicators import compute_indicator_arrays
+
+SCREEN_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+# 有前一根 K 線數值、可用於 crosses_above / crosses_below 的欄位
+SCREEN_SERIES_FIELDS = ['close'] + list(MA_PERIODS.keys()) + ['BB_upper', 'BB_middle', 'BB_lower']
+# 來自統計數據（最近 6 個月）的欄位
+SCREEN_STATS_FIELDS = {'return': 'return_pct', 'volatility': 'volatility', 'max_drawdown': 'max_drawdown'}
+
+
+def parse_screen_condition(text):
+    """解析篩選條件字串，格式錯誤時拋出 ValueError
+
+    支援三種寫法（欄位見 SCREEN_SERIES_FIELDS 與 SCREEN_STATS_FIELDS）：
+      close > MA50            欄位與欄位或數值比較（>、>=、<、<=）
+      close crosses_above MA20  最新一根 K 線向上（crosses_below 為向下）穿越
+      volatility between 15 40  數值介於兩者之間（含端點）
+    """
+    fields = SCREEN_SERIES_FIELDS + list(SCREEN_STATS_FIELDS)
+    tokens = text.split()
+
+    def operand(token):
+        if token in fields:
+            return token
+        try:
+            return float(token)
+        except ValueError:
+            raise ValueError(f"Unknown field or number '{token}' in screen condition '{text}'")
+
+    if len(tokens) == 4 and tokens[1] == 'between':
+        if tokens[0] not in fields:
+            raise ValueError(f"Unknown field '{tokens[0]}' in screen condition '{text}'")
+        low, high = operand(tokens[2]), operand(tokens[3])
+        if isinstance(low, str) or isinstance(high, str):
+            raise ValueError(f"'between' expects two numbers in screen condition '{text}'")
+        return {'text': text, 'kind': 'between', 'left': tokens[0], 'low': min(low, high), 'high': max(low, high)}
+    if len(tokens) != 3:
+        raise ValueError(f"Cannot parse screen condition '{text}'")
+    left, op, right = tokens[0], tokens[1], operand(tokens[2])
+    if left not in fields:
+        raise ValueError(f"Unknown field '{left}' in screen condition '{text}'")
+    if op in ('crosses_above', 'crosses_below'):
+        if left not in SCREEN_SERIES_FIELDS or not isinstance(right, str) or right not in SCREEN_SERIES_FIELDS:
+            raise ValueError(f"'{op}' compares two of {', '.join(SCREEN_SERIES_FIELDS)} in '{text}'")
+        return {'text': text, 'kind': 'cross', 'left': left, 'op': op, 'right': right}
+    if op not in SCREEN_OPERATORS:
+        raise ValueError(f"Unknown operator '{op}' in screen condition '{text}'")
+    return {'text': text, 'kind': 'compare', 'left': left, 'op': op, 'right': right}
+
+
+def screen_features(matrix, lookback=130):
+    """從 (K 線 × 股票) 收盤價矩陣計算篩選用的特徵向量，回傳 (最新值, 前一根 K 線的值)
+
+    只對最後 max(MA 週期) + 1 根 K 線計算指標，已足以得到最新與前一根的數值。
+    """
+    window_size = max([period for period, _, _ in MA_PERIODS.values()] + [BOLLINGER_PERIOD]) + 1
+    window = matrix[-window_size:]
+    columns = compute_indicator_arrays(window)
+    current = {'close': window[-1].copy()}
+    previous = {'close': window[-2].copy() if len(window) > 1 else np.full(window.shape[1], np.nan)}
+    for name in SCREEN_SERIES_FIELDS[1:]:
+        current[name] = columns[name][-1].copy()
+        previous[name] = columns[name][-2].copy() if len(window) > 1 else np.full(window.shape[1], np.nan)
+    stats = compute_batch_stats(matrix, lookback)
+    for field, key in SCREEN_STATS_FIELDS.items():
+        current[field] = stats[key]
+    return current, previous
+
+
+def evaluate_screen_condition(condition, current, previous):
+    """以向量化方式評估一個條件，回傳每支股票是否符合的布林陣列（NaN 一律視為不符合）"""
+    def value(features, operand):
+        return features[operand] if isinstance(operand, str) else operand
+
+    left = current[condition['left']]
+    with np.errstate(invalid='ignore'):
+        if condition['kind'] == 'between':
+            return (left >= condition['low']) & (left <= condition['high'])
+        if condition['kind'] == 'compare':
+            return SCREEN_OPERATORS[condition['op']](left, value(current, condition['right']))
+        before = previous[condition['left']] - previous[condition['right']]
+        after = left - current[condition['right']]
+        if condition['op'] == 'crosses_above':
+            return (before <= 0) & (after > 0)
+        return (before >= 0) & (after < 0)
+
+
+class Screener:
+    """股票篩選引擎：所有股票的特徵存成向量，並為每個條件維護一份「目前符合」的布林索引
+
+    add() 一次向量化評估全部股票；update() 只重算一支股票的特徵並更新各條件索引中對應的位置，
+    因此 query() 只需將幾個布林陣列做 AND。
+    """
+
+    def __init__(self, symbols, matrix, lookback=130):
+        self.symbols = list(symbols)
+        self._slots = {symbol: j for j, symbol in enumerate(self.symbols)}
+        self.lookback = lookback
+        self.current, self.previous = screen_features(matrix, lookback)
+        self.conditions = {}
+        self.masks = {}
+
+    @classmethod
+    def from_frames(cls, frames, lookback=130):
+        """以 {symbol: 含 Close 欄位的 DataFrame} 建立篩選器"""
+        symbols, matrix, _ = align_closes(frames)
+        return cls(symbols, matrix, lookback)
+
+    def add(self, text):
+        condition = parse_screen_condition(text)
+        self.conditions[text] = condition
+        self.masks[text] = evaluate_screen_condition(condition, self.current, self.previous)
+        return int(self.masks[text].sum())
+
+    def update(self, symbol, close):
+        """以一支股票最新的收盤價序列更新特徵與所有條件索引，回傳 [(條件, 是否符合)] 中有變動的項目"""
+        j = self._slots[symbol]
+        current, previous = screen_features(np.asarray(close, dtype=np.float64)[:, None], self.lookback)
+        for field, values in current.items():
+            self.current[field][j] = values[0]
+        for field, values in previous.items():
+            self.previous[field][j] = values[0]
+        one_current = {field: values[j:j + 1] for field, values in self.current.items()}
+        one_previous = {field: values[j:j + 1] for field, values in self.previous.items()}
+        changes = []
+        for text, condition in self.conditions.items():
+            matched = bool(evaluate_screen_condition(condition, one_current, one_previous)[0])
+            if matched != self.masks[text][j]:
+                self.masks[text][j] = matched
+                changes.append((text, matched))
+        return changes
+
+    def query_mask(self, *texts):
+        texts = texts or tuple(self.masks)
+        mask = np.ones(len(self.symbols), dtype=bool)
+        for text in texts:
+            mask &= self.masks[text]
+        return mask
+
+    def query(self, *texts):
+        """回傳同時符合所有指定條件（未指定時為全部條件）的股票代碼"""
+        return [self.symbols[j] for j in np.flatnonzero(self.query_mask(*texts))]
+
+
+def print_screen_results(screener, limit=50):
+    """輸出每個條件與全部條件同時符合的股票"""
+    print(f"\n[Screen] {len(screener.conditions)} conditions over {len(screener.symbols)} symbols")
+    for text, mask in screener.masks.items():
+        print(f"   {text}: {int(mask.sum())} symbols")
+    matches = screener.query()
+    shown = ', '.join(matches[:limit]) + (f", ... (+{len(matches) - limit})" if len(matches) > limit else '')
+    print(f"   All conditions ({len(matches)}): {shown if matches else '-'}")
+    return matches
@@ -0,0 +1,161 @@
+"""統計數據核心：收盤價矩陣對齊，以及 Numba / NumPy 單次掃描的報酬、波動度與最大回撤"""
+import warnings
+
+from .lazy import HAS_NUMBA, lazy_njit, np
+from .config import STATS_FIELDS, STATS_LOOKBACKS, STATS_NUMBA_MIN_SYMBOLS
+
+
+def align_closes(downloaded):
+    """將所有股票收盤價對齊成 (K 線 × 股票) 矩陣
+
+    每支股票的數據靠底部對齊（最後一列為各自最新的 K 線），較短的歷史在上方補 NaN。
+    同一交易日曆的股票（例如全部為美股）每一列即對應同一個交易日，
+    且滾動視窗不會因其他股票的休市日而插入空值。
+    回傳 (symbols, matrix, 每支股票的 K 線數)。
+    """
+    symbols = list(downloaded.keys())
+    lengths = np.array([len(downloaded[symbol]) for symbol in symbols], dtype=np.int64)
+    num_bars = int(lengths.max()) if len(symbols) > 0 else 0
+    matrix = np.full((num_bars, len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        matrix[num_bars - lengths[j]:, j] = downloaded[symbol]['Close'].to_numpy(dtype=np.float64)
+    return symbols, matrix, lengths
+
+
+def _summary_stats_loop(series, lookback, out):
+    """單次掃描計算每支股票最近 lookback 根 K 線的全部統計數據，結果依 STATS_FIELDS 順序寫入 out
+
+    series 為 (股票 × K 線) 的連續記憶體陣列，讓每支股票的掃描都是循序讀取。
+
+    起始價、最高、最低、平均、報酬率標準差（Welford）與最大回撤在同一個迴圈內完成；
+    NaN 會被略過，且前後有 NaN 的兩根 K 線不計算報酬率。
+    """
+    num_symbols, num_bars = series.shape
+    start = max(num_bars - lookback, 0)
+    nan = np.nan
+    for j in range(num_symbols):
+        first = nan
+        prev = nan
+        high = -np.inf
+        low = np.inf
+        total = 0.0
+        count = 0
+        ret_count = 0
+        ret_mean = 0.0
+        ret_m2 = 0.0
+        running_max = -np.inf
+        max_drawdown = nan
+        for i in range(start, num_bars):
+            price = series[j, i]
+            if price != price:
+                prev = nan
+                continue
+            if count == 0:
+                first = price
+            count += 1
+            total += price
+            if price > high:
+                high = price
+            if price < low:
+                low = price
+            if prev == prev:
+                ret = price / prev - 1
+                ret_count += 1
+                delta = ret - ret_mean
+                ret_mean += delta / ret_count
+                ret_m2 += delta * (ret - ret_mean)
+            prev = price
+            if price > running_max:
+                running_max = price
+            drawdown = (price - running_max) / running_max * 100
+            if not drawdown >= max_drawdown:
+                max_drawdown = drawdown
+        end = series[j, num_bars - 1] if num_bars else nan
+        out[0, j] = first
+        out[1, j] = end
+        out[2, j] = (end - first) / first * 100
+        out[3, j] = high if count else nan
+        out[4, j] = low if count else nan
+        out[5, j] = total / count if count else nan
+        out[6, j] = np.sqrt(ret_m2 / (ret_count - 1) * 252) * 100 if ret_count > 1 else nan
+        out[7, j] = max_drawdown
+
+
+_summary_stats_jit = lazy_njit(_summary_stats_loop) if HAS_NUMBA else None
+
+
+def _summary_stats_numpy(matrix, lookback):
+    """NumPy 向量化版本的統計數據（未安裝 Numba 時使用）"""
+    window = matrix[-lookback:]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        first_valid = np.argmax(~np.isnan(window), axis=0)
+        start_price = window[first_valid, np.arange(window.shape[1])]
+        end_price = matrix[-1]
+        returns = window[1:] / window[:-1] - 1
+        running_max = np.fmax.accumulate(window, axis=0)
+        drawdown = (window - running_max) / running_max * 100
+        return {
+            'start_price': start_price,
+            'end_price': end_price,
+            'return_pct': (end_price - start_price) / start_price * 100,
+            'max_price': np.nanmax(window, axis=0),
+            'min_price': np.nanmin(window, axis=0),
+            'avg_price': np.nanmean(window, axis=0),
+            'volatility': np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252) * 100,
+            'max_drawdown': np.nanmin(drawdown, axis=0),
+        }
+
+
+def compute_batch_stats(matrix, lookback=130, use_numba=None):
+    """一次計算所有股票最近 lookback 根 K 線的 [Results] 統計數據
+
+    matrix 為 align_closes 產生的 (K 線 × 股票) 矩陣，回傳 {指標名稱: 每支股票的數值陣列}。
+    有安裝 Numba 且股票數達 STATS_NUMBA_MIN_SYMBOLS 時使用單次掃描的編譯核心，否則使用 NumPy 向量化版本。
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if use_numba is None:
+        use_numba = HAS_NUMBA and matrix.shape[1] >= STATS_NUMBA_MIN_SYMBOLS
+    if not use_numba:
+        return _summary_stats_numpy(matrix, lookback)
+    # 複製成可寫入的連續陣列，避免唯讀輸入（pandas 的 to_numpy）觸發另一組 Numba 編譯
+    series = np.array(matrix.T, order='C')
+    out = np.empty((len(STATS_FIELDS), matrix.shape[1]))
+    _summary_stats_jit(series, lookback, out)
+    return dict(zip(STATS_FIELDS, out))
+
+
+def compute_summary_stats(close, lookbacks=None):
+    """一次回傳多個回溯區間的統計數據，例如 {'6M': {'max_price': ...}, '1Y': {...}}
+
+    close 可為單一股票的收盤價（回傳浮點數）或 (K 線 × 股票) 矩陣（回傳每支股票的陣列）；
+    lookbacks 預設為 STATS_LOOKBACKS，也可傳入 {名稱: K 線根數}。
+    """
+    if lookbacks is None:
+        lookbacks = STATS_LOOKBACKS
+    values = np.asarray(close, dtype=np.float64)
+    single = values.ndim == 1
+    matrix = values[:, None] if single else values
+    summary = {}
+    for name, lookback in lookbacks.items():
+        stats = compute_batch_stats(matrix, lookback)
+        summary[name] = {key: float(v[0]) for key, v in stats.items()} if single else stats
+    return summary
+
+
+def _summary_stats_pandas(data, lookback=130):
+    """原本以 pandas 逐項計算的統計數據，保留作為統計核心的比對基準"""
+    start_price = data.tail(lookback)["Close"].iloc[0]
+    end_price = data["Close"].iloc[-1]
+    rolling_max = data.tail(lookback)['Close'].expanding().max()
+    drawdown = (data.tail(lookback)['Close'] - rolling_max) / rolling_max * 100
+    return {
+        'start_price': start_price,
+        'end_price': end_price,
+        'return_pct': (end_price - start_price) / start_price * 100,
+        'max_price': data.tail(lookback)["Close"].max(),
+        'min_price': data.tail(lookback)["Close"].min(),
+        'avg_price': data.tail(lookback)["Close"].mean(),
+        'volatility': data.tail(lookback)["Close"].pct_change().std() * np.sqrt(252) * 100,
+        'max_drawdown': drawdown.min(),
+    }
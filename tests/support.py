@@ -0,0 +1,46 @@
+"""模擬圖表上的滑鼠與鍵盤事件，以及 auto_adjust 分割後的價格（單元測試與效能測試共用）"""
+from matplotlib.backend_bases import KeyEvent, MouseEvent, PickEvent
+from matplotlib.legend import Legend
+
+
+def click_label(fig, label):
+    """模擬滑鼠點擊某個文字按鈕"""
+    bbox = label.get_window_extent()
+    x, y = (bbox.x0 + bbox.x1) / 2, (bbox.y0 + bbox.y1) / 2
+    fig.canvas.callbacks.process('button_press_event',
+                                 MouseEvent('button_press_event', fig.canvas, x, y, button=1))
+
+
+def press_key(fig, key):
+    """模擬按下鍵盤按鍵"""
+    fig.canvas.callbacks.process('key_press_event', KeyEvent('key_press_event', fig.canvas, key))
+
+
+def fib_motion_events(fig, frames):
+    """點擊圖例中的費波那契工具與第一個點，回傳 frames 個沿對角線移動的滑鼠事件"""
+    ax1 = fig.axes[0]
+    legend = [c for c in ax1.get_children() if isinstance(c, Legend) and c.get_visible()][0]
+    fib_legline = legend.get_lines()[-1]
+    press = MouseEvent('button_press_event', fig.canvas, 0, 0, button=1)
+    fig.canvas.callbacks.process('pick_event', PickEvent('pick_event', fig.canvas, press, fib_legline))
+    x0, x1 = ax1.get_xlim()
+    y0, y1 = ax1.get_ylim()
+    px, py = ax1.transData.transform((x0 + (x1 - x0) * 0.3, y0 + (y1 - y0) * 0.2))
+    for _ in range(2):  # 第一次點擊會被忽略（與互動操作相同）
+        fig.canvas.callbacks.process('button_press_event',
+                                     MouseEvent('button_press_event', fig.canvas, px, py, button=1))
+    events = []
+    for i in range(frames):
+        mx, my = ax1.transData.transform((x0 + (x1 - x0) * (0.4 + 0.5 * i / frames),
+                                          y0 + (y1 - y0) * (0.3 + 0.6 * i / frames)))
+        events.append(MouseEvent('motion_notify_event', fig.canvas, mx, my))
+    return events
+
+
+def split_adjusted(data, ratio, at):
+    """模擬 auto_adjust 的分割：第 at 根之前的價格除以 ratio、成交量乘以 ratio"""
+    adjusted = data.copy()
+    before = adjusted.index < adjusted.index[at]
+    adjusted.loc[before, ['Open', 'High', 'Low', 'Close']] /= ratio
+    adjusted.loc[before, 'Volume'] *= ratio
+    return adjusted
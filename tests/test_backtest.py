@@ -0,0 +1,123 @@
+"""回測核心（Numba 單次掃描 / NumPy 向量化）vs. 以 pandas 逐支計算的參考實作，以及參數解析"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.lazy import HAS_NUMBA
+from stock_price_track.backtest import (
+    BACKTEST_METRICS, backtest_grid, backtest_matrix, parse_backtest_params, parse_window_range, run_backtest,
+)
+
+KERNELS = [False] + ([True] if HAS_NUMBA else [])
+
+
+def _reference(close, strategy, param, fee):
+    """以 pandas rolling 與逐根迴圈計算單一股票、單組參數的績效（依 BACKTEST_METRICS 順序）"""
+    close = pd.Series(close)
+    if strategy == 'ma-cross':
+        signal = close.rolling(int(param[0])).mean() > close.rolling(int(param[1])).mean()
+    else:
+        middle = close.rolling(int(param[0])).mean()
+        lower = middle - param[1] * close.rolling(int(param[0])).std()
+        state, signal = False, []
+        for price, mid, low in zip(close, middle, lower):
+            if price < low:
+                state = True
+            elif price >= mid:
+                state = False
+            signal.append(state)
+        signal = pd.Series(signal)
+    returns = close.pct_change().to_numpy()
+    valid = np.isfinite(returns)
+    net, held_prev, trades, equity, peak, drawdown = [], 0.0, 0, 1.0, 1.0, 0.0
+    for t in range(len(close)):
+        held = float(signal.iloc[t - 1]) if t > 0 else 0.0
+        value = held * (returns[t] if valid[t] else 0.0) - (fee if held != held_prev else 0.0)
+        trades += held > held_prev
+        held_prev = held
+        equity *= 1 + value
+        peak = max(peak, equity)
+        drawdown = max(drawdown, 1 - equity / peak)
+        net.append(value)
+    net = np.array(net)
+    # 以有效報酬的根數為樣本數（缺值的 K 線報酬視為 0）
+    count = valid.sum()
+    mean = net.sum() / count
+    var = (np.square(net).sum() - net.sum() * mean) / (count - 1)
+    sharpe = mean / np.sqrt(var) * np.sqrt(252) if var > 0 else np.nan
+    return [(equity - 1) * 100, sharpe, drawdown * 100, trades]
+
+
+@pytest.mark.parametrize('use_numba', KERNELS)
+@pytest.mark.parametrize('strategy, params', [
+    ('ma-cross', [(5, 20), (10, 50), (3, 4)]),
+    ('bb-revert', [(20, 2.0), (10, 1.5)]),
+])
+def test_backtest_matches_reference(closes, strategy, params, use_numba):
+    matrix = closes(300, 4)
+    matrix[:80, 1] = np.nan  # 較短的歷史
+    metrics = backtest_matrix(matrix, strategy, params, fee=0.001, use_numba=use_numba)
+    for k, param in enumerate(params):
+        for j in range(matrix.shape[1]):
+            close = matrix[:, j][~np.isnan(matrix[:, j])]
+            expected = _reference(close, strategy, param, 0.001)
+            for name, value in zip(BACKTEST_METRICS, expected):
+                assert metrics[name][k, j] == pytest.approx(value, rel=1e-9, abs=1e-9), f'{param} {j} {name}'
+
+
+def test_backtest_hand_checked():
+    """收盤價 1, 2, 4, 2, 1：ma-cross (1, 2) 在第 1、2 根收盤時快線在上，第 2、3 根持有"""
+    matrix = np.array([[1.0], [2.0], [4.0], [2.0], [1.0]])
+    metrics = backtest_matrix(matrix, 'ma-cross', [(1, 2)], fee=0.0, use_numba=False)
+    # 持有 2 -> 4（+100%）與 4 -> 2（-50%），最高 2 倍後回到 1 倍
+    assert metrics['total_return'][0, 0] == pytest.approx(0.0)
+    assert metrics['max_drawdown'][0, 0] == pytest.approx(50.0)
+    assert metrics['trades'][0, 0] == 1
+    with_fee = backtest_matrix(matrix, 'ma-cross', [(1, 2)], fee=0.01, use_numba=False)
+    # 第 2 根買進、第 4 根賣出各扣一次手續費
+    assert with_fee['total_return'][0, 0] == pytest.approx((1.99 * 0.5 * 0.99 - 1) * 100)
+
+
+@pytest.mark.skipif(not HAS_NUMBA, reason='numba not installed')
+def test_backtest_sweep_kernels_agree(closes):
+    """參數掃描（多個分塊）時 Numba 單次掃描與 NumPy 向量化版本一致"""
+    matrix = closes(320, 40)
+    params = backtest_grid('ma-cross', list(range(5, 61)))
+    metrics = backtest_matrix(matrix, 'ma-cross', params)
+    sample = np.sort(np.random.default_rng(0).choice(len(params), 20, replace=False))
+    expected = backtest_matrix(matrix, 'ma-cross', [params[i] for i in sample], use_numba=False)
+    for name in BACKTEST_METRICS:
+        np.testing.assert_allclose(metrics[name][sample], expected[name], rtol=1e-9, atol=1e-9)
+
+
+def test_backtest_workers_match_single_process(closes):
+    matrix = closes(200, 30)
+    params = backtest_grid('bb-revert', [10, 20], (1.5, 2.0))
+    single = backtest_matrix(matrix, 'bb-revert', params)
+    parallel = backtest_matrix(matrix, 'bb-revert', params, workers=2)
+    for name in BACKTEST_METRICS:
+        np.testing.assert_array_equal(parallel[name], single[name])
+
+
+def test_run_backtest_buy_hold(frames):
+    data = frames(2, 120)
+    result = run_backtest(data, 'ma-cross')
+    assert result['symbols'] == ['SYM0', 'SYM1'] and result['params'] == [(10, 50)]
+    close = data['SYM1']['Close']
+    assert result['buy_hold'][1] == pytest.approx((close.iloc[-1] / close.iloc[0] - 1) * 100)
+
+
+def test_parse_backtest_params():
+    assert parse_window_range('5:20:5') == [5, 10, 15, 20]
+    for text in ('5', '1:10', '10:5', 'a:b', '5:10:0'):
+        with pytest.raises(ValueError):
+            parse_window_range(text)
+    args = SimpleNamespace(backtest='ma-cross', sweep='5:7', bb_std='2', backtest_params=None)
+    assert parse_backtest_params(args) == [(5, 6), (5, 7), (6, 7)]
+    args = SimpleNamespace(backtest='bb-revert', sweep=None, bb_std='2', backtest_params='20,2.5')
+    assert parse_backtest_params(args) == [(20.0, 2.5)]
+    for strategy, text in (('ma-cross', '20,10'), ('ma-cross', '5'), ('bb-revert', '1.5,2')):
+        with pytest.raises(ValueError):
+            parse_backtest_params(SimpleNamespace(backtest=strategy, sweep=None, bb_std='2', backtest_params=text))
@@ -0,0 +1,137 @@
+"""OHLCV 快取的測試：補抓合併、價格基準改變時重新下載、定期完整下載與淘汰（以 MemorySource 取代網路）"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from stock_price_track.config import CACHE_ADJUST_TOLERANCE
+from stock_price_track.data import MemorySource, OHLCVCache, _merge_cached, fetch_stocks_data_async
+
+from tests.support import split_adjusted
+
+
+def _fetch(symbols, source, **options):
+    return fetch_stocks_data_async(symbols, source, rate=0, backoff=0, **options)
+
+
+class _RecordingSource(MemorySource):
+    """記錄每次請求的 start（None 表示下載完整期間）"""
+
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.starts = []
+
+    async def fetch(self, symbol, period=None, start=None):
+        self.starts.append(start)
+        return await super().fetch(symbol, period, start)
+
+
+def test_merge_cached(frames):
+    data = frames(1, 400)['SYM0']
+    cached = data.iloc[:300]
+    delta = data.iloc[298:].copy()
+    delta.iloc[1, delta.columns.get_loc('Close')] *= 1.01  # 盤中存入、之後更新過的最後一根
+    merged = _merge_cached(cached, delta, period='max')
+    assert merged.index.equals(data.index)
+    assert merged['Close'].iloc[299] == delta['Close'].iloc[1]
+    pd.testing.assert_frame_equal(merged.iloc[300:], data.iloc[300:], check_freq=False)
+
+    trimmed = _merge_cached(cached, delta, period='1y')
+    assert trimmed.index[-1] == data.index[-1]
+    assert trimmed.index[0] >= data.index[-1] - pd.DateOffset(years=1)
+
+    assert _merge_cached(cached, None, period='max') is cached
+    # 補抓結果沒有重疊的 K 線時無法確認價格基準
+    assert _merge_cached(cached, data.iloc[299:].copy(), period='max') is None
+
+
+def test_merge_cached_detects_adjustment(frames):
+    data = frames(1, 400)['SYM0']
+    cached = data.iloc[:300]
+    assert _merge_cached(cached, split_adjusted(data, 4, 350).iloc[298:].copy(), period='max') is None
+    # 低於容差的差異（例如來源的四捨五入）照常合併
+    delta = data.iloc[298:].copy()
+    delta.iloc[0, delta.columns.get_loc('Close')] *= 1 + CACHE_ADJUST_TOLERANCE / 10
+    assert len(_merge_cached(cached, delta, period='max')) == len(data)
+
+
+def test_cache_round_trip(frames, tmp_path):
+    data = frames(1, 200)['SYM0']
+    cache = OHLCVCache(str(tmp_path))
+    cache.save('SYM0', data, 'max')
+    loaded, fresh = cache.load('SYM0', 'max')
+    assert fresh
+    np.testing.assert_array_equal(loaded.index.values.astype('datetime64[ns]'),
+                                  data.index.values.astype('datetime64[ns]'))
+    np.testing.assert_allclose(loaded.to_numpy(dtype=np.float64), data.to_numpy(dtype=np.float64), rtol=1e-12)
+    assert loaded['Volume'].dtype == np.int64
+
+    assert cache.load('SYM0', '1y') == (None, False)
+    assert cache.load('MISSING', 'max') == (None, False)
+    assert not OHLCVCache(str(tmp_path), ttl=0).load('SYM0', 'max')[1]
+
+
+def test_cached_tail_refresh(frames, tmp_path):
+    """快取過期時只補抓最後快取日期之後的數據，合併結果與完整下載相同"""
+    data = frames(1, 400)['SYM0']
+    cache = OHLCVCache(str(tmp_path), ttl=0)
+    cache.save('SYM0', data.iloc[:300], 'max')
+    source = _RecordingSource({'SYM0': data})
+    downloaded, _ = _fetch(['SYM0'], source, cache=cache, period='max')
+    result = downloaded['SYM0']
+    assert source.starts == [data.index[298]]
+    np.testing.assert_array_equal(result.index.values.astype('datetime64[ns]'),
+                                  data.index.values.astype('datetime64[ns]'))
+    np.testing.assert_allclose(result.to_numpy(dtype=np.float64), data.to_numpy(dtype=np.float64), rtol=1e-12)
+    assert len(cache.load('SYM0', 'max')[0]) == len(data)
+
+
+def test_cached_refresh_aftersplit_adjusted(frames, tmp_path):
+    """快取之後發生 4:1 分割：整段歷史重新下載，不會把新舊基準的價格接在一起"""
+    data = frames(1, 400)['SYM0']
+    cache = OHLCVCache(str(tmp_path), ttl=0)
+    cache.save('SYM0', data.iloc[:300], 'max')
+    adjusted = split_adjusted(data, 4, 350)
+    source = _RecordingSource({'SYM0': adjusted})
+    downloaded, _ = _fetch(['SYM0'], source, cache=cache, period='max')
+    result = downloaded['SYM0']
+    assert source.starts == [data.index[298], None]
+    np.testing.assert_allclose(result.to_numpy(dtype=np.float64), adjusted.to_numpy(dtype=np.float64), rtol=1e-12)
+    cached = cache.load('SYM0', 'max')[0]
+    np.testing.assert_allclose(cached['Close'].to_numpy(), adjusted['Close'].to_numpy(), rtol=1e-12)
+
+
+def test_cache_rebase(frames, tmp_path):
+    """補抓不會延後完整下載的時間；超過 rebase 秒後視為不存在"""
+    data = frames(1, 300)['SYM0']
+    cache = OHLCVCache(str(tmp_path), rebase=60)
+    cache.save('SYM0', data.iloc[:250], 'max')
+    meta = cache._read_meta('SYM0')
+    meta['rebased_at'] -= 50
+    cache._write_meta('SYM0', meta)
+    cache.save('SYM0', data, 'max', full=False)
+    assert cache._read_meta('SYM0')['rebased_at'] == meta['rebased_at']
+    assert cache.load('SYM0', 'max')[0] is not None
+    cache.rebase = 30
+    assert cache.load('SYM0', 'max') == (None, False)
+
+
+def test_cache_evict(frames, tmp_path):
+    data = frames(3, 200)
+    cache = OHLCVCache(str(tmp_path))
+    for symbol, frame in data.items():
+        cache.save(symbol, frame, 'max')
+    assert cache.evict() == 0
+
+    entry_bytes = sum(os.path.getsize(p) for p in cache._paths('SYM0'))
+    cache.load('SYM0', 'max')  # 最近使用過，不會被淘汰
+    cache.max_bytes = int(entry_bytes * 2.5)
+    meta = cache._read_meta('SYM1')
+    meta['accessed_at'] -= 10
+    cache._write_meta('SYM1', meta)
+    assert cache.evict() == 1
+    assert cache.load('SYM1', 'max') == (None, False)
+    assert cache.load('SYM0', 'max')[0] is not None
+
+    cache.max_age = -1
+    assert cache.evict() == 2
@@ -0,0 +1,270 @@
+"""圖表的測試：延後計算指標、元件重用、時間區間、費波那契預覽、降採樣、股票選擇列、分鐘線的壓縮座標與圖例（Agg 後端，不開視窗）"""
+import time
+
+import numpy as np
+import pytest
+from matplotlib.backend_bases import MouseEvent
+from matplotlib.colors import to_rgb
+
+from stock_price_track.lazy import mdates, plt, use_headless_backend
+from stock_price_track.chart import (bar_positions, create_multi_stock_chart, format_bar_time,
+                                     lttb_indices, minmax_indices)
+from stock_price_track.indicators import compute_indicator_arrays
+from stock_price_track.pyramid import BarPyramid
+from stock_price_track.config import (DOWNSAMPLE_MIN_POINTS, FIBONACCI_LEVELS, TIME_PERIOD_DAYS,
+                                      VOLUME_FLAT_COLOR)
+
+from .support import click_label, fib_motion_events, press_key
+
+use_headless_backend()
+
+
+def test_intraday_positions_are_contiguous(frames):
+    data = frames(1, 78 * 10, '5m')['SYM0']
+    pyramid = BarPyramid(data)
+    x, left, right = bar_positions(pyramid, '5m')
+    np.testing.assert_array_equal(x, np.arange(len(data)))
+    for level in pyramid.aggregated:
+        x, left, right = bar_positions(pyramid, level)
+        # 每根彙總 K 線畫在涵蓋的最後一根原始 K 線上，區間之間沒有收盤後或週末的空白
+        np.testing.assert_array_equal(x, np.r_[pyramid.starts[level][1:], len(data)] - 1)
+        np.testing.assert_allclose(left[1:] - right[:-1], 0.2)
+    assert format_bar_time(data.index, 78.2) == data.index[78].strftime('%m-%d\n%H:%M')
+    assert format_bar_time(data.index, -1) == ''
+
+
+def test_daily_positions_use_dates(frames):
+    data = frames(1, 300)['SYM0']
+    x, left, right = bar_positions(BarPyramid(data), 'D')
+    np.testing.assert_allclose(x, mdates.date2num(data.index))
+    np.testing.assert_allclose(right - left, 1.0)
+
+
+@pytest.mark.parametrize('interval, unit', (('1d', 'day'), ('5m', 'bar')))
+def test_moving_average_labels(frames, interval, unit):
+    stocks_data = {'SYM0': {'data_full': frames(1, 78 * 10, interval)['SYM0']}}
+    fig, _ = create_multi_stock_chart(stocks_data, prewarm=False)
+    try:
+        fig.canvas.draw()
+        legend = next(artist for artist in fig.axes[0].artists if hasattr(artist, 'get_texts'))
+        assert f'MA10 (10-{unit})' in [text.get_text() for text in legend.get_texts()]
+    finally:
+        plt.close(fig)
+
+
+def _artist_count(fig):
+    return sum(len(ax.get_children()) for ax in fig.axes)
+
+
+def _visible_close_line(fig, symbol):
+    return next(line for line in fig.axes[0].get_lines()
+                if line.get_visible() and line.get_label() == f'{symbol} Close Price')
+
+
+def test_switching_reuses_artists(chart_stocks, headless_chart):
+    stocks_data = chart_stocks(3, 300)
+    fig, radio_buttons, time_buttons, flush = headless_chart(stocks_data, prewarm=False)
+    for label in radio_buttons[:3]:
+        click_label(fig, label)
+        flush()
+    built = _artist_count(fig)
+    # 再次切換股票與時間區間只更新既有元件，不建立新的元件
+    for label in radio_buttons[:3]:
+        click_label(fig, label)
+        flush()
+        for period in time_buttons.values():
+            click_label(fig, period)
+            flush()
+    assert _artist_count(fig) == built
+    # 隱藏中的其他股票不會出現在畫面上
+    labels = [line.get_label() for line in fig.axes[0].get_lines() if line.get_visible()]
+    assert 'SYM2 Close Price' in labels and 'SYM0 Close Price' not in labels
+
+
+def test_time_window_updates_data(chart_stocks, headless_chart):
+    stocks_data = chart_stocks(2, 300)
+    fig, radio_buttons, time_buttons, flush = headless_chart(stocks_data, prewarm=False)
+    click_label(fig, radio_buttons[1])
+    click_label(fig, time_buttons['3M'])
+    flush()
+    close = stocks_data['SYM1']['data_full']['Close']
+    # 時間區間以交易日計算：3M 顯示最近 65 根日 K 線
+    line = _visible_close_line(fig, 'SYM1')
+    np.testing.assert_allclose(line.get_ydata(), close.to_numpy()[-TIME_PERIOD_DAYS['3M']:])
+    assert 'SYM1 - 3M' in fig.axes[0].get_title()
+    # 可見區間的第一根成交量柱沒有前一日可比較，固定為灰色
+    volume_bars = next(c for c in fig.axes[1].collections if c.get_visible())
+    np.testing.assert_allclose(volume_bars.get_facecolor()[0][:3], to_rgb(VOLUME_FLAT_COLOR))
+
+
+def test_fib_preview_blits(chart_stocks, headless_chart):
+    fig, _, _, flush = headless_chart(chart_stocks(1, 300))
+    ax1 = fig.axes[0]
+    events = fib_motion_events(fig, 5)
+    flush()
+    draws, blits = [], []
+    draw, blit = fig.canvas.draw, fig.canvas.blit
+    fig.canvas.draw = lambda *args: (draws.append(1), draw(*args))
+    fig.canvas.blit = lambda *args: (blits.append(1), blit(*args))
+    for event in events:
+        fig.canvas.callbacks.process('motion_notify_event', event)
+        flush()
+    # 預覽每幀只 blit 價格圖區域，不觸發完整重繪
+    assert draws == [] and len(blits) == len(events)
+
+    preview = [line for line in ax1.get_lines() if line.get_animated()]
+    connect = preview[-1]
+    _, (y1, y2) = connect.get_data()
+    high, low = max(y1, y2), min(y1, y2)
+    for level, line in zip(FIBONACCI_LEVELS, preview):
+        assert line.get_visible()
+        assert line.get_ydata()[0] == pytest.approx(high - (high - low) * level)
+
+    # 第二次點擊後隱藏預覽，改為畫出固定的回調線
+    fig.canvas.callbacks.process('button_press_event', MouseEvent(
+        'button_press_event', fig.canvas, events[-1].x, events[-1].y, button=1))
+    assert not any(line.get_visible() for line in preview)
+    final = [line for line in ax1.get_lines() if line.get_linestyle() == '--' and not line.get_animated()
+             and line.get_visible() and len(line.get_ydata()) == 2 and line.get_ydata()[0] == line.get_ydata()[1]]
+    assert len(final) >= len(FIBONACCI_LEVELS)
+
+
+def test_lttb_indices():
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=5000))
+    y[1234] = y.max() + 50
+    y[3210] = y.min() - 50
+    idx = lttb_indices(x, y, 300)
+    assert len(idx) == 300 and idx[0] == 0 and idx[-1] == 4999
+    assert np.all(np.diff(idx) > 0)
+    # 突出的高點與低點一定會被保留
+    assert {1234, 3210} <= set(idx.tolist())
+    np.testing.assert_array_equal(lttb_indices(x[:100], y[:100], 300), np.arange(100))
+    y[::7] = np.nan
+    assert not np.isnan(y[lttb_indices(x, y, 300)]).any()
+
+
+def test_minmax_indices():
+    rng = np.random.default_rng(1)
+    volume = rng.integers(1, 1000, 5000).astype(np.float64)
+    idx = minmax_indices(volume, 100)
+    assert len(idx) <= 200 and np.all(np.diff(idx) > 0)
+    for bucket in np.array_split(np.arange(5000), 100):
+        kept = np.intersect1d(idx, bucket)
+        assert volume[kept].max() == volume[bucket].max()
+        assert volume[kept].min() == volume[bucket].min()
+    np.testing.assert_array_equal(minmax_indices(volume[:150], 100), np.arange(150))
+
+
+def test_long_window_is_downsampled(chart_stocks, headless_chart):
+    stocks_data = chart_stocks(1, 5000)
+    fig, _, time_buttons, flush = headless_chart(stocks_data, prewarm=False)
+    click_label(fig, time_buttons['MAX'])
+    flush()
+    line = _visible_close_line(fig, 'SYM0')
+    # 點數不超過座標軸的像素寬度，最後一點仍是最新價格
+    assert len(line.get_ydata()) <= max(int(fig.axes[0].bbox.width), DOWNSAMPLE_MIN_POINTS)
+    assert line.get_ydata()[-1] == stocks_data['SYM0']['data_full']['Close'].iloc[-1]
+
+
+def test_indicators_computed_on_first_display(frames, headless_chart):
+    stocks_data = {symbol: {'data_full': data} for symbol, data in frames(6, 300).items()}
+    fig, radio_buttons, _, flush = headless_chart(stocks_data, prewarm=False)
+    # 只有顯示過的股票才計算指標與成交量顏色
+    assert [symbol for symbol, stock in stocks_data.items() if 'MA20' in stock['data_full'].columns] == ['SYM0']
+    assert [symbol for symbol, stock in stocks_data.items() if 'volume_colors' in stock] == ['SYM0']
+    click_label(fig, radio_buttons[3])
+    flush()
+    assert [symbol for symbol, stock in stocks_data.items() if 'MA20' in stock['data_full'].columns] == ['SYM0', 'SYM3']
+    data = stocks_data['SYM3']['data_full']
+    for name, values in compute_indicator_arrays(data['Close'].to_numpy()).items():
+        if name in data.columns:
+            np.testing.assert_allclose(data[name].to_numpy(dtype=np.float64), values, rtol=1e-9, atol=1e-9)
+
+
+def test_prewarm_neighbours(frames, headless_chart):
+    stocks_data = {symbol: {'data_full': data} for symbol, data in frames(6, 300).items()}
+    headless_chart(stocks_data, prewarm=True)
+    # 背景執行緒預先計算相鄰股票的指標，其他股票維持未計算
+    deadline = time.monotonic() + 10
+    while 'MA20' not in stocks_data['SYM1']['data_full'].columns and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 'MA20' in stocks_data['SYM1']['data_full'].columns
+    assert not any('MA20' in stocks_data[symbol]['data_full'].columns for symbol in ('SYM2', 'SYM3', 'SYM4'))
+
+
+def _selector_state(fig, radio_buttons):
+    """(目前顯示的股票, 選擇列上可見的代碼)"""
+    return (fig.axes[0].get_title().split(' - ')[0],
+            [label.get_text() for label in radio_buttons if label.get_visible()])
+
+
+def _click_selector(fig, radio_buttons, x):
+    """點擊選擇列上 x（座標軸比例）的位置"""
+    radio_ax = radio_buttons[0].axes
+    px, py = radio_ax.transAxes.transform((x, 0.5))
+    fig.canvas.callbacks.process('button_press_event',
+                                 MouseEvent('button_press_event', fig.canvas, px, py, button=1))
+
+
+def test_selector_paging_and_keys(frames, headless_chart):
+    stocks_data = {symbol: {'data_full': data} for symbol, data in frames(25, 120).items()}
+    fig, radio_buttons, _, flush = headless_chart(stocks_data, prewarm=False)
+    status = next(text for text in radio_buttons[0].axes.texts if text.get_text().startswith('Page'))
+    assert _selector_state(fig, radio_buttons) == ('SYM0', [f'SYM{i}' for i in range(10)])
+    assert status.get_text().startswith('Page 1/3')
+
+    press_key(fig, 'right')
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM1'
+    press_key(fig, 'end')
+    assert _selector_state(fig, radio_buttons) == ('SYM24', [f'SYM{i}' for i in range(20, 25)])
+    press_key(fig, 'left')
+    press_key(fig, 'right')
+    press_key(fig, 'right')  # 已是最後一支
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM24'
+    press_key(fig, 'home')
+    assert _selector_state(fig, radio_buttons) == ('SYM0', [f'SYM{i}' for i in range(10)])
+
+    # 換頁不切換股票；點擊槽位由座標算出對應的股票
+    press_key(fig, 'pagedown')
+    assert _selector_state(fig, radio_buttons) == ('SYM0', [f'SYM{i}' for i in range(10, 20)])
+    click_label(fig, radio_buttons[2])
+    flush()
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM12'
+    assert radio_buttons[2].get_color() == '#FF4444'
+    _click_selector(fig, radio_buttons, 0.99)
+    assert _selector_state(fig, radio_buttons)[1] == [f'SYM{i}' for i in range(20, 25)]
+    _click_selector(fig, radio_buttons, 0.01)
+    _click_selector(fig, radio_buttons, 0.01)
+    assert _selector_state(fig, radio_buttons) == ('SYM12', [f'SYM{i}' for i in range(10)])
+
+
+def test_selector_search(frames, headless_chart):
+    stocks_data = {symbol: {'data_full': data} for symbol, data in frames(25, 120).items()}
+    fig, radio_buttons, _, _ = headless_chart(stocks_data, prewarm=False)
+    keymap = list(plt.rcParams['keymap.save'])
+    press_key(fig, '/')
+    # 搜尋時暫停工具列快捷鍵
+    assert plt.rcParams['keymap.save'] == []
+    press_key(fig, '2')
+    assert _selector_state(fig, radio_buttons)[1] == ['SYM2', 'SYM12'] + [f'SYM{i}' for i in range(20, 25)]
+    press_key(fig, 'backspace')
+    press_key(fig, '1')
+    press_key(fig, '9')
+    assert _selector_state(fig, radio_buttons) == ('SYM0', ['SYM19'])
+    press_key(fig, 'enter')
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM19'
+    assert plt.rcParams['keymap.save'] == keymap
+    # 搜尋結果保留：左右鍵只在結果中移動
+    press_key(fig, 'left')
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM19'
+
+    press_key(fig, '/')
+    press_key(fig, 'x')
+    assert _selector_state(fig, radio_buttons)[1] == []
+    press_key(fig, 'escape')
+    # 清除搜尋後回到目前股票所在的頁面
+    assert _selector_state(fig, radio_buttons) == ('SYM19', [f'SYM{i}' for i in range(10, 20)])
+    press_key(fig, 'right')
+    assert _selector_state(fig, radio_buttons)[0] == 'SYM20'
@@ -0,0 +1,78 @@
+"""命令列結束碼的測試（假數據與本地檔案來源，不需網路）"""
+import pytest
+
+from stock_price_track import cli
+from stock_price_track.cli import main
+from stock_price_track.config import CHART_HISTORY_PERIOD, DOWNLOAD_PERIOD
+
+
+@pytest.fixture
+def symbols_file(tmp_path):
+    path = tmp_path / 'symbols.txt'
+    path.write_text('AAA, BBB\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('argv', (
+    ['--report'],
+    ['--compact', '--live'],
+    ['--source', 'file'],
+    ['--screen', 'close >>> MA50'],
+    ['--weights', 'AAA=1'],
+))
+def test_invalid_arguments(argv):
+    assert main(argv) == 2
+
+
+def test_report(symbols_file, tmp_path):
+    output_dir = tmp_path / 'out'
+    argv = ['--source', 'fake', '--symbols-file', symbols_file, '--report', '--output-dir', str(output_dir),
+            '--workers', '1']
+    assert main(argv) == 0
+    assert sorted(p.name for p in output_dir.glob('*.png')) == ['AAA.png', 'BBB.png']
+
+
+def test_nothing_downloaded(symbols_file, tmp_path):
+    argv = ['--source', 'file', '--data-dir', str(tmp_path), '--symbols-file', symbols_file, '--report',
+            '--output-dir', str(tmp_path / 'out')]
+    assert main(argv) == 1
+
+
+def test_report_missing_charts(symbols_file, tmp_path, monkeypatch):
+    monkeypatch.setattr('stock_price_track.cli.render_report_charts',
+                        lambda stocks_data, output_dir, **options: [str(tmp_path / 'AAA.png')])
+    argv = ['--source', 'fake', '--symbols-file', symbols_file, '--report', '--output-dir', str(tmp_path / 'out')]
+    assert main(argv) == 1
+
+
+def test_beta_benchmark_is_not_analyzed(symbols_file, tmp_path, capsys):
+    """--beta-vs 的基準只用於投資組合分析，不出現在分析結果、圖表與報表中"""
+    output_dir = tmp_path / 'out'
+    argv = ['--source', 'fake', '--symbols-file', symbols_file, '--report', '--output-dir', str(output_dir),
+            '--workers', '1', '--portfolio', '--beta-vs', 'spy']
+    assert main(argv) == 0
+    out = capsys.readouterr().out
+    assert '[Analyzing] SPY' not in out
+    assert 'beta vs SPY' in out
+    assert sorted(p.name for p in output_dir.glob('*.png')) == ['AAA.png', 'BBB.png', 'portfolio.png']
+    results = (output_dir / 'results.csv').read_text(encoding='utf-8')
+    assert 'SPY' not in results
+
+
+def test_long_chart_period_keeps_analysis_period(symbols_file, tmp_path, monkeypatch, capsys):
+    """5Y / MAX 的報表圖表下載較長的歷史，回測仍只使用最近 DOWNLOAD_PERIOD 的數據"""
+    periods = []
+    fetch = cli.fetch_stocks_data_async
+
+    def recording_fetch(symbols, source, **options):
+        periods.append(options['period'])
+        return fetch(symbols, source, **options)
+    monkeypatch.setattr('stock_price_track.cli.fetch_stocks_data_async', recording_fetch)
+    backtests = []
+    for period in ('6M', 'MAX'):
+        argv = ['--source', 'fake', '--symbols-file', symbols_file, '--report', '--output-dir', str(tmp_path / period),
+                '--workers', '1', '--period', period, '--backtest', 'ma-cross']
+        assert main(argv) == 0
+        backtests.append([line for line in capsys.readouterr().out.splitlines() if ': return ' in line])
+    assert periods == [DOWNLOAD_PERIOD, CHART_HISTORY_PERIOD]
+    assert len(backtests[0]) == 2 and backtests[1] == backtests[0]
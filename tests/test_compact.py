@@ -0,0 +1,98 @@
+"""精簡模式的測試：連續陣列與 DataFrame 視圖的來回轉換、LRU 淘汰後重建、圖表切換超過 LRU 容量的股票，以及記憶體報告"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.config import OHLCV_COLUMNS
+from stock_price_track.indicators import compute_indicator_arrays, compute_volume_colors, ensure_indicators
+from stock_price_track.compact import CompactStockStore, dataframe_layout_nbytes, print_memory_report
+
+from tests.support import press_key
+
+
+@pytest.fixture
+def downloaded(frames):
+    data = frames(5, 300)
+    data['SYM1'] = data['SYM1'].iloc[220:]
+    data['SYM3'] = data['SYM3'].iloc[:150]
+    return data
+
+
+def test_view_round_trip(downloaded):
+    store = CompactStockStore(downloaded)
+    assert list(store) == list(downloaded) and len(store) == 5 and 'SYM2' in store
+    for symbol, data in downloaded.items():
+        stock = store[symbol]
+        view = stock['data_full']
+        assert view.index.name == 'Date'
+        np.testing.assert_array_equal(view.index.values, data.index.values.astype('datetime64[ns]'))
+        assert list(view.columns[:len(OHLCV_COLUMNS)]) == OHLCV_COLUMNS
+        # OHLC 以 float32 儲存，成交量維持 int64
+        assert (view[['Open', 'High', 'Low', 'Close']].dtypes == np.float32).all()
+        assert view['Volume'].dtype == np.int64
+        np.testing.assert_array_equal(view['Volume'].to_numpy(), data['Volume'].to_numpy())
+        np.testing.assert_allclose(view[OHLCV_COLUMNS].to_numpy(dtype=np.float64),
+                                   data[OHLCV_COLUMNS].to_numpy(dtype=np.float64), rtol=1e-6)
+        close = store.close(symbol)
+        assert close.dtype == np.float64
+        np.testing.assert_array_equal(close, view['Close'].to_numpy(dtype=np.float64))
+
+        expected = compute_indicator_arrays(close)
+        assert 'BB_std' not in view.columns
+        for name in view.columns.intersection(list(expected)):
+            np.testing.assert_allclose(view[name].to_numpy(dtype=np.float64), expected[name],
+                                       rtol=1e-9, atol=1e-9, err_msg=f'{symbol} {name}')
+        # 與 float64 的完整計算比較，誤差只來自 float32 的價格
+        full = compute_indicator_arrays(data['Close'].to_numpy())
+        np.testing.assert_allclose(view['MA20'].to_numpy(dtype=np.float64), full['MA20'], rtol=1e-5)
+        np.testing.assert_array_equal(stock['volume_colors'], compute_volume_colors(close))
+
+
+def test_lru_eviction_rebuilds_view(downloaded):
+    store = CompactStockStore(downloaded, cache_size=2)
+    first = store['SYM0']['data_full'].copy()
+    store['SYM1']
+    store['SYM0']
+    assert (store.hits, store.misses) == (1, 2)
+    store['SYM2']
+    store['SYM3']
+    assert list(store._cache) == ['SYM2', 'SYM3']
+    rebuilt = store['SYM0']
+    assert (store.hits, store.misses) == (1, 5)
+    pd.testing.assert_frame_equal(rebuilt['data_full'], first)
+    assert len(store._cache) == 2
+    assert store.cached_nbytes() > 0
+
+
+def test_chart_switches_past_lru(frames, headless_chart):
+    """切換的股票數超過 LRU 容量：回到已被淘汰的股票時，圖表元件（含 BarPyramid）仍可使用"""
+    store = CompactStockStore(frames(8, 300), cache_size=4)
+    fig, _, _, flush = headless_chart(store)
+    title = fig.axes[0].get_title
+    for i in range(1, 7):
+        press_key(fig, 'right')
+        flush()
+        assert title().startswith(f'SYM{i} ')
+    press_key(fig, 'home')
+    flush()
+    assert title().startswith('SYM0 ')
+    assert len(store._cache) <= 4
+
+def test_memory_report_measures_frames(downloaded, capsys):
+    store = CompactStockStore(downloaded)
+    expected = 0
+    for data in downloaded.values():
+        stock = {'data_full': data.copy()}
+        ensure_indicators(stock)
+        colors = compute_volume_colors(stock['data_full']['Close'])
+        expected += int(stock['data_full'].memory_usage(deep=True).sum()) + colors.nbytes
+    # 全部股票都量測時等於一般模式的實際用量（成交量顏色為 <U7，每根 28 位元組）
+    nbytes, measured = dataframe_layout_nbytes(store, sample=len(store))
+    assert measured == len(store)
+    assert nbytes == pytest.approx(expected, rel=0.01)
+    assert store.nbytes() < nbytes / 3
+
+    print_memory_report(store)
+    out = capsys.readouterr().out
+    assert '[Memory] DataFrame layout (measured on 5 symbols)' in out
+    assert '[Memory] Compact store' in out
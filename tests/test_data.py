@@ -0,0 +1,87 @@
+"""非同步下載、重試與略過規則的測試（以 MemorySource、FileSource 與本地檔案取代網路）"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.config import MIN_DATA_POINTS, OHLCV_COLUMNS
+from stock_price_track.data import FileSource, MemorySource, fetch_stocks_data_async
+
+
+def _fetch(symbols, source, **options):
+    options.setdefault('period', None)
+    return fetch_stocks_data_async(symbols, source, rate=0, backoff=0, **options)
+
+
+def test_skip_rules(frames, capsys):
+    data = frames(3, 120)
+    source = MemorySource({
+        'OK': data['SYM0'],
+        'SHORT': data['SYM1'].iloc[:MIN_DATA_POINTS - 1],
+        'NOCLOSE': data['SYM2'].drop(columns='Close'),
+    })
+    downloaded, timings = _fetch(['OK', 'SHORT', 'NOCLOSE', 'MISSING', 'OK'], source)
+    assert list(downloaded) == ['OK']
+    assert list(timings) == ['OK', 'SHORT', 'NOCLOSE', 'MISSING']
+    pd.testing.assert_frame_equal(downloaded['OK'], data['SYM0'])
+    # 重複的代碼只下載一次
+    assert source.attempts['OK'] == 1
+    assert '4 requests, 0 retries, 1 duplicate symbols skipped' in capsys.readouterr().out
+
+
+def test_minimum_bars_kept(frames):
+    data = frames(1, MIN_DATA_POINTS)['SYM0']
+    downloaded, _ = _fetch(['SYM0'], MemorySource({'SYM0': data}))
+    assert len(downloaded['SYM0']) == MIN_DATA_POINTS
+
+
+@pytest.mark.parametrize('retries, expected', ((2, ['SYM0', 'SYM1']), (1, [])))
+def test_retry_transient_errors(frames, retries, expected):
+    source = MemorySource(frames(2, 120), failures=2)
+    downloaded, timings = _fetch(['SYM0', 'SYM1'], source, retries=retries)
+    assert list(downloaded) == expected
+    assert list(timings) == ['SYM0', 'SYM1']
+    assert source.attempts == {'SYM0': retries + 1, 'SYM1': retries + 1}
+
+
+class _BrokenSource(MemorySource):
+    """BROKEN 每次都回傳無法重試的錯誤"""
+
+    async def fetch(self, symbol, period=None, start=None):
+        if symbol == 'BROKEN':
+            self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+            raise ValueError('simulated bad response')
+        return await super().fetch(symbol, period, start)
+
+
+def test_download_errors_skipped(frames, capsys):
+    data = frames(1, 120)['SYM0']
+    source = _BrokenSource({'SYM0': data, 'SHORT': data.iloc[:10]})
+    downloaded, timings = _fetch(['SYM0', 'BROKEN', 'SHORT'], source, retries=3)
+    assert list(downloaded) == ['SYM0']
+    assert list(timings) == ['SYM0', 'BROKEN', 'SHORT']
+    # 無法重試的錯誤不重試，只略過該股票
+    assert source.attempts['BROKEN'] == 1
+    assert '[X] Error downloading BROKEN: ValueError: simulated bad response' in capsys.readouterr().out
+
+
+def test_period_slice(frames):
+    data = frames(1, 600)['SYM0']
+    downloaded, _ = _fetch(['SYM0'], MemorySource({'SYM0': data}), period='1y')
+    result = downloaded['SYM0']
+    assert result.index[-1] == data.index[-1]
+    assert result.index[0] >= data.index[-1] - pd.DateOffset(years=1)
+    assert len(result) < len(data)
+
+
+def test_file_source(frames, tmp_path):
+    data = frames(2, 120)
+    data['SYM0'].to_csv(tmp_path / 'SYM0.csv')
+    data['SYM1'].iloc[:10].to_csv(tmp_path / 'SYM1.csv')
+    source = FileSource(str(tmp_path))
+    downloaded, timings = _fetch(['SYM0', 'SYM1', 'MISSING'], source)
+    assert list(downloaded) == ['SYM0']
+    assert list(timings) == ['SYM0', 'SYM1', 'MISSING']
+    result = downloaded['SYM0']
+    np.testing.assert_array_equal(result.index.values, data['SYM0'].index.values)
+    np.testing.assert_allclose(result[OHLCV_COLUMNS].to_numpy(dtype=np.float64),
+                               data['SYM0'][OHLCV_COLUMNS].to_numpy(dtype=np.float64), rtol=1e-12)
@@ -0,0 +1,252 @@
+"""指標引擎與矩陣模式的測試（與原本逐欄呼叫 pandas rolling 及逐支計算的結果比較），以及自訂指標的註冊表與快取"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.config import OHLCV_COLUMNS, VOLUME_DOWN_COLOR, VOLUME_FLAT_COLOR, VOLUME_UP_COLOR
+from stock_price_track.indicators import (
+    INDICATOR_CACHE, INDICATOR_OVERLAYS, IndicatorCache, _calculate_indicators_pandas, calculate_indicators_batch,
+    compute_indicator_arrays, compute_volume_colors, ensure_indicators, indicator_columns, parallel_indicator_arrays,
+    parse_indicator_spec, rolling_windows,
+)
+from stock_price_track.stats import compute_summary_stats
+
+
+def _assert_columns_close(columns, expected):
+    for name, values in columns.items():
+        np.testing.assert_allclose(values, np.asarray(expected[name], dtype=np.float64),
+                                   rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+@pytest.mark.parametrize('num_bars', (30, 400))
+def test_engine_matches_pandas(frames, num_bars):
+    """K 線少於視窗時整欄為 NaN，與 pandas 相同"""
+    data = frames(1, num_bars)['SYM0']
+    expected = _calculate_indicators_pandas(data.copy())
+    _assert_columns_close(compute_indicator_arrays(data['Close'].to_numpy()), expected)
+
+
+def test_engine_nan_closes(frames):
+    """含 NaN 的視窗輸出 NaN，之後的視窗不受影響"""
+    data = frames(1, 300)['SYM0']
+    data.iloc[[5, 120, 121], data.columns.get_loc('Close')] = np.nan
+    expected = _calculate_indicators_pandas(data.copy())
+    _assert_columns_close(compute_indicator_arrays(data['Close'].to_numpy()), expected)
+
+
+def test_engine_high_prices():
+    """價格很高、波動很小時，平方累加和相減仍不失去精度"""
+    close = pd.Series(1e6 + np.random.default_rng(0).normal(0, 0.01, 500))
+    columns = compute_indicator_arrays(close.to_numpy())
+    expected = close.rolling(20).std().to_numpy()
+    np.testing.assert_allclose(columns['BB_std'], expected, rtol=1e-6)
+
+
+def test_rolling_windows_shares_windows(frames):
+    close = frames(1, 300)['SYM0']['Close']
+    means, stds = rolling_windows(close.to_numpy(), [20, 50, 20], [20])
+    assert sorted(means) == [20, 50] and list(stds) == [20]
+    for window, values in means.items():
+        np.testing.assert_allclose(values, close.rolling(window).mean(), rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(stds[20], close.rolling(20).std(), rtol=1e-9, atol=1e-9)
+
+
+def test_matrix_matches_columns(closes):
+    """(K 線 × 股票) 矩陣一次計算的每一欄與單獨計算該股票相同（較短的歷史在上方補 NaN）"""
+    matrix = closes(300, 6)
+    matrix[:40, 2] = np.nan
+    columns = compute_indicator_arrays(matrix)
+    for j in range(matrix.shape[1]):
+        expected = compute_indicator_arrays(matrix[:, j])
+        for name, values in columns.items():
+            np.testing.assert_allclose(values[:, j], expected[name], rtol=1e-9, atol=1e-9, err_msg=f'{j} {name}')
+
+
+def test_batch_matches_per_symbol(frames):
+    downloaded = frames(4, 300)
+    downloaded['SYM1'] = downloaded['SYM1'].iloc[120:]
+    stocks_data, stats_by_symbol = calculate_indicators_batch({s: d.copy() for s, d in downloaded.items()})
+    assert list(stocks_data) == list(downloaded)
+    for symbol, data in downloaded.items():
+        result = stocks_data[symbol]['data_full']
+        pd.testing.assert_frame_equal(result[OHLCV_COLUMNS], data)
+        _assert_columns_close(compute_indicator_arrays(data['Close'].to_numpy()), result)
+        expected = compute_summary_stats(data['Close'].to_numpy(), {'6M': 130})['6M']
+        for key, value in expected.items():
+            assert stats_by_symbol[symbol][key] == pytest.approx(value, rel=1e-9), f'{symbol} {key}'
+
+
+def _volume_colors_loop(close):
+    """原本在 draw_stock_chart 中逐根比較收盤價的成交量顏色"""
+    colors = []
+    for i in range(len(close)):
+        if i == 0:
+            colors.append(VOLUME_FLAT_COLOR)
+        elif close[i] >= close[i - 1]:
+            colors.append(VOLUME_UP_COLOR)
+        else:
+            colors.append(VOLUME_DOWN_COLOR)
+    return colors
+
+
+@pytest.mark.parametrize('num_bars', (0, 1, 300))
+def test_volume_colors_match_loop(num_bars):
+    # 四捨五入產生收盤價相同的 K 線（算上漲），NaN 與前後比較都算下跌
+    close = np.round(100 + np.cumsum(np.random.default_rng(0).normal(0, 0.3, num_bars)), 1)
+    if num_bars > 10:
+        close[10] = np.nan
+    assert list(compute_volume_colors(close)) == _volume_colors_loop(close)
+    assert list(compute_volume_colors(pd.Series(close))) == _volume_colors_loop(close)
+
+
+def test_batch_volume_colors(frames):
+    downloaded = frames(3, 200)
+    stocks_data, _ = calculate_indicators_batch({s: d.copy() for s, d in downloaded.items()})
+    for symbol, data in downloaded.items():
+        assert list(stocks_data[symbol]['volume_colors']) == _volume_colors_loop(data['Close'].to_numpy())
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_parallel_matches_engine(closes, workers):
+    matrix = closes(300, 7)
+    matrix[:40, 2] = np.nan
+    expected = compute_indicator_arrays(matrix)
+    with parallel_indicator_arrays(matrix, workers) as columns:
+        assert list(columns) == list(expected)
+        for name, values in expected.items():
+            np.testing.assert_allclose(columns[name], values, rtol=1e-12, atol=1e-12, err_msg=name)
+    # 離開 with 區塊後共享緩衝區已釋放
+    assert columns == {}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('EMA(50)', ('EMA', (50,))), ('ema50', ('EMA', (50,))), ('SMA', ('SMA', (50,))),
+    ('RSI(14)', ('RSI', (14,))), ('RSI', ('RSI', (14,))), ('MACD', ('MACD', (12, 26, 9))),
+    ('MACD(5, 35)', ('MACD', (5, 35, 9))), ('ATR', ('ATR', (14,))), ('ATR(20)', ('ATR', (20,))),
+    ('VWAP', ('VWAP', (0,))), ('VWAP(20)', ('VWAP', (20,))), ('BB(30,2.5)', ('BB', (30, 2.5))),
+])
+def test_parse_indicator_spec(text, expected):
+    assert parse_indicator_spec(text) == expected
+
+
+@pytest.mark.parametrize('text', ['FOO', 'EMA(1)', 'EMA(x)', 'RSI(14,2)', 'MACD(26,12)', 'BB(20,0)', 'EMA(50'])
+def test_parse_indicator_spec_errors(text):
+    with pytest.raises(ValueError):
+        parse_indicator_spec(text)
+
+
+def _custom_reference(data):
+    """以 pandas ewm / rolling 計算的自訂指標"""
+    close, high, low, volume = data['Close'], data['High'], data['Low'], data['Volume']
+    ema = {n: close.ewm(span=n, adjust=False, min_periods=n).mean() for n in (12, 26, 50)}
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    macd = ema[12] - ema[26]
+    signal = macd.ewm(span=9, adjust=False, min_periods=9).mean()
+    true_range = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    price_volume = (high + low + close) / 3 * volume
+    return {
+        'EMA50': ema[50], 'RSI14': 100 * gain / (gain + loss),
+        'MACD12_26_9': macd, 'MACD12_26_9_signal': signal, 'MACD12_26_9_hist': macd - signal,
+        'ATR14': true_range.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean(),
+        'VWAP': price_volume.cumsum() / volume.cumsum(),
+        'VWAP20': price_volume.rolling(20).sum() / volume.rolling(20).sum(),
+    }
+
+
+def test_custom_indicators_match_pandas(frames, custom_indicators):
+    data = frames(1, 300)['SYM0']
+    for text in ('EMA(50)', 'RSI(14)', 'MACD', 'ATR', 'VWAP', 'VWAP(20)'):
+        custom_indicators(text)
+    expected = _custom_reference(data)
+    columns = ensure_indicators({'data_full': data})
+    _assert_columns_close({name: columns[name].to_numpy() for name in expected}, expected)
+
+
+def test_add_indicator_registers_columns(custom_indicators):
+    assert custom_indicators('EMA(50)') == ['EMA50']
+    assert custom_indicators('EMA50') == []
+    assert custom_indicators('MACD') == ['MACD12_26_9', 'MACD12_26_9_signal', 'MACD12_26_9_hist']
+    assert custom_indicators('RSI') == ['RSI14']
+    # 只有與價格同尺度的指標畫在主圖
+    assert 'EMA50' in INDICATOR_OVERLAYS and 'RSI14' not in INDICATOR_OVERLAYS
+    assert 'MACD12_26_9' not in INDICATOR_OVERLAYS
+
+
+def test_cache_shares_dependencies(frames):
+    """MACD 已算過的 EMA12 / EMA26 與 RSI 的漲跌幅在之後要求時直接重用"""
+    data = frames(1, 200)['SYM0']
+    cache = IndicatorCache()
+    macd = indicator_columns('MACD', (12, 26, 9))
+    cache.evaluate('SYM0', data, macd.values())
+    computed = cache.computed
+    ema = ('EMA', 12, ('Close',))
+    values = cache.evaluate('SYM0', data, [ema])
+    assert cache.computed == computed and cache.reused == 1
+    np.testing.assert_allclose(values[ema], data['Close'].ewm(span=12, adjust=False, min_periods=12).mean())
+    # RSI 與 MACD 只共用收盤價，只多算 RSI 自己的節點
+    cache.evaluate('SYM0', data, [('RSI', 14)])
+    assert cache.computed == computed + 6
+
+
+def test_cache_invalidated_by_new_bar(frames):
+    data = frames(1, 201)['SYM0']
+    cache = IndicatorCache()
+    nodes = list(indicator_columns('EMA', (20,)).values())
+    cache.evaluate('SYM0', data.iloc[:-1], nodes)
+    computed = cache.computed
+    cache.evaluate('SYM0', data, nodes)
+    assert cache.computed == 2 * computed and cache.reused == 0
+
+
+def test_cache_lru(frames):
+    data = frames(3, 100)
+    cache = IndicatorCache(max_symbols=2)
+    nodes = [('SMA', 20, ('Close',))]
+    for symbol in ('SYM0', 'SYM1', 'SYM0', 'SYM2'):
+        cache.evaluate(symbol, data[symbol], nodes)
+    # SYM0 剛被使用過，淘汰的是 SYM1
+    assert cache.reused == 1
+    cache.evaluate('SYM0', data['SYM0'], nodes)
+    assert cache.reused == 2
+    computed = cache.computed
+    cache.evaluate('SYM1', data['SYM1'], nodes)
+    assert cache.computed > computed
+
+
+def test_second_ensure_indicators_hits_cache(frames, custom_indicators):
+    data = frames(1, 300)['SYM0']
+    custom_indicators('EMA(50)')
+    first = ensure_indicators({'data_full': data}, symbol='CACHE_TEST')
+    computed, reused = INDICATOR_CACHE.computed, INDICATOR_CACHE.reused
+    second = ensure_indicators({'data_full': data}, symbol='CACHE_TEST')
+    assert INDICATOR_CACHE.computed == computed
+    assert INDICATOR_CACHE.reused > reused
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_cache_concurrent_evaluate(frames):
+    """多個執行緒同時計算同一支股票時結果一致，寫回時合併各自算出的節點"""
+    data = frames(1, 300)['SYM0']
+    cache = IndicatorCache()
+    groups = [list(indicator_columns(kind, params).values())
+              for kind, params in (('EMA', (20,)), ('RSI', (14,)), ('MACD', (12, 26, 9)), ('ATR', (14,)))]
+    results = [None] * len(groups)
+
+    def work(i):
+        results[i] = cache.evaluate('SYM0', data, groups[i])
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(len(groups))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reused = cache.reused
+    for nodes, values in zip(groups, results):
+        expected = IndicatorCache().evaluate('SYM0', data, nodes)
+        for node in nodes:
+            np.testing.assert_array_equal(values[node], expected[node])
+        cache.evaluate('SYM0', data, nodes)
+    assert cache.reused == reused + sum(len(nodes) for nodes in groups)
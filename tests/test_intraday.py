@@ -0,0 +1,88 @@
+"""分鐘線儲存的測試：附加與原地覆寫、零複製的時間區間、價格基準改變後重新下載，以及寫到一半中斷的復原"""
+import os
+
+import numpy as np
+import pytest
+
+from stock_price_track.config import OHLCV_COLUMNS
+from stock_price_track.data import IntradayStore, MemorySource, fetch_stocks_data_async, generate_synthetic_ohlcv
+
+from tests.support import split_adjusted
+
+
+def _assert_store_equal(store, symbol, data):
+    frame = store.frame(symbol)
+    np.testing.assert_array_equal(frame.index.values.astype('datetime64[ns]'),
+                                  data.index.values.astype('datetime64[ns]'))
+    np.testing.assert_allclose(frame[OHLCV_COLUMNS].to_numpy(dtype=np.float64),
+                               data[OHLCV_COLUMNS].to_numpy(dtype=np.float64), rtol=1e-12)
+
+
+@pytest.fixture
+def intraday():
+    return generate_synthetic_ohlcv(78 * 5, seed=0, interval='5m')
+
+
+def test_intraday_append(intraday, tmp_path):
+    store = IntradayStore(str(tmp_path), '5m', window_bars=100)
+    assert store.append('SYM0', intraday.iloc[:200]) == 200
+    # 與最後一根同時間的 K 線原地覆寫，更早的 K 線忽略
+    batch = intraday.iloc[150:260].copy()
+    batch.iloc[49, batch.columns.get_loc('Close')] *= 1.02
+    assert store.append('SYM0', batch) == 61
+    expected = intraday.iloc[:260].copy()
+    expected.iloc[199, expected.columns.get_loc('Close')] = batch['Close'].iloc[49]
+    _assert_store_equal(store, 'SYM0', expected)
+    assert store.append('SYM0', intraday.iloc[:100]) == 0
+    assert store.length('SYM0') == 260
+
+    loaded, fresh = store.load('SYM0')
+    assert not fresh
+    assert len(loaded) == 100 and loaded.index[-1] == intraday.index[259]
+
+
+def test_intraday_window(intraday, tmp_path):
+    """時間區間與最後 last 根都是記憶體映射陣列的切片，不複製數據"""
+    store = IntradayStore(str(tmp_path), '5m')
+    store.append('SYM0', intraday)
+    view = store.window('SYM0', start=intraday.index[10], end=intraday.index[20])
+    np.testing.assert_allclose(view['Close'], intraday['Close'].iloc[10:20], rtol=1e-12)
+    assert np.shares_memory(view['Close'], store.columns('SYM0')['Close'])
+
+    view = store.window('SYM0', end=intraday.index[300], last=50)
+    stamps = intraday.index.values.astype('datetime64[ns]').astype(np.int64)
+    np.testing.assert_array_equal(view['timestamp'], stamps[250:300])
+    assert np.shares_memory(view['Volume'], store.columns('SYM0')['Volume'])
+    assert len(store.window('SYM0', last=1000)['Close']) == len(intraday)
+    assert store.window('MISSING') == {}
+
+
+def test_intraday_refetch_after_split(intraday, tmp_path):
+    """分鐘線儲存作為快取時，價格基準改變後以完整下載取代既有的 K 線"""
+    store = IntradayStore(str(tmp_path), '5m')
+    store.append('SYM0', intraday.iloc[:300])
+    adjusted = split_adjusted(intraday, 4, 350)
+    source = MemorySource({'SYM0': adjusted})
+    downloaded, _ = fetch_stocks_data_async(['SYM0'], source, cache=store, period=None, rate=0, backoff=0)
+    assert source.attempts['SYM0'] == 2
+    _assert_store_equal(store, 'SYM0', adjusted)
+    np.testing.assert_allclose(downloaded['SYM0']['Close'].to_numpy(), adjusted['Close'].to_numpy(), rtol=1e-12)
+
+
+@pytest.mark.parametrize('extra_bytes', (8 * 3, 5))
+def test_intraday_truncate_recovery(intraday, tmp_path, extra_bytes):
+    """寫到一半中斷（欄位檔比時間檔長）時，長度以時間檔為準，下一次附加截掉多出的位元組"""
+    store = IntradayStore(str(tmp_path), '5m')
+    store.append('SYM0', intraday.iloc[:200])
+    for column in OHLCV_COLUMNS:
+        with open(store._path('SYM0', column), 'ab') as f:
+            f.write(b'\xff' * extra_bytes)
+    with open(store._path('SYM0', 'timestamp'), 'ab') as f:
+        f.write(b'\xff' * (extra_bytes % 8))
+    assert store.length('SYM0') == 200
+    _assert_store_equal(store, 'SYM0', intraday.iloc[:200])
+
+    assert store.append('SYM0', intraday.iloc[200:]) == len(intraday) - 200
+    _assert_store_equal(store, 'SYM0', intraday)
+    for column in ['timestamp'] + OHLCV_COLUMNS:
+        assert os.path.getsize(store._path('SYM0', column)) == len(intraday) * 8
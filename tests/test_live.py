@@ -0,0 +1,202 @@
+"""即時模式的 O(1) 指標更新、附加 K 線的緩衝區與完整重算的一致性測試"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.config import OHLCV_COLUMNS
+from stock_price_track.indicators import (
+    INDICATOR_COLUMNS, compute_indicator_arrays, compute_volume_colors, evaluate_indicator_nodes,
+)
+from stock_price_track.live import BarBuffer, IncrementalIndicators, LiveUpdater, ReplayBarSource
+
+
+def _random_closes(num_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.015, num_bars)))
+
+
+def _assert_latest(values, closes):
+    expected = compute_indicator_arrays(closes)
+    for name, column in expected.items():
+        np.testing.assert_allclose(values[name], column[-1], rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+@pytest.mark.parametrize('history', (0, 10, 250))
+def test_incremental_push(history):
+    closes = _random_closes(history + 300)
+    indicators = IncrementalIndicators(closes[:history])
+    for k in range(history, len(closes)):
+        indicators.push(closes[k])
+        _assert_latest(indicators.values(), closes[:k + 1])
+
+
+def test_incremental_replace_last():
+    closes = _random_closes(400)
+    indicators = IncrementalIndicators(closes[:300])
+    rng = np.random.default_rng(1)
+    for k in range(300, 400):
+        indicators.push(closes[k] * 1.01)
+        for quote in closes[k] * (1 + rng.normal(0, 0.002, 3)):
+            indicators.replace_last(quote)
+        indicators.replace_last(closes[k])
+        _assert_latest(indicators.values(), closes[:k + 1])
+
+
+def test_incremental_resync():
+    """跨過多次 RESYNC_INTERVAL 後誤差仍不累積"""
+    closes = _random_closes(5000)
+    indicators = IncrementalIndicators(closes[:300])
+    for close in closes[300:]:
+        indicators.push(close)
+    _assert_latest(indicators.values(), closes)
+
+
+class _ScriptedSource:
+    """依序回傳預先準備的 K 線批次（測試用的 poll 來源）"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    def poll(self, symbol, last_timestamp):
+        batches = self.batches.get(symbol)
+        if not batches:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return batches.pop(0)
+
+
+def _assert_full_recompute(stocks_data):
+    for symbol, stock in stocks_data.items():
+        data = stock['data_full']
+        expected = compute_indicator_arrays(data['Close'].to_numpy())
+        for name in data.columns.intersection(list(expected)):
+            values = expected[name]
+            np.testing.assert_allclose(data[name].to_numpy(dtype=np.float64), values,
+                                       rtol=1e-9, atol=1e-9, err_msg=f'{symbol} {name}')
+
+
+def test_live_updater_replay(frames):
+    full = frames(3, 320)
+    source = ReplayBarSource(full, holdback=40, bars_per_poll=3)
+    stocks_data = {symbol: {'data_full': data} for symbol, data in source.initial_data().items()}
+    updater = LiveUpdater(stocks_data, source)
+    for _ in range(14):
+        updater.poll_once()
+        assert sorted(updater.drain()) == sorted(stocks_data)
+    assert updater.drain() == []
+    for symbol, stock in stocks_data.items():
+        assert stock['data_full'].index.equals(full[symbol].index)
+        np.testing.assert_allclose(stock['data_full']['Close'].to_numpy(), full[symbol]['Close'].to_numpy())
+    _assert_full_recompute(stocks_data)
+
+
+def test_live_updater_replaces_last_bar(frames):
+    full = frames(1, 300)['SYM0']
+    history = full.iloc[:250].copy()
+    revised = full.iloc[249:251].copy()
+    revised.iloc[0, revised.columns.get_loc('Close')] *= 1.03
+    quote = full.iloc[250:251].copy()
+    quote['Close'] *= 0.98
+    source = _ScriptedSource({'SYM0': [revised, quote, full.iloc[251:]]})
+    stocks_data = {'SYM0': {'data_full': history}}
+    updater = LiveUpdater(stocks_data, source)
+    for _ in range(3):
+        updater.poll_once()
+        updater.drain()
+    data = stocks_data['SYM0']['data_full']
+    assert data.index.equals(full.index)
+    assert data['Close'].iloc[249] == pytest.approx(full['Close'].iloc[249] * 1.03, rel=1e-12)
+    assert data['Close'].iloc[250] == pytest.approx(full['Close'].iloc[250] * 0.98, rel=1e-12)
+    _assert_full_recompute(stocks_data)
+
+
+def test_live_updater_references(frames):
+    """references 只輪詢與更新，不加入 stocks_data、也不計算指標欄位"""
+    full = frames(3, 300)
+    source = ReplayBarSource(full, holdback=10)
+    initial = source.initial_data()
+    stocks_data = {symbol: {'data_full': initial[symbol]} for symbol in ('SYM0', 'SYM1')}
+    updater = LiveUpdater(stocks_data, source, references={'SYM2': initial['SYM2']})
+    updater.poll_once()
+    assert updater.drain() == ['SYM0', 'SYM1', 'SYM2']
+    assert list(stocks_data) == ['SYM0', 'SYM1']
+    reference = updater.frame('SYM2')
+    assert list(reference.columns) == list(full['SYM2'].columns)
+    assert reference.index.equals(full['SYM2'].index[:-9])
+    np.testing.assert_allclose(reference['Close'].to_numpy(), full['SYM2']['Close'].to_numpy()[:-9])
+    _assert_full_recompute(stocks_data)
+
+
+@pytest.mark.parametrize('interval', ('1d', '5m'))
+def test_bar_buffer_appends_in_place(frames, interval):
+    full = frames(1, 300, interval)['SYM0']
+    if interval == '5m':
+        full.index = full.index.tz_localize('America/New_York')
+    colors = compute_volume_colors(full['Close'])
+    stock = {'data_full': full.iloc[:10].copy(), 'volume_colors': colors[:10].copy()}
+    buffer = BarBuffer(stock['data_full'], stock['volume_colors'])
+    buffer.publish(stock)
+    for k in range(10, len(full)):
+        row = full.iloc[k].to_dict()
+        row['Volume'] = int(row['Volume'])
+        buffer.append(full.index[k].tz_convert('UTC').tz_localize(None) if interval == '5m' else full.index[k],
+                      row, colors[k])
+        # 每附加幾根才寫回一次：中間的 frame 仍是附加前的視圖
+        if k % 7 == 0:
+            assert len(stock['data_full']) < k + 1
+            buffer.publish(stock)
+    buffer.publish(stock)
+    pd.testing.assert_frame_equal(stock['data_full'], full, check_freq=False)
+    np.testing.assert_array_equal(stock['volume_colors'], colors)
+    # frame 直接指向緩衝區，沒有複製
+    assert np.shares_memory(stock['data_full']['Close'].to_numpy(), buffer.columns['Close'])
+    assert buffer.tracks(stock)
+
+    row = {'Close': 1.0, 'Volume': 5}
+    buffer.replace_last(row, colors[0])
+    assert stock['data_full']['Close'].iloc[-1] == 1.0 and stock['data_full']['Volume'].iloc[-1] == 5
+    stock['data_full'] = stock['data_full'].copy()
+    assert not buffer.tracks(stock)
+
+
+def test_live_updater_custom_refresh(frames, custom_indicators):
+    """自訂指標整欄重新計算的頻率受 custom_refresh 限制，期間新 K 線的欄位為 NaN"""
+    (name,) = custom_indicators('EMA(50)')
+    source = ReplayBarSource(frames(1, 300), holdback=5)
+    stocks_data = {'SYM0': {'data_full': source.initial_data()['SYM0']}}
+
+    def expected(data):
+        node = INDICATOR_COLUMNS[name]
+        return evaluate_indicator_nodes(data, [node])[node]
+
+    updater = LiveUpdater(stocks_data, source, custom_refresh=3600)
+    updater.poll_once()
+    assert updater.drain() == ['SYM0']
+    np.testing.assert_allclose(stocks_data['SYM0']['data_full'][name], expected(stocks_data['SYM0']['data_full']))
+    updater.poll_once()
+    updater.drain()
+    assert np.isnan(stocks_data['SYM0']['data_full'][name].iloc[-1])
+    # 沒有新 K 線、間隔也未到時不重新計算
+    assert updater.drain() == []
+
+    updater.custom_refresh = 0
+    assert updater.drain() == ['SYM0']
+    np.testing.assert_allclose(stocks_data['SYM0']['data_full'][name], expected(stocks_data['SYM0']['data_full']))
+
+
+def test_live_chart_tick(frames, headless_chart):
+    """經由圖表的計時器套用新 K 線：價格線與最新價格跟著更新，指標與完整重算一致"""
+    source = ReplayBarSource(frames(3, 320), holdback=20)
+    stocks_data = {symbol: {'data_full': data} for symbol, data in source.initial_data().items()}
+    updater = LiveUpdater(stocks_data, source)
+    fig, _, _, flush = headless_chart(stocks_data, live_updater=updater)
+    for _ in range(20):
+        updater.poll_once()
+        updater.timer._on_timer()
+        flush()
+    close = stocks_data['SYM0']['data_full']['Close']
+    assert len(close) == 320
+    line = next(line for line in fig.axes[0].get_lines()
+                if line.get_visible() and line.get_label() == 'SYM0 Close Price')
+    assert line.get_ydata()[-1] == close.iloc[-1]
+    assert f'Latest: ${close.iloc[-1]:.2f}' in [text.get_text() for text in fig.axes[0].texts]
+    _assert_full_recompute(stocks_data)
@@ -0,0 +1,155 @@
+"""滾動共變異數與投資組合即時刷新的測試（增量結果 vs. 以整個視窗重算），以及統計、熱圖排序與權重解析"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.portfolio import PortfolioAnalytics, RollingCovariance, parse_portfolio_weights
+
+
+@pytest.mark.parametrize('resync', (7, 10_000))
+def test_rolling_covariance_matches_full_window(resync):
+    window = 30
+    rng = np.random.default_rng(0)
+    rolling = RollingCovariance(5, window, resync=resync)
+    rows = []
+    for step in range(200):
+        row = rng.normal(0, 0.01, 5)
+        replace = step % 4 == 3
+        rolling.update(row, replace=replace)
+        if replace:
+            rows[-1] = row
+        else:
+            rows.append(row)
+        expected = np.array(rows[-window:])
+        np.testing.assert_allclose(rolling.rows(), expected, rtol=0, atol=0)
+        if len(expected) >= 2:
+            np.testing.assert_allclose(rolling.covariance(), np.cov(expected.T), rtol=1e-9, atol=1e-15)
+            np.testing.assert_allclose(rolling.correlation(), np.corrcoef(expected.T), rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_covariance_nan_and_constant_columns():
+    rolling = RollingCovariance(3, 10)
+    rows = np.random.default_rng(1).normal(0, 0.01, (12, 3))
+    rows[:, 2] = 0.0
+    rows[4, 0] = np.nan
+    rolling.reset(rows)
+    expected = np.nan_to_num(rows[-10:])
+    np.testing.assert_allclose(rolling.covariance(), np.cov(expected.T), rtol=1e-9, atol=1e-15)
+    corr = rolling.correlation()
+    assert np.isnan(corr[2]).all() and np.isnan(corr[:, 2]).all()
+    assert corr[0, 0] == 1.0
+
+
+def _assert_summary_close(actual, expected):
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            _assert_summary_close(actual[key], value)
+        elif isinstance(value, float):
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-12, nan_ok=True), key
+        else:
+            assert actual[key] == value, key
+
+
+@pytest.mark.parametrize('benchmark_symbol', (None, 'SYM4'))
+def test_refresh_matches_rebuild(frames, benchmark_symbol):
+    full = frames(5, 300)
+    history = {s: data.iloc[:260] for s, data in full.items()}
+    portfolio = PortfolioAnalytics(history, benchmark=benchmark_symbol, window=60)
+    for end in range(261, 301):
+        # 每根 K 線先以盤中報價更新一次，再套用收盤價
+        quote = {s: data.iloc[:end].copy() for s, data in full.items()}
+        for data in quote.values():
+            data.iloc[-1, data.columns.get_loc('Close')] *= 1.01
+        portfolio.refresh(quote)
+        portfolio.refresh({s: data.iloc[:end] for s, data in full.items()})
+    rebuilt = PortfolioAnalytics(full, benchmark=benchmark_symbol, window=60)
+    np.testing.assert_allclose(portfolio.rolling.covariance(), rebuilt.rolling.covariance(), rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(portfolio.portfolio_returns, rebuilt.portfolio_returns, rtol=1e-9, atol=1e-15)
+    _assert_summary_close(portfolio.summary(), rebuilt.summary())
+
+
+def test_refresh_partial_symbols(frames):
+    """只有部分股票有新 K 線時，其他股票沿用最後收盤價（報酬為 0）"""
+    full = frames(3, 200)
+    portfolio = PortfolioAnalytics({s: data.iloc[:199] for s, data in full.items()}, window=40)
+    # 最後一根已處理的 K 線重新套用一次，再加上一根新的
+    assert portfolio.refresh({'SYM0': full['SYM0']}) == 2
+    returns = portfolio.rolling.rows()[-1]
+    close = full['SYM0']['Close'].to_numpy()
+    assert returns[0] == pytest.approx(close[-1] / close[-2] - 1, rel=1e-12)
+    assert returns[1] == 0.0
+    assert portfolio.refresh({}) == 0
+
+
+def test_invalid_portfolios(frames):
+    data = frames(2, 100)
+    with pytest.raises(ValueError):
+        PortfolioAnalytics(data, benchmark='SPY')
+    with pytest.raises(ValueError):
+        PortfolioAnalytics({'SYM0': data['SYM0']})
+    with pytest.raises(ValueError):
+        PortfolioAnalytics(data, weights={'SYM0': 1.0, 'SYM1': -1.0})
+
+
+def test_summary_matches_pandas(frames):
+    data = frames(4, 200)
+    weights = {'SYM0': 2.0, 'SYM1': 1.0, 'SYM2': 1.0}
+    portfolio = PortfolioAnalytics(data, weights=weights, benchmark='SYM3', window=60)
+    summary = portfolio.summary()
+    returns = pd.DataFrame({s: frame['Close'] for s, frame in data.items()}).pct_change().iloc[1:]
+    recent = returns.iloc[-60:]
+    cov = recent.cov()
+    w = np.array([0.5, 0.25, 0.25])
+    members = ['SYM0', 'SYM1', 'SYM2']
+    betas = cov.loc[members, 'SYM3'] / cov.loc['SYM3', 'SYM3']
+    assert summary['weights'] == dict(zip(members, w))
+    for symbol in members:
+        assert summary['betas'][symbol] == pytest.approx(betas[symbol], rel=1e-9)
+    assert summary['beta'] == pytest.approx(float(w @ betas), rel=1e-9)
+    assert summary['volatility'] == pytest.approx(
+        np.sqrt(w @ cov.loc[members, members].to_numpy() @ w) * np.sqrt(252) * 100, rel=1e-9)
+    value = (1 + returns[members] @ w).cumprod()
+    assert summary['return_pct'] == pytest.approx((value.iloc[-1] - 1) * 100, rel=1e-9)
+    assert summary['max_drawdown'] == pytest.approx((value / value.cummax() - 1).min() * 100, rel=1e-9)
+    corr = recent[members].corr().to_numpy()
+    assert summary['avg_correlation'] == pytest.approx(corr[~np.eye(3, dtype=bool)].mean(), rel=1e-9)
+
+
+def _clustered_frames(num_bars=300):
+    """兩組彼此高度相關的股票（A0..A2 與 B0..B2），交錯排列"""
+    rng = np.random.default_rng(2)
+    index = pd.bdate_range('2020-01-01', periods=num_bars, name='Date')
+    factors = rng.normal(0, 0.01, (2, num_bars))
+    frames = {}
+    for i in range(3):
+        for group, factor in zip('AB', factors):
+            returns = factor + rng.normal(0, 0.002, num_bars)
+            frames[f'{group}{i}'] = pd.DataFrame({'Close': 100 * np.cumprod(1 + returns)}, index=index)
+    return frames
+
+
+def test_heatmap_order_groups_correlated_symbols():
+    portfolio = PortfolioAnalytics(_clustered_frames(), window=120)
+    order = portfolio.heatmap_order()
+    assert sorted(order) == list(range(6))
+    groups = [portfolio.symbols[i][0] for i in order]
+    assert groups in (list('AAABBB'), list('BBBAAA'))
+    # 排序在第一次計算後固定，之後的刷新不會讓熱圖重新排列
+    assert portfolio.heatmap_order() is order
+
+
+def test_top_pairs():
+    portfolio = PortfolioAnalytics(_clustered_frames(), window=120)
+    pairs = portfolio.top_pairs(6)
+    assert len(pairs) == 6
+    assert all(a[0] == b[0] for a, b, _ in pairs)
+    values = [value for _, _, value in pairs]
+    assert values == sorted(values, reverse=True)
+    assert len(portfolio.top_pairs(100)) == 15
+
+
+def test_parse_portfolio_weights():
+    assert parse_portfolio_weights('aapl=0.5, MSFT=0.3,TSLA=-0.2,') == {'AAPL': 0.5, 'MSFT': 0.3, 'TSLA': -0.2}
+    for text in ('', 'AAPL', 'AAPL=x', '=0.5', ','):
+        with pytest.raises(ValueError):
+            parse_portfolio_weights(text)
@@ -0,0 +1,76 @@
+"""互動事件分析的測試：延遲分布與重繪次數的統計，以及單一分派器依事件與座標軸呼叫的處理函式"""
+import json
+
+import pytest
+from matplotlib.backend_bases import CloseEvent, MouseEvent
+
+from stock_price_track.lazy import plt
+from stock_price_track.chart import create_multi_stock_chart
+from stock_price_track.profiler import InteractionProfiler
+
+from .support import click_label, fib_motion_events, press_key
+
+
+def test_profiler_summary(tmp_path, capsys):
+    profiler = InteractionProfiler(str(tmp_path / 'events.json'))
+    seen = []
+    profiler.hooks.append(lambda name, elapsed: seen.append(name))
+    assert profiler.call('click', lambda event: event * 2, 21) == 42
+
+    def broken(event):
+        raise RuntimeError('handler failed')
+    with pytest.raises(RuntimeError):
+        profiler.call('broken', broken, None)
+    # 處理函式拋出例外時仍記錄延遲並呼叫 hooks
+    assert seen == ['click', 'broken']
+
+    profiler.samples = {'motion': [0.0005, 0.0015, 0.003, 0.003, 0.25, 2.0]}
+    handler = profiler.summary()['handlers']['motion']
+    assert handler['calls'] == 6
+    assert handler['max_ms'] == pytest.approx(2000)
+    assert handler['median_ms'] == pytest.approx(3)
+    assert handler['histogram'] == {'<1ms': 1, '1-2ms': 1, '2-5ms': 2, '200-500ms': 1, '>=1000ms': 1}
+
+    profiler.report()
+    out = capsys.readouterr().out
+    assert '[Profile] Event handlers (6 calls)' in out and 'motion: 6 calls' in out
+    with open(tmp_path / 'events.json', encoding='utf-8') as f:
+        assert json.load(f) == json.loads(json.dumps(profiler.summary()))
+
+
+def test_dispatch_routes_events(chart_stocks, tmp_path):
+    log_path = tmp_path / 'events.json'
+    profiler = InteractionProfiler(str(log_path))
+    fig, radio_buttons = create_multi_stock_chart(chart_stocks(3, 300), prewarm=False, profiler=profiler)
+    try:
+        fig.canvas.draw()
+        ax1 = fig.axes[0]
+        # 費波那契工具未啟用時，價格圖上的滑鼠移動不呼叫任何處理函式
+        mx, my = ax1.transAxes.transform((0.5, 0.5))
+        for _ in range(5):
+            fig.canvas.callbacks.process('motion_notify_event', MouseEvent('motion_notify_event', fig.canvas, mx, my))
+        assert 'fib_motion' not in profiler.samples
+
+        click_label(fig, radio_buttons[1])
+        press_key(fig, 'right')
+        events = fib_motion_events(fig, 4)
+        for event in events:
+            fig.canvas.callbacks.process('motion_notify_event', event)
+        calls = {name: len(samples) for name, samples in profiler.samples.items()}
+        assert calls['button_click'] == 1
+        assert calls['key_press'] == 1
+        assert calls['pick'] == 1
+        assert calls['fib_click'] == 2
+        assert calls['fib_motion'] == len(events)
+        assert calls['fib_background'] >= 1
+        redraws = profiler.summary()['redraws']
+        assert redraws['blit'] == len(events)
+        assert redraws['draw'] == calls['fib_background']
+        assert redraws['draw_idle'] >= 2
+
+        # 關閉視窗時輸出摘要並寫入 JSON
+        fig.canvas.callbacks.process('close_event', CloseEvent('close_event', fig.canvas))
+        with open(log_path, encoding='utf-8') as f:
+            assert json.load(f)['handlers']['fib_motion']['calls'] == len(events)
+    finally:
+        plt.close(fig)
@@ -0,0 +1,80 @@
+"""多解析度 K 線的彙總與增量更新測試"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_price_track.pyramid import BarPyramid, aggregate_bars, base_resolution
+
+
+def _assert_pyramid_equal(pyramid, expected):
+    assert pyramid.aggregated == expected.aggregated
+    for level in expected.aggregated:
+        pd.testing.assert_frame_equal(pyramid.levels[level], expected.levels[level], check_freq=False,
+                                      rtol=1e-12, obj=level)
+        np.testing.assert_array_equal(pyramid.starts[level], expected.starts[level])
+
+
+def test_aggregate_weekly():
+    index = pd.bdate_range('2024-01-01', periods=8, name='Date')  # 星期一起的 8 個交易日
+    data = pd.DataFrame({
+        'Open': np.arange(8, dtype=float) + 10,
+        'High': [11, 15, 12, 13, 14, 20, 16, 17],
+        'Low': [9, 8, 7, 10, 11, 12, 6, 13],
+        'Close': np.arange(8, dtype=float) + 10.5,
+        'Volume': np.arange(1, 9, dtype=np.int64) * 100,
+    }, index=index)
+    bars, starts = aggregate_bars(data, 'W')
+    np.testing.assert_array_equal(starts, [0, 5])
+    assert list(bars.index) == [index[4], index[7]]
+    np.testing.assert_allclose(bars['Open'], [10, 15])
+    np.testing.assert_allclose(bars['High'], [15, 20])
+    np.testing.assert_allclose(bars['Low'], [7, 6])
+    np.testing.assert_allclose(bars['Close'], [14.5, 17.5])
+    np.testing.assert_array_equal(bars['Volume'], [1500, 2100])
+
+
+@pytest.mark.parametrize('interval, base, num_bars', (('1d', 'D', 600), ('5m', '5m', 78 * 12)))
+def test_update_matches_rebuild(frames, interval, base, num_bars):
+    data = frames(1, num_bars, interval)['SYM0']
+    assert base_resolution(data.index) == base
+    history = len(data) - 40
+    pyramid = BarPyramid(data.iloc[:history])
+    for end in range(history + 1, len(data) + 1, 3):
+        pyramid.update(data.iloc[:end])
+        _assert_pyramid_equal(pyramid, BarPyramid(data.iloc[:end]))
+    assert pyramid.stats['built'] == 1
+    assert pyramid.stats['incremental'] == len(range(history + 1, len(data) + 1, 3))
+
+
+def test_update_revised_last_bar(frames):
+    """同一個 DataFrame 原地修改最後一根（盤中報價）時仍走增量更新"""
+    data = frames(1, 500)['SYM0'].copy()
+    pyramid = BarPyramid(data)
+    for factor in (1.05, 0.9):
+        data.iloc[-1, data.columns.get_loc('Close')] *= factor
+        data.iloc[-1, data.columns.get_loc('High')] *= 1.1
+        pyramid.update(data)
+        _assert_pyramid_equal(pyramid, BarPyramid(data.copy()))
+    assert pyramid.stats == {'built': 1, 'incremental': 2}
+
+
+def test_update_rebuilds_on_history_change(frames):
+    data = frames(1, 500)['SYM0']
+    pyramid = BarPyramid(data.iloc[100:400])
+    pyramid.update(data.iloc[:420])
+    _assert_pyramid_equal(pyramid, BarPyramid(data.iloc[:420]))
+    assert pyramid.stats == {'built': 2, 'incremental': 0}
+
+
+def test_select_finest_fitting_resolution(frames):
+    data = frames(1, 2520)['SYM0']
+    pyramid = BarPyramid(data)
+    assert pyramid.aggregated == ['W', 'M']
+    # 最近 130 個交易日的日線放得下
+    assert pyramid.select(pyramid.session_start(130), 300) == ('D', len(data) - 130)
+    level, first = pyramid.select(pyramid.session_start(1260), 300)
+    assert level == 'W' and len(pyramid.levels['W']) - first <= 300
+    level, first = pyramid.select(pyramid.session_start(None), 300)
+    assert (level, first) == ('M', 0)
+    # 最粗的解析度也放不下時仍使用最粗的
+    assert pyramid.select(pyramid.session_start(None), 10)[0] == 'M'
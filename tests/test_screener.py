@@ -0,0 +1,93 @@
+"""篩選器的測試：條件解析、向量化查詢 vs. 以 pandas 逐支計算，以及逐支更新 vs. 重新建立索引"""
+import operator
+
+import numpy as np
+import pytest
+
+from stock_price_track.indicators import _calculate_indicators_pandas
+from stock_price_track.stats import _summary_stats_pandas
+from stock_price_track.screener import SCREEN_STATS_FIELDS, Screener, parse_screen_condition
+
+SCREEN_CONDITIONS = ['close > MA50', 'MA20 <= MA50', 'close crosses_above MA20', 'close crosses_below MA10',
+                     'close > BB_upper', 'close < 100', 'max_drawdown > -15', 'volatility between 40 15',
+                     'return >= 0']
+
+
+def test_parse_screen_condition():
+    assert parse_screen_condition('close > MA50') == {
+        'text': 'close > MA50', 'kind': 'compare', 'left': 'close', 'op': '>', 'right': 'MA50'}
+    assert parse_screen_condition('volatility between 40 15')['low'] == 15
+    assert parse_screen_condition('close crosses_above MA20')['kind'] == 'cross'
+    for text in ('close >', 'price > MA50', 'close == MA50', 'close > MA7', 'volatility crosses_above 10',
+                 'return between MA20 5', 'close between 1'):
+        with pytest.raises(ValueError):
+            parse_screen_condition(text)
+
+
+def _pandas_features(frames):
+    """以原本的 pandas 指標與統計計算每支股票最新與前一根 K 線的特徵"""
+    features = []
+    for data in frames.values():
+        indicators = _calculate_indicators_pandas(data.copy()).rename(columns={'Close': 'close'})
+        stats = _summary_stats_pandas(data, 130)
+        latest = {field: stats[key] for field, key in SCREEN_STATS_FIELDS.items()}
+        latest.update(indicators.iloc[-1].to_dict())
+        features.append((latest, indicators.iloc[-2].to_dict()))
+    return features
+
+
+def _expected_mask(condition, features):
+    """逐支判斷一個條件"""
+    ops = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+    matches = []
+    for latest, before in features:
+        left = latest[condition['left']]
+        if condition['kind'] == 'between':
+            matched = condition['low'] <= left <= condition['high']
+        elif condition['kind'] == 'compare':
+            right = condition['right']
+            matched = ops[condition['op']](left, latest[right] if isinstance(right, str) else right)
+        else:
+            was = before[condition['left']] - before[condition['right']]
+            now = left - latest[condition['right']]
+            matched = was <= 0 < now if condition['op'] == 'crosses_above' else was >= 0 > now
+        matches.append(bool(matched))
+    return np.array(matches)
+
+
+def test_query_matches_pandas(frames):
+    downloaded = frames(120, 320)
+    downloaded['SYM7'] = downloaded['SYM7'].iloc[-40:]  # MA50 還沒有數值的短歷史
+    screener = Screener.from_frames(downloaded)
+    features = _pandas_features(downloaded)
+    for text in SCREEN_CONDITIONS:
+        screener.add(text)
+        np.testing.assert_array_equal(screener.masks[text], _expected_mask(screener.conditions[text], features),
+                                      err_msg=text)
+    assert 0 < screener.masks['close crosses_above MA20'].sum() < len(downloaded)
+    both = screener.masks['close > MA50'] & screener.masks['max_drawdown > -15']
+    assert screener.query('close > MA50', 'max_drawdown > -15') == [s for s, m in zip(downloaded, both) if m]
+    assert screener.query() == [s for s, m in zip(downloaded, screener.query_mask(*SCREEN_CONDITIONS)) if m]
+
+
+def test_update_matches_rebuild(closes):
+    matrix = closes(320, 300)
+    symbols = [f'SYM{j}' for j in range(matrix.shape[1])]
+    screener = Screener(symbols, matrix.copy())
+    for text in SCREEN_CONDITIONS:
+        screener.add(text)
+    rng = np.random.default_rng(0)
+    flips = 0
+    for j in rng.integers(matrix.shape[1], size=200):
+        before = {text: bool(mask[j]) for text, mask in screener.masks.items()}
+        matrix[-1, j] *= 1 + rng.normal(0, 0.05)
+        changes = screener.update(symbols[j], matrix[:, j])
+        # 回傳的變動與索引中實際翻轉的條件一致
+        assert changes == [(text, screener.masks[text][j]) for text in SCREEN_CONDITIONS
+                           if screener.masks[text][j] != before[text]]
+        flips += len(changes)
+    assert flips > 0
+    rebuilt = Screener(symbols, matrix)
+    for text in SCREEN_CONDITIONS:
+        rebuilt.add(text)
+        np.testing.assert_array_equal(screener.masks[text], rebuilt.masks[text], err_msg=text)
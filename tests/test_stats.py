@@ -0,0 +1,60 @@
+"""[Results] 統計核心（NumPy / Numba）與原本 pandas 逐項計算的一致性測試"""
+import numpy as np
+import pytest
+
+from stock_price_track.lazy import HAS_NUMBA
+from stock_price_track.config import STATS_FIELDS, STATS_LOOKBACKS
+from stock_price_track.stats import _summary_stats_pandas, align_closes, compute_batch_stats, compute_summary_stats
+
+
+def test_align_closes(frames):
+    downloaded = frames(3, 300)
+    downloaded['SYM1'] = downloaded['SYM1'].iloc[200:]
+    symbols, matrix, lengths = align_closes(downloaded)
+    assert symbols == ['SYM0', 'SYM1', 'SYM2']
+    np.testing.assert_array_equal(lengths, [300, 100, 300])
+    # 較短的歷史靠底部對齊，上方補 NaN
+    assert np.isnan(matrix[:200, 1]).all()
+    np.testing.assert_array_equal(matrix[200:, 1], downloaded['SYM1']['Close'].to_numpy())
+
+
+@pytest.mark.parametrize('num_bars', (30, 320))
+def test_summary_stats_match_pandas(frames, num_bars):
+    data = frames(1, num_bars)['SYM0']
+    summary = compute_summary_stats(data['Close'].to_numpy())
+    assert list(summary) == list(STATS_LOOKBACKS)
+    for period, lookback in STATS_LOOKBACKS.items():
+        expected = _summary_stats_pandas(data, lookback)
+        assert list(summary[period]) == STATS_FIELDS
+        for key, value in summary[period].items():
+            assert value == pytest.approx(float(expected[key]), rel=1e-9, abs=1e-9), f'{period} {key}'
+
+
+def _matrix_with_gaps(closes):
+    """不同長度的歷史（上方補 NaN）加上中間零星的缺值"""
+    matrix = closes(300, 40, seed=3)
+    matrix[:120, :10] = np.nan
+    matrix[np.random.default_rng(4).random(matrix.shape) < 0.02] = np.nan
+    return matrix
+
+
+@pytest.mark.parametrize('lookback', (22, 130, 500))
+def test_numpy_kernel_matches_pandas(frames, lookback):
+    downloaded = frames(6, 300)
+    downloaded['SYM2'] = downloaded['SYM2'].iloc[250:]
+    symbols, matrix, _ = align_closes(downloaded)
+    stats = compute_batch_stats(matrix, lookback, use_numba=False)
+    for j, symbol in enumerate(symbols):
+        expected = _summary_stats_pandas(downloaded[symbol], lookback)
+        for key in STATS_FIELDS:
+            assert stats[key][j] == pytest.approx(float(expected[key]), rel=1e-9, abs=1e-9), f'{symbol} {key}'
+
+
+@pytest.mark.skipif(not HAS_NUMBA, reason='Numba is not installed')
+@pytest.mark.parametrize('lookback', (22, 130, 500))
+def test_numba_kernel_matches_numpy(closes, lookback):
+    matrix = _matrix_with_gaps(closes)
+    expected = compute_batch_stats(matrix, lookback, use_numba=False)
+    stats = compute_batch_stats(matrix, lookback, use_numba=True)
+    for key in STATS_FIELDS:
+        np.testing.assert_allclose(stats[key], expected[key], rtol=1e-9, atol=1e-9, err_msg=key)